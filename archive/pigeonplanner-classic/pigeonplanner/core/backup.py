@@ -32,6 +32,10 @@ def make_backup(folder):
     if not isdir(folder):
         return
 
+    from pigeonplanner import database
+    # Include the changes that are still in the write-ahead log
+    database.session.checkpoint()
+
     infolder = const.PREFDIR
     outfile = join(folder, "PigeonPlannerBackup.zip")
 
@@ -59,7 +63,10 @@ def makezip(path, zipper):
             if not filename.endswith(".lock") and not\
                    filename.endswith(".log") and not\
                    filename.endswith(".old") and not\
-                   filename == "Thumbs.db":
+                   filename.endswith(".snapshot") and not\
+                   filename.endswith("-shm") and not\
+                   filename == "Thumbs.db" and not\
+                   (".log." in filename and filename.endswith(".gz")):
                 zipper.write(os.path.join(dirpath, filename),            
                 os.path.join(dirpath[len(path):], filename)) 
 
@@ -75,6 +82,11 @@ def restore_backup(infile):
         logger.exception(e)
         return False
 
+    # A write-ahead log of the current database doesn't belong to the backup
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(const.DATABASE + suffix):
+            os.remove(const.DATABASE + suffix)
+
     try:
         unzip(outfol, zipper)
     except Exception as e:
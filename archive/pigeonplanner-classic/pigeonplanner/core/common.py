@@ -21,16 +21,9 @@ Functions for some common tasks
 
 
 import os
-import cgi
-import csv
-import codecs
 import random
 import locale
-import inspect
-import urllib2
 import datetime
-import cStringIO
-import webbrowser
 
 from pigeonplanner import database
 from pigeonplanner.core import const
@@ -43,8 +36,15 @@ def get_sexdic():
             enums.Sex.hen: _("Hen"),
             enums.Sex.unknown: _("Young bird")}
 
+def get_sex_labels():
+    """
+    Get the translated sexes as a list indexed by sex
+    """
+
+    return _get_labels("sex", get_sexdic)
+
 def get_sex(sex):
-    return get_sexdic()[sex]
+    return get_sex_labels()[sex]
 
 SEX_IMGS = {enums.Sex.cock: os.path.join(const.IMAGEDIR, "symbol_male.png"),
             enums.Sex.hen: os.path.join(const.IMAGEDIR, "symbol_female.png"),
@@ -59,8 +59,32 @@ def get_statusdic():
             enums.Status.loaned: _("On loan"),
             enums.Status.widow: _("Widow")}
 
+def get_status_labels():
+    """
+    Get the translated statuses as a list indexed by status
+    """
+
+    return _get_labels("status", get_statusdic)
+
 def get_status(status):
-    return get_statusdic()[status]
+    return get_status_labels()[status]
+
+# The translated labels are built once for the active language, the enum
+# values start at 0 so they're kept as lists. They're dropped when the
+# language changes and rebuilt on next use.
+_labels = {}
+
+def _get_labels(kind, get_dic):
+    try:
+        return _labels[kind]
+    except KeyError:
+        dic = get_dic()
+        labels = _labels[kind] = [dic[value] for value in range(len(dic))]
+        return labels
+
+# Keep a reference, the config doesn't hold on to its snapshots
+_language = config.snapshot(language="options.language")
+_language.connect(_labels.clear)
 
 statustables = {enums.Status.dead: database.Tables.DEAD,
                 enums.Status.active: "Active",
@@ -85,6 +109,7 @@ def get_function_name():
     Retrieve the name of the function/method
     """
 
+    import inspect
     return inspect.stack()[1][3]
 
 def get_date():
@@ -213,15 +238,20 @@ def get_random_number(value):
 
     return "".join([random.choice("0123456789") for x in range(value)])
 
+def open_url(url):
+    import webbrowser
+    webbrowser.open(url)
+
 def url_hook(about, link):
-    webbrowser.open(link)
+    open_url(link)
 
 def email_hook(about, email):
-    webbrowser.open("mailto:%s" % email)
+    open_url("mailto:%s" % email)
 
 def escape_text(text):
     if not text:
         return ""
+    import cgi
     return cgi.escape(text, True)
 
 def open_file(path):
@@ -251,7 +281,7 @@ def open_file(path):
                 return
 
 def open_help(article):
-    webbrowser.open(const.DOCURL % article)
+    open_url(const.DOCURL % article)
 
 def get_pagesize_from_opts():
     optvalue = config.get("printing.general-paper")
@@ -273,6 +303,7 @@ class URLOpen:
         @param cookie: Cookie to be used
         """
 
+        import urllib2
         self.opener = urllib2.build_opener(urllib2.HTTPCookieProcessor(cookie))
 
     def open(self, url, body, headers=None, timeout=8):
@@ -291,6 +322,7 @@ class URLOpen:
             if not "User-Agent" in headers:
                 headers.update(const.USER_AGENT)
 
+        import urllib2
         return self.opener.open(urllib2.Request(url, body, headers), timeout=timeout)
 
 
@@ -300,6 +332,7 @@ class UTF8Recoder:
     Iterator that reads an encoded stream and reencodes the input to UTF-8
     """
     def __init__(self, f, encoding):
+        import codecs
         self.reader = codecs.getreader(encoding)(f)
 
     def __iter__(self):
@@ -315,7 +348,8 @@ class UnicodeReader:
     which is encoded in the given encoding.
     """
 
-    def __init__(self, f, dialect=csv.excel, encoding="utf-8", **kwds):
+    def __init__(self, f, dialect="excel", encoding="utf-8", **kwds):
+        import csv
         f = UTF8Recoder(f, encoding)
         self.reader = csv.reader(f, dialect=dialect, **kwds)
 
@@ -333,26 +367,21 @@ class UnicodeWriter:
     which is encoded in the given encoding.
     """
 
-    def __init__(self, f, dialect=csv.excel, encoding="utf-8", **kwds):
-        # Redirect output to a queue
-        self.queue = cStringIO.StringIO()
-        self.writer = csv.DictWriter(self.queue, dialect=dialect,
+    def __init__(self, f, dialect="excel", encoding="utf-8", **kwds):
+        import csv
+        self.writer = csv.DictWriter(f, dialect=dialect,
                                      quoting=csv.QUOTE_ALL, **kwds)
-        self.stream = f
-        self.encoder = codecs.getincrementalencoder(encoding)()
+        self.encoding = encoding
 
     def writerow(self, row):
-        self.writer.writerow({k:str(v).encode("utf-8") for k,v in row.items()})
-        # Fetch UTF-8 output from the queue ...
-        data = self.queue.getvalue()
-        data = data.decode("utf-8")
-        # ... and reencode it into the target encoding
-        data = self.encoder.encode(data)
-        # write to the target stream
-        self.stream.write(data)
-        # empty queue
-        self.queue.truncate(0)
+        self.writer.writerow(self._encode_row(row))
 
     def writerows(self, rows):
-        for row in rows:
-            self.writerow(row)
+        self.writer.writerows(self._encode_row(row) for row in rows)
+
+    def _encode_row(self, row):
+        # Encode the values once, straight into the target encoding
+        encoding = self.encoding
+        return dict((key, value.encode(encoding) if isinstance(value, unicode)
+                          else str(value))
+                    for key, value in row.items())
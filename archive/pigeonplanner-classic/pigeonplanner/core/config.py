@@ -19,18 +19,99 @@
 import os
 import json
 import copy
+import stat
 import time
+import weakref
+import tempfile
+import threading
 import logging
 logger = logging.getLogger(__name__)
 
 from pigeonplanner.core import const
 
 
+# Seconds to wait for more changes before writing them to disk
+FLUSH_DELAY = 2.0
+
+_unset = object()
+
+
+def _replace_file(src, dst):
+    """
+    Atomically move src over dst
+
+    @param src: Path of the new file
+    @param dst: Path of the file to replace
+    """
+
+    if not const.WINDOWS:
+        os.rename(src, dst)
+        return
+    import ctypes
+    MOVEFILE_REPLACE_EXISTING = 0x1
+    MOVEFILE_WRITE_THROUGH = 0x8
+    flags = MOVEFILE_REPLACE_EXISTING | MOVEFILE_WRITE_THROUGH
+    if not ctypes.windll.kernel32.MoveFileExW(unicode(src), unicode(dst), flags):
+        raise ctypes.WinError()
+
+
+def _get_file_mode(filename):
+    """
+    Get the permissions of a file, or the ones a new file gets if it
+    doesn't exist
+    """
+
+    try:
+        return stat.S_IMODE(os.stat(filename).st_mode)
+    except OSError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0666 & ~umask
+
+
+class ConfigSnapshot(object):
+    """
+    Plain attributes holding the current value of some settings. The config
+    keeps them up to date, so code that runs for every row or cell can read
+    an attribute instead of calling get.
+    """
+
+    def __init__(self, keys):
+        self._keys = keys
+        self._callbacks = []
+
+    def connect(self, callback):
+        """
+        Call callback without arguments after one of the settings changed
+        """
+
+        self._callbacks.append(callback)
+
+    def _update(self, values):
+        changed = False
+        for attr, key in self._keys.items():
+            value = values[key]
+            if getattr(self, attr, _unset) != value:
+                setattr(self, attr, value)
+                changed = True
+        if changed:
+            for callback in self._callbacks:
+                callback()
+
+
 class Config(object):
-    def __init__(self):
+    def __init__(self, filename=None, flush_delay=FLUSH_DELAY):
+        self.filename = filename or const.CONFIGFILE
+        self.flush_delay = flush_delay
         self.default = {}
         self.settings = {}
-        self.reset()
+        self._values = {}
+        self._types = {}
+        self._snapshots = weakref.WeakSet()
+        self._dirty = False
+        self._timer = None
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()
 
     def reset(self, key=None):
         if key is None:
@@ -41,60 +122,192 @@ class Config(object):
         else: # key is not None and doesn't have a "."
             section = key
             setting = None
-        # Now, do the reset on the right parts:
-        if section is None:
-            self.settings = {}
-            for section in self.default:
+        with self._lock:
+            # Now, do the reset on the right parts:
+            if section is None:
+                self.settings = {}
+                for section in self.default:
+                    self.settings[section] = {}
+                    for setting in self.default[section]:
+                        self.settings[section][setting] = \
+                            copy.deepcopy(self.default[section][setting])
+            elif setting is None:
                 self.settings[section] = {}
                 for setting in self.default[section]:
                     self.settings[section][setting] = \
                         copy.deepcopy(self.default[section][setting])
-        elif setting is None:
-            self.settings[section] = {}
-            for setting in self.default[section]:
+            else:
                 self.settings[section][setting] = \
                     copy.deepcopy(self.default[section][setting])
-        else:
-            self.settings[section][setting] = \
-                copy.deepcopy(self.default[section][setting])
+            self._rebuild_values()
+            self._changed()
 
     def load(self):
-        if os.path.exists(const.CONFIGFILE):
-            with open(const.CONFIGFILE) as cfg:
+        if not os.path.exists(self.filename):
+            return
+        try:
+            with open(self.filename) as cfg:
                 loaded = json.load(cfg)
+        except ValueError as exc:
+            logger.error("Unable to read config file, using defaults: %s", exc)
+            return
+        with self._lock:
             for section in self.settings.keys():
-                self.settings[section].update(loaded[section])
+                for setting, value in loaded.get(section, {}).items():
+                    key = "%s.%s" % (section, setting)
+                    try:
+                        value = self._coerce(key, value)
+                    except TypeError:
+                        logger.warning("Ignoring setting %s with invalid value %r",
+                                       key, value)
+                        continue
+                    self.settings[section][setting] = value
+            self._rebuild_values()
+            # The loaded values are what's on disk
+            self._dirty = False
 
     def save(self, default=False):
-        with open(const.CONFIGFILE, "w") as cfg:
+        """
+        Write the settings to disk right away
+        """
+
+        with self._lock:
+            self._cancel_timer()
             settings = self.settings if not default else self.default
-            json.dump(settings, cfg, indent=4)
+            settings = copy.deepcopy(settings)
+            self._dirty = False
+        self._write(settings)
+
+    def flush(self):
+        """
+        Write the settings to disk if there are pending changes
+        """
+
+        with self._lock:
+            dirty = self._dirty
+        if dirty:
+            self.save()
 
     def get(self, key):
-        section, setting = key.split(".", 1)
-        return self.settings[section][setting]
+        return self._values[key]
 
     def set(self, key, value):
-        section, setting = key.split(".", 1)
-        if (setting in self.settings[section] and 
-            self.settings[section][setting] == value):
-            # Do nothing if existed and is the same
-            pass
-        else:
-            # Set the value:
+        if value is None and key in self._types:
+            # Widgets without a selection give None, keep the current value
+            return
+        value = self._coerce(key, value)
+        with self._lock:
+            if key in self._values and self._values[key] == value:
+                # Do nothing if existed and is the same
+                return
+            section, setting = key.split(".", 1)
             self.settings[section][setting] = value
+            self._values[key] = value
+            self._changed()
 
     def register(self, key, default):
         section, setting = key.split(".", 1)
-        if section not in self.settings:
-            self.settings[section] = {}
-        if section not in self.default:
-            self.default[section] = {}
-        # Add the default value to settings, if not exist:
-        if setting not in self.settings[section]:
-            self.settings[section][setting] = default
-        # Set the default, regardless:
-        self.default[section][setting] = copy.deepcopy(default)
+        with self._lock:
+            if section not in self.settings:
+                self.settings[section] = {}
+            if section not in self.default:
+                self.default[section] = {}
+            self._types[key] = type(default)
+            # Add the default value to settings, if not exist:
+            if setting not in self.settings[section]:
+                self.settings[section][setting] = default
+            else:
+                try:
+                    value = self._coerce(key, self.settings[section][setting])
+                except TypeError:
+                    value = default
+                self.settings[section][setting] = value
+            self._values[key] = self.settings[section][setting]
+            # Set the default, regardless:
+            self.default[section][setting] = copy.deepcopy(default)
+
+    def snapshot(self, **keys):
+        """
+        Get an object with the values of the given settings as attributes,
+        updated whenever one of them changes.
+
+        @param keys: Attribute names mapped to the setting keys
+        """
+
+        snap = ConfigSnapshot(keys)
+        with self._lock:
+            snap._update(self._values)
+            self._snapshots.add(snap)
+        return snap
+
+    # Internal methods
+    def _coerce(self, key, value):
+        """
+        Make sure the value has the type of the registered default
+        """
+
+        try:
+            type_ = self._types[key]
+        except KeyError:
+            return value
+        if isinstance(value, type_):
+            return value
+        if type_ is bool and isinstance(value, int):
+            return bool(value)
+        if type_ in (int, long, float) and isinstance(value, (int, long, float)) \
+           and not isinstance(value, bool):
+            return type_(value)
+        if type_ in (str, unicode) and isinstance(value, basestring):
+            return value
+        raise TypeError("Setting %s expects %s, got %r" % (key, type_.__name__, value))
+
+    def _rebuild_values(self):
+        self._values = {}
+        for section, settings in self.settings.items():
+            for setting, value in settings.items():
+                self._values["%s.%s" % (section, setting)] = value
+
+    def _changed(self):
+        for snap in self._snapshots:
+            snap._update(self._values)
+        self._dirty = True
+        if self._timer is None:
+            self._timer = threading.Timer(self.flush_delay, self._on_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _on_timer(self):
+        with self._lock:
+            self._timer = None
+        try:
+            self.flush()
+        except Exception as exc:
+            logger.error("Unable to save the config: %s", exc)
+
+    def _write(self, settings):
+        with self._write_lock:
+            dirname = os.path.dirname(self.filename) or os.curdir
+            fd, tmpname = tempfile.mkstemp(prefix=".pigeonplanner-", suffix=".json",
+                                           dir=dirname)
+            try:
+                with os.fdopen(fd, "w") as cfg:
+                    json.dump(settings, cfg, indent=4)
+                    cfg.flush()
+                    os.fsync(cfg.fileno())
+                # mkstemp creates the file readable by the owner only
+                os.chmod(tmpname, _get_file_mode(self.filename))
+                _replace_file(tmpname, self.filename)
+            except:
+                try:
+                    os.remove(tmpname)
+                except OSError:
+                    pass
+                raise
 
 
 default_config = [
@@ -166,6 +379,8 @@ get = CONFIG.get
 set = CONFIG.set
 register = CONFIG.register
 save = CONFIG.save
+flush = CONFIG.flush
+snapshot = CONFIG.snapshot
 load = CONFIG.load
 reset = CONFIG.reset
 
@@ -103,6 +103,7 @@ DATABASE = os.path.join(PREFDIR, u"pigeonplanner.db")
 LOGFILE = os.path.join(PREFDIR, u"pigeonplanner.log")
 CONFIGFILE_OLD = os.path.join(PREFDIR, u"pigeonplanner.cfg")
 CONFIGFILE = os.path.join(PREFDIR, u"pigeonplanner.json")
+PIGEONSNAPSHOT = os.path.join(PREFDIR, u"pigeons.snapshot")
 
 TEMPDIR = tempfile.gettempdir()
 
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of Pigeon Planner.
+
+# Pigeon Planner is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Pigeon Planner is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Pigeon Planner.  If not, see <http://www.gnu.org/licenses/>
+
+"""
+Aggregate counters over a list of pigeons
+"""
+
+
+import collections
+
+
+class PigeonCounter(object):
+    """
+    Count pigeons per sex and status, for all pigeons in a list and for the
+    ones shown by the active filter. The counted values of each pigeon are
+    kept, so adding, updating and removing a pigeon is done in constant time.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self._pigeons = {}
+        # Keyed by filter state, True for the pigeons shown by the filter
+        self._totals = {True: 0, False: 0}
+        self._sexes = {True: collections.defaultdict(int),
+                       False: collections.defaultdict(int)}
+        self._statuses = {True: collections.defaultdict(int),
+                          False: collections.defaultdict(int)}
+
+    def add(self, pigeon, visible=True):
+        """
+        Count a pigeon
+
+        @param pigeon: The pigeon object
+        @param visible: True if the pigeon is shown by the active filter
+        """
+
+        visible = bool(visible)
+        key = (pigeon.sex, pigeon.active, visible)
+        self._pigeons[pigeon.pindex] = key
+        self._count(key, 1)
+
+    def update(self, pigeon, visible=True, old_pindex=None):
+        """
+        Count the current values of a pigeon that was added before
+
+        @param pigeon: The pigeon object
+        @param visible: True if the pigeon is shown by the active filter
+        @param old_pindex: The pindex the pigeon was added with, if changed
+        """
+
+        self.remove(old_pindex or pigeon.pindex)
+        self.add(pigeon, visible)
+
+    def remove(self, pindex):
+        try:
+            key = self._pigeons.pop(pindex)
+        except KeyError:
+            return
+        self._count(key, -1)
+
+    def get_total(self, filtered=True):
+        """
+        @param filtered: Only count the pigeons shown by the filter
+        """
+
+        if filtered:
+            return self._totals[True]
+        return self._totals[True] + self._totals[False]
+
+    def get_sex_count(self, sex, filtered=True):
+        if filtered:
+            return self._sexes[True][sex]
+        return self._sexes[True][sex] + self._sexes[False][sex]
+
+    def get_status_count(self, status, filtered=True):
+        if filtered:
+            return self._statuses[True][status]
+        return self._statuses[True][status] + self._statuses[False][status]
+
+    def _count(self, key, value):
+        sex, status, visible = key
+        self._totals[visible] += value
+        self._sexes[visible][sex] += value
+        self._statuses[visible][status] += value
@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of Pigeon Planner.
+
+# Pigeon Planner is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Pigeon Planner is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Pigeon Planner.  If not, see <http://www.gnu.org/licenses/>
+
+"""
+Distances between the lofts in the addressbook and the racepoints
+"""
+
+
+import re
+import math
+import logging
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from pigeonplanner import database
+
+
+# WGS-84 ellipsoid
+EQUATORIAL_RADIUS = 6378137.0
+FLATTENING = 1 / 298.257223563
+POLAR_RADIUS = (1 - FLATTENING) * EQUATORIAL_RADIUS
+
+# Vincenty's iteration stops when lambda changes less than this (~0.006mm)
+TOLERANCE = 1e-12
+MAX_ITERATIONS = 200
+
+_dms_split = re.compile(u"[°º'\"’”′″:]+")
+
+
+def parse_coordinate(value, maximum=180):
+    """
+    Parse a latitude or longitude in one of the formats accepted by the
+    LatLongEntry widget, DD.dddddd°, DD°MM.mmm’ or DD°MM’SS.s”. A leading
+    minus sign or a trailing S or W is south or west. Numbers larger than
+    the maximum are taken as packed DDMMSS.s values.
+
+    @param value: The coordinate string
+    @param maximum: 90 for latitudes, 180 for longitudes
+    @return: The coordinate in decimal degrees
+    @raise ValueError: The value can't be parsed
+    """
+
+    if not value:
+        raise ValueError("Empty coordinate")
+    if isinstance(value, str):
+        value = value.decode("utf-8")
+    value = value.replace(u",", u".").replace(u" ", u"").upper()
+    sign = 1
+    if value[-1:] in (u"N", u"S", u"E", u"W"):
+        if value[-1] in (u"S", u"W"):
+            sign = -1
+        value = value[:-1]
+    if value[:1] in (u"-", u"+"):
+        if value[0] == u"-":
+            sign = -sign
+        value = value[1:]
+
+    parts = [float(part) for part in _dms_split.split(value) if part]
+    if not parts or len(parts) > 3:
+        raise ValueError("Invalid coordinate '%s'" % value)
+    if len(parts) == 1 and parts[0] > maximum:
+        packed = parts[0]
+        parts = [packed // 10000, packed // 100 % 100, packed % 100]
+    degrees = parts[0]
+    for index, part in enumerate(parts[1:], 1):
+        if part >= 60:
+            raise ValueError("Invalid coordinate '%s'" % value)
+        degrees += part / 60 ** index
+    if degrees > maximum:
+        raise ValueError("Invalid coordinate '%s'" % value)
+    return sign * degrees
+
+def parse_location(latitude, longitude):
+    """
+    Parse a latitude and longitude pair
+
+    @return: Tuple of decimal degrees or None if one of them is invalid
+    """
+
+    try:
+        return (parse_coordinate(latitude, 90), parse_coordinate(longitude, 180))
+    except ValueError:
+        return None
+
+
+class _ScalarMath(object):
+    sin = staticmethod(math.sin)
+    cos = staticmethod(math.cos)
+    tan = staticmethod(math.tan)
+    sqrt = staticmethod(math.sqrt)
+    arctan = staticmethod(math.atan)
+    arctan2 = staticmethod(math.atan2)
+
+    @staticmethod
+    def divide(x, y):
+        return x / y if y else 0.0
+
+    @staticmethod
+    def converged(delta):
+        return abs(delta) < TOLERANCE
+
+
+if numpy is not None:
+    class _ArrayMath(object):
+        sin = numpy.sin
+        cos = numpy.cos
+        tan = numpy.tan
+        sqrt = numpy.sqrt
+        arctan = numpy.arctan
+        arctan2 = numpy.arctan2
+
+        @staticmethod
+        def divide(x, y):
+            # Coincident points and equatorial lines divide by zero
+            shape = numpy.broadcast(x, y).shape
+            return numpy.divide(x, y, out=numpy.zeros(shape), where=y != 0)
+
+        @staticmethod
+        def converged(delta):
+            return numpy.all(numpy.abs(delta) < TOLERANCE)
+
+
+def _vincenty(lat1, lon1, lat2, lon2, m):
+    """
+    Vincenty's inverse formula on the WGS-84 ellipsoid. The arguments are in
+    radians and can be floats or NumPy arrays, m is the matching math module.
+    """
+
+    f = FLATTENING
+    L = lon2 - lon1
+    U1 = m.arctan((1 - f) * m.tan(lat1))
+    U2 = m.arctan((1 - f) * m.tan(lat2))
+    sinU1, cosU1 = m.sin(U1), m.cos(U1)
+    sinU2, cosU2 = m.sin(U2), m.cos(U2)
+
+    lambda_ = L
+    for iteration in range(MAX_ITERATIONS):
+        sinLambda, cosLambda = m.sin(lambda_), m.cos(lambda_)
+        sinSigma = m.sqrt((cosU2 * sinLambda) ** 2 +
+                          (cosU1 * sinU2 - sinU1 * cosU2 * cosLambda) ** 2)
+        cosSigma = sinU1 * sinU2 + cosU1 * cosU2 * cosLambda
+        sigma = m.arctan2(sinSigma, cosSigma)
+        sinAlpha = m.divide(cosU1 * cosU2 * sinLambda, sinSigma)
+        cosSqAlpha = 1 - sinAlpha ** 2
+        cos2SigmaM = cosSigma - m.divide(2 * sinU1 * sinU2, cosSqAlpha)
+        C = f / 16 * cosSqAlpha * (4 + f * (4 - 3 * cosSqAlpha))
+        lambda_prev = lambda_
+        lambda_ = L + (1 - C) * f * sinAlpha * (sigma + C * sinSigma *
+                      (cos2SigmaM + C * cosSigma * (-1 + 2 * cos2SigmaM ** 2)))
+        if m.converged(lambda_ - lambda_prev):
+            break
+    else:
+        # Only happens for nearly antipodal points
+        logger.warning("Distance calculation didn't converge")
+
+    uSq = cosSqAlpha * (EQUATORIAL_RADIUS ** 2 - POLAR_RADIUS ** 2) / POLAR_RADIUS ** 2
+    A = 1 + uSq / 16384 * (4096 + uSq * (-768 + uSq * (320 - 175 * uSq)))
+    B = uSq / 1024 * (256 + uSq * (-128 + uSq * (74 - 47 * uSq)))
+    deltaSigma = B * sinSigma * (cos2SigmaM + B / 4 * (cosSigma * (-1 + 2 * cos2SigmaM ** 2) -
+                 B / 6 * cos2SigmaM * (-3 + 4 * sinSigma ** 2) * (-3 + 4 * cos2SigmaM ** 2)))
+    return POLAR_RADIUS * A * (sigma - deltaSigma)
+
+def distance(origin, destination):
+    """
+    Calculate the distance between two locations
+
+    @param origin: Tuple of latitude and longitude in decimal degrees
+    @param destination: Tuple of latitude and longitude in decimal degrees
+    @return: The distance in metres
+    """
+
+    lat1, lon1 = map(math.radians, origin)
+    lat2, lon2 = map(math.radians, destination)
+    return _vincenty(lat1, lon1, lat2, lon2, _ScalarMath)
+
+def distance_matrix(origins, destinations):
+    """
+    Calculate the distances from all origins to all destinations. This is
+    done for all pairs at once with NumPy if it's available.
+
+    @param origins: List of (latitude, longitude) tuples in decimal degrees
+    @param destinations: List of (latitude, longitude) tuples in decimal degrees
+    @return: Distances in metres, matrix[i][j] from origin i to destination j
+    """
+
+    if not origins or not destinations:
+        return [[] for origin in origins]
+    if numpy is None:
+        return [[distance(origin, destination) for destination in destinations]
+                for origin in origins]
+    origins = numpy.radians(numpy.asarray(origins, dtype=float))
+    destinations = numpy.radians(numpy.asarray(destinations, dtype=float))
+    # Broadcast a column of origins against a row of destinations
+    lat1, lon1 = origins[:, 0, None], origins[:, 1, None]
+    lat2, lon2 = destinations[None, :, 0], destinations[None, :, 1]
+    return _vincenty(lat1, lon1, lat2, lon2, _ArrayMath).tolist()
+
+def _get_locations(rows, key, latitude, longitude, keys=None):
+    locations = []
+    for row in rows:
+        if keys is not None and row[key] not in keys:
+            continue
+        location = parse_location(row[latitude], row[longitude])
+        if location is None:
+            if row[latitude] or row[longitude]:
+                logger.warning("Invalid location for '%s': %s, %s",
+                               row[key], row[latitude], row[longitude])
+            continue
+        locations.append((row[key], location))
+    return locations
+
+def update_distances(addresses=None, racepoints=None):
+    """
+    Calculate and store the distances between the lofts in the addressbook
+    and the racepoints. Locations without valid coordinates are left out.
+
+    @param addresses: List of address keys to update, None for all
+    @param racepoints: List of racepoints to update, None for all
+    @return: Number of stored distances
+    """
+
+    lofts = _get_locations(database.get_all_addresses(), "Addresskey",
+                           "latitude", "longitude", addresses)
+    points = _get_locations(database.get_all_racepoints(), "racepoint",
+                            "xco", "yco", racepoints)
+    matrix = distance_matrix([location for key, location in lofts],
+                             [location for key, location in points])
+    rows = [(loft, point, value)
+            for (loft, location), distances in zip(lofts, matrix)
+            for (point, location), value in zip(points, distances)]
+    database.set_distances(rows, addresses, racepoints)
+    return len(rows)
+
+def get_distances():
+    """
+    Get all stored distances
+
+    @return: Dict of (address key, racepoint) tuples to distances in metres
+    """
+
+    return dict(((address, racepoint), value)
+                for address, racepoint, value in database.get_all_distances())
@@ -37,3 +37,10 @@ class PigeonAlreadyExists(Exception):
 class PigeonAlreadyExistsHidden(Exception):
     pass
 
+
+class InvalidImportError(Exception):
+    def __init__(self, errors):
+        self.errors = errors
+
+    def __str__(self):
+        return "\n".join("%s:%s: %s" % error for error in self.errors)
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of Pigeon Planner.
+
+# Pigeon Planner is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Pigeon Planner is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Pigeon Planner.  If not, see <http://www.gnu.org/licenses/>
+
+"""
+Posting lists of the pigeon attributes that the pigeon list is filtered on
+"""
+
+
+# Pigeon attributes that are indexed
+ATTRIBUTES = ("year", "sex", "active", "colour", "strain", "loft", "show")
+
+
+class PigeonFilterIndex(object):
+    """
+    For each indexed attribute, the set of pindexes per value. A filter is
+    matched against the distinct values only and the pigeons are found by
+    intersecting the sets of the matching values.
+
+    The index is built from the given pigeons dict on the first query.
+    """
+
+    def __init__(self, pigeons):
+        self._pigeons = pigeons
+        self._postings = None
+        # The indexed values of each pigeon, to remove them after they changed
+        self._values = {}
+
+    def invalidate(self):
+        """
+        Drop the index, it will be rebuilt from the pigeons when needed
+        """
+
+        self._postings = None
+        self._values = {}
+
+    def build(self):
+        if self._postings is not None:
+            return
+        self._postings = dict((attr, {}) for attr in ATTRIBUTES)
+        for pigeon in self._pigeons.itervalues():
+            self._add(pigeon)
+
+    def add(self, pigeon):
+        if self._postings is None:
+            # Nothing indexed yet, it'll be picked up by the build
+            return
+        self._add(pigeon)
+
+    def update(self, pigeon, old_pindex=None):
+        """
+        Index the current values of a pigeon that was added before
+
+        @param pigeon: The pigeon object
+        @param old_pindex: The pindex the pigeon was indexed with, if changed
+        """
+
+        self.remove(old_pindex or pigeon.pindex)
+        self.add(pigeon)
+
+    def remove(self, pindex):
+        try:
+            values = self._values.pop(pindex)
+        except KeyError:
+            return
+        for attr, value in zip(ATTRIBUTES, values):
+            postings = self._postings[attr]
+            pindexes = postings[value]
+            pindexes.discard(pindex)
+            if not pindexes:
+                del postings[value]
+
+    def query(self, items):
+        """
+        Get the pigeons that match all filter items
+
+        @param items: Iterable of TreeviewFilter items on the indexed attributes
+        @return: Set of pindexes
+        """
+
+        self.build()
+        matches = []
+        for item in items:
+            # Cast once instead of for every pigeon
+            value = item.type(item.value)
+            sets = [pindexes for key, pindexes in self._postings[item.name].iteritems()
+                    if item.operator(item.type(key), value)]
+            if not sets:
+                return set()
+            matches.append(sets[0] if len(sets) == 1 else set().union(*sets))
+        if not matches:
+            return set(self._pigeons)
+        matches.sort(key=len)
+        return matches[0].intersection(*matches[1:])
+
+    def _add(self, pigeon):
+        values = tuple(getattr(pigeon, attr) for attr in ATTRIBUTES)
+        self._values[pigeon.pindex] = values
+        for attr, value in zip(ATTRIBUTES, values):
+            self._postings[attr].setdefault(value, set()).add(pigeon.pindex)
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of Pigeon Planner.
+
+# Pigeon Planner is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Pigeon Planner is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Pigeon Planner.  If not, see <http://www.gnu.org/licenses/>
+
+"""
+Cache of decoded images that can be decoded ahead on a worker thread
+"""
+
+
+import logging
+import functools
+import threading
+import collections
+logger = logging.getLogger(__name__)
+
+
+class FrameCache(object):
+    """
+    A small LRU of decoded images, called frames, keyed by a tuple of the
+    filename, width and height they're decoded at. The decode function is
+    called with these to decode a frame.
+
+    Frames that will probably be needed next can be decoded on a worker
+    thread with prefetch. The callback of a prefetch is called through the
+    dispatch function, just like the database worker does.
+    """
+
+    def __init__(self, decode, size=4, dispatch=None):
+        """
+        @param decode: Function that takes the filename, width and height
+        @param size: Maximum number of frames to keep
+        @param dispatch: Function that's called on the worker thread with a
+                         function to run, by default it's called right away
+        """
+
+        self.decode = decode
+        self.size = size
+        self.dispatch = dispatch or (lambda func: func())
+        self._frames = collections.OrderedDict()
+        self._condition = threading.Condition()
+        self._pending = []
+        self._callback = None
+        self._decoding = None
+        self._thread = None
+        self._closed = False
+
+    def get(self, key):
+        """
+        Get a frame if it's decoded already
+
+        @param key: Tuple of the filename, width and height
+        @return: The frame or None
+        """
+
+        with self._condition:
+            return self._get(key)
+
+    def load(self, key):
+        """
+        Get a frame, it's decoded right away if it's not in the cache. Errors
+        of the decode function are raised.
+
+        @param key: Tuple of the filename, width and height
+        @return: The frame
+        """
+
+        with self._condition:
+            if key in self._pending:
+                self._pending.remove(key)
+            # Don't decode it twice when the worker is busy with it
+            while self._decoding == key:
+                self._condition.wait()
+            frame = self._get(key)
+        if frame is None:
+            frame = self.decode(*key)
+            with self._condition:
+                self._add(key, frame)
+        return frame
+
+    def prefetch(self, keys, callback=None):
+        """
+        Decode frames on the worker thread. The frames that are still waiting
+        from a previous prefetch are dropped.
+
+        @param keys: List of keys, the first is decoded first
+        @param callback: Function that takes the key and frame of each
+                         decoded frame
+        """
+
+        with self._condition:
+            if self._closed:
+                return
+            self._pending = [key for key in keys if key not in self._frames
+                             and key != self._decoding]
+            self._callback = callback
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="FrameCache")
+                self._thread.daemon = True
+                self._thread.start()
+            self._condition.notify_all()
+
+    def close(self):
+        """
+        Drop all frames and stop the worker thread
+        """
+
+        with self._condition:
+            self._closed = True
+            self._pending = []
+            self._callback = None
+            self._frames.clear()
+            self._condition.notify_all()
+
+    def _get(self, key):
+        try:
+            frame = self._frames.pop(key)
+        except KeyError:
+            return None
+        # Move it to the end, it's the most recently used now
+        self._frames[key] = frame
+        return frame
+
+    def _add(self, key, frame):
+        if self._closed:
+            return
+        self._frames.pop(key, None)
+        self._frames[key] = frame
+        while len(self._frames) > self.size:
+            self._frames.popitem(last=False)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    break
+                key = self._decoding = self._pending.pop(0)
+            try:
+                frame = self.decode(*key)
+            except Exception as exc:
+                logger.debug("Unable to prefetch %s: %s", key[0], exc)
+                frame = None
+            with self._condition:
+                self._decoding = None
+                if frame is not None:
+                    self._add(key, frame)
+                # Closing drops the callback as well
+                callback = self._callback
+                self._condition.notify_all()
+            if frame is not None and callback is not None:
+                self.dispatch(functools.partial(callback, key, frame))
@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of Pigeon Planner.
+
+# Pigeon Planner is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Pigeon Planner is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Pigeon Planner.  If not, see <http://www.gnu.org/licenses/>
+
+"""
+Rotation and indexing of the logfile
+"""
+
+
+import os
+import re
+import time
+import mmap
+import logging.handlers
+
+from pigeonplanner.core import const
+
+
+# Rotate when the logfile grows larger than this or gets older than the interval
+MAX_BYTES = 2 * 1024 * 1024
+ROTATE_INTERVAL = 24 * 60 * 60
+BACKUP_COUNT = 5
+
+SEVERITY = ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL", "TRACEBACK"]
+TRACEBACK = SEVERITY.index("TRACEBACK")
+
+# Number of bytes at the start of the logfile to detect that it was rotated
+HEAD_SIZE = 64
+
+# Matches the start of a record written with const.LOG_FORMAT
+_record_header = re.compile(r"\[[^\]\n]*\] \S+ (%s): " % "|".join(SEVERITY[:TRACEBACK]))
+
+
+def get_archive_name(filename, number):
+    return "%s.%s.gz" % (filename, number)
+
+def get_log_files(filename=const.LOGFILE):
+    """
+    Get the logfile and its existing archives, newest first
+
+    @param filename: The path of the logfile
+    """
+
+    logs = [filename]
+    for number in range(1, BACKUP_COUNT + 1):
+        archive = get_archive_name(filename, number)
+        if os.path.exists(archive):
+            logs.append(archive)
+    # Written by older versions which rotated once at startup
+    if os.path.exists("%s.old" % filename):
+        logs.append("%s.old" % filename)
+    return logs
+
+
+class RotatingLogHandler(logging.handlers.RotatingFileHandler):
+    """
+    A file handler that rotates the logfile when it grows larger than
+    maxBytes or when it's older than interval seconds. Rotated logs are
+    kept as gzip compressed archives, logfile.1.gz being the newest.
+    """
+
+    def __init__(self, filename, maxBytes=MAX_BYTES, interval=ROTATE_INTERVAL,
+                 backupCount=BACKUP_COUNT, encoding=None):
+        logging.handlers.RotatingFileHandler.__init__(self, filename, "a", maxBytes,
+                                                      backupCount, encoding)
+        self.interval = interval
+        self.rolloverAt = time.time() + interval
+
+    def shouldRollover(self, record):
+        if self.interval and time.time() >= self.rolloverAt:
+            return 1
+        return logging.handlers.RotatingFileHandler.shouldRollover(self, record)
+
+    def doRollover(self):
+        import gzip
+        import shutil
+
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        self.rolloverAt = time.time() + self.interval
+        try:
+            for number in range(self.backupCount - 1, 0, -1):
+                source = get_archive_name(self.baseFilename, number)
+                if os.path.exists(source):
+                    destination = get_archive_name(self.baseFilename, number + 1)
+                    if os.path.exists(destination):
+                        os.remove(destination)
+                    os.rename(source, destination)
+            if self.backupCount > 0:
+                with open(self.baseFilename, "rb") as infile:
+                    archive = gzip.open(get_archive_name(self.baseFilename, 1), "wb")
+                    try:
+                        shutil.copyfileobj(infile, archive)
+                    finally:
+                        archive.close()
+            # Truncated by reopening it in write mode
+            self.mode = "w"
+            self.stream = self._open()
+        except (IOError, OSError):
+            # The logfile can be opened by another program on Windows. Keep
+            # appending to it and try again when the next rollover is due.
+            pass
+        finally:
+            self.mode = "a"
+            if self.stream is None:
+                self.stream = self._open()
+
+    def rollover_if_used(self):
+        """
+        Rotate the logfile if it isn't empty, used at startup to start each
+        session with a new logfile.
+        """
+
+        if os.path.getsize(self.baseFilename) > 0:
+            self.doRollover()
+
+
+class LogIndex(object):
+    """
+    An index of the line offsets and severities of a logfile. The logfile
+    is memory-mapped while it's read and only the lines that were added
+    since the last update are scanned, so a growing logfile can be followed
+    without reading it again. Compressed archives are decompressed in memory.
+
+    Lines that don't start a record, like tracebacks, get the severity of
+    the record they belong to.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.compressed = filename.endswith(".gz")
+        self.reset()
+
+    def reset(self):
+        self.offsets = []
+        self.severities = []
+        self.size = 0
+        self._severity = 0
+        self._head = ""
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def update(self):
+        """
+        Index the lines that were written since the last update. Only
+        complete lines are indexed.
+
+        @return: The number of the first new line or None when the logfile
+                 was rotated, in which case the index starts over.
+        """
+
+        first = len(self.offsets)
+        rotated = False
+        with _LogData(self.filename, self.compressed) as data:
+            if self._is_rotated(data):
+                self.reset()
+                rotated = True
+            self._scan(data)
+            self._head = data[:HEAD_SIZE]
+        return None if rotated else first
+
+    def iter_blocks(self, severity=0, start=0):
+        """
+        Iterate over the lines as blocks of consecutive lines with the same
+        severity.
+
+        @param severity: Leave out lines with a lower severity
+        @param start: The number of the first line
+        @return: Iterator of (severity, text) tuples
+        """
+
+        if start >= len(self.offsets):
+            return
+        with _LogData(self.filename, self.compressed) as data:
+            if self._is_rotated(data):
+                return
+            block_start = block_severity = None
+            for number in xrange(start, len(self.offsets)):
+                line_severity = self.severities[number]
+                if line_severity == block_severity:
+                    continue
+                if block_severity is not None and block_severity >= severity:
+                    yield block_severity, data[block_start:self.offsets[number]]
+                block_start, block_severity = self.offsets[number], line_severity
+            if block_severity >= severity:
+                yield block_severity, data[block_start:self.size]
+
+    def _is_rotated(self, data):
+        # The timestamp of the first record changes when it's rotated
+        return len(data) < self.size or data[:len(self._head)] != self._head
+
+    def _scan(self, data):
+        offsets = self.offsets
+        severities = self.severities
+        current = self._severity
+        position = self.size
+        while True:
+            end = data.find("\n", position)
+            if end == -1:
+                break
+            match = _record_header.match(data, position, end)
+            if match is not None:
+                current = SEVERITY.index(match.group(1))
+            elif data[position:position+9] == "Traceback":
+                current = TRACEBACK
+            offsets.append(position)
+            severities.append(current)
+            position = end + 1
+        self._severity = current
+        self.size = position
+
+
+class _LogData(object):
+    """
+    Context manager to access the contents of a logfile. The file is only
+    mapped for the duration of the with block, it's never locked for the
+    handler that rotates it.
+    """
+
+    def __init__(self, filename, compressed):
+        self.filename = filename
+        self.compressed = compressed
+        self._file = None
+        self._map = None
+
+    def __enter__(self):
+        if self.compressed:
+            import gzip
+            archive = gzip.open(self.filename, "rb")
+            try:
+                return archive.read()
+            finally:
+                archive.close()
+        try:
+            self._file = open(self.filename, "rb")
+        except IOError:
+            return ""
+        if os.fstat(self._file.fileno()).st_size == 0:
+            # Empty files can't be mapped
+            return ""
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def __exit__(self, *args):
+        if self._map is not None:
+            self._map.close()
+        if self._file is not None:
+            self._file.close()
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of Pigeon Planner.
+
+# Pigeon Planner is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Pigeon Planner is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Pigeon Planner.  If not, see <http://www.gnu.org/licenses/>
+
+"""
+Give medication to a group of pigeons
+"""
+
+
+from pigeonplanner import database
+from pigeonplanner.core import common
+
+
+def get_pigeons(medid):
+    """
+    Get the pigeons a medication is given to
+
+    @param medid: The medication id
+    @return: Set of pindexes
+    """
+
+    return set(database.get_pigeons_for_medid(medid))
+
+def add_medication(data, pindexes):
+    """
+    Add a new medication for the pigeons
+
+    @param data: Dict with the medication data
+    @param pindexes: The pigeons to give the medication to
+    @return: The id of the new medication
+    """
+
+    medid = data["date"] + common.get_random_number(10)
+    database.add_medication_for_pigeons(dict(data, medid=medid), set(pindexes))
+    return medid
+
+def update_medication(medid, data, pindexes):
+    """
+    Update a medication and the pigeons it's given to. Only the pigeons that
+    were added or removed are changed in the database.
+
+    @param medid: The medication id
+    @param data: Dict with the medication data
+    @param pindexes: All pigeons the medication is given to
+    @return: Tuple of the sets of added and removed pindexes
+    """
+
+    pindexes = set(pindexes)
+    current = get_pigeons(medid)
+    added = pindexes - current
+    removed = current - pindexes
+    database.update_medication_pigeons(medid, data, added, removed)
+    return added, removed
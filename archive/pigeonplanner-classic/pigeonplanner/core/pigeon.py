@@ -82,9 +82,9 @@ def update_pigeon(pigeon, data, status, statusdata):
         else:
             raise errors.PigeonAlreadyExistsHidden(pigeon.pindex)
 
-    database.update_result_for_pindex(pigeon.pindex, {"pindex": data["pindex"]})
-    database.update_medication_for_pindex(pigeon.pindex, {"pindex": data["pindex"]})
-    database.update_media_for_pindex(pigeon.pindex, {"pindex": data["pindex"]})
+    # The results, medication, media, status and the parents of the children
+    # follow a changed band in the database itself.
+    pindex = data["pindex"]
     # Remove the old thumbnail (if exists)
     if pigeon.get_image() and data["image"] != pigeon.get_image():
         try:
@@ -96,42 +96,39 @@ def update_pigeon(pigeon, data, status, statusdata):
     if status != old_status:
         # Status has changed. Remove the old status and add the new data.
         if old_status != enums.Status.active:
-            database.remove_status(common.get_status_table(old_status), pigeon.pindex)
+            database.remove_status(common.get_status_table(old_status), pindex)
         if status != enums.Status.active:
-            database.add_status(common.get_status_table(status), statusdata)
+            database.add_status(common.get_status_table(status), dict(statusdata, pindex=pindex))
     else:
         # Status stayed the same, just update those values
         if status != enums.Status.active:
-            database.update_status(common.get_status_table(status), pigeon.pindex, statusdata)
+            database.update_status(common.get_status_table(status), pindex, statusdata)
 
     # Save the data values
     database.add_data(database.Tables.COLOURS, data.get("colour", ""))
     database.add_data(database.Tables.STRAINS, data.get("strain", ""))
     database.add_data(database.Tables.LOFTS, data.get("loft", ""))
 
-    return pigeonparser.parser.update_pigeon(data["pindex"], pigeon.pindex)
+    return pigeonparser.parser.update_pigeon(pindex, pigeon.pindex)
 
 def remove_pigeon(pigeon, remove_results=True):
     pindex = pigeon.get_pindex()
     logger.debug("Start removing pigeon '%s'", pindex)
 
-    status = pigeon.get_active()
-    if status != enums.Status.active:
-        database.remove_status(common.get_status_table(status), pindex)
-
     try:
         os.remove(thumbnail.get_path(pigeon.get_image()))
     except:
         pass
 
+    # The status and media are removed with the pigeon, the medication is
+    # removed first to clean up medication that isn't given to others. The
+    # results are kept with the pindex of the pigeon if they aren't removed.
+    if remove_results:
+        database.remove_result_for_pigeon(pindex)
     database.remove_medication({"pindex": pindex})
-    database.remove_media({"pindex": pindex})
     database.remove_pigeon(pindex)
     pigeonparser.parser.remove_pigeon(pindex)
 
-    if remove_results:
-        database.remove_result_for_pigeon(pindex)
-
 def build_pedigree_tree(pigeon, index, depth, lst):
     if depth > 5 or pigeon is None or index >= len(lst):
         return
@@ -20,18 +20,113 @@ Parser to get all pigeons
 """
 
 
+import os
+import marshal
+import logging
+logger = logging.getLogger(__name__)
+
 from pigeonplanner import database
 from pigeonplanner.core import enums
 from pigeonplanner.core import common
+from pigeonplanner.core import filterindex
+from pigeonplanner.core import searchindex
+
+
+# Increase when the snapshot layout or the pigeon attributes change
+SNAPSHOT_VERSION = 1
+# The pigeon attributes that are stored in a snapshot
+SNAPSHOT_ATTRIBUTES = ("pindex", "ring", "year", "sex", "show", "active",
+                       "colour", "name", "strain", "loft", "image",
+                       "sire", "yearsire", "dam", "yeardam",
+                       "extra1", "extra2", "extra3", "extra4", "extra5", "extra6")
 
 
 class PigeonParser(object):
     def __init__(self):
         self.pigeons = {}
+        self.index = searchindex.PigeonSearchIndex(self.pigeons)
+        self.filter_index = filterindex.PigeonFilterIndex(self.pigeons)
 
     def build_pigeons(self):
-        for pigeon in database.get_all_pigeons():
-            self.add_pigeon(pigeon)
+        for data in database.get_all_pigeons():
+            pobj = Pigeon()
+            pobj.set_data(**data)
+            self.pigeons[pobj.pindex] = pobj
+        self.index.invalidate()
+        self.filter_index.invalidate()
+
+    def load_snapshot(self, filename, fingerprint):
+        """
+        Load the pigeons from a snapshot written by save_snapshot instead of
+        reading them from the database.
+
+        @param filename: The path of the snapshot
+        @param fingerprint: The database fingerprint, the snapshot is only
+                            used when it was written with the same one
+        @return: True if the pigeons were loaded
+        """
+
+        try:
+            with open(filename, "rb") as snapfile:
+                if marshal.load(snapfile) != (SNAPSHOT_VERSION, fingerprint):
+                    return False
+                columns = marshal.load(snapfile)
+        except (IOError, EOFError, ValueError, TypeError) as exc:
+            if os.path.exists(filename):
+                logger.warning("Unable to read the pigeon snapshot: %s", exc)
+            return False
+
+        pigeons = {}
+        for values in zip(*columns):
+            pobj = Pigeon()
+            pobj.__dict__.update(zip(SNAPSHOT_ATTRIBUTES, values))
+            pigeons[pobj.pindex] = pobj
+        self.pigeons.clear()
+        self.pigeons.update(pigeons)
+        self.index.invalidate()
+        self.filter_index.invalidate()
+        return True
+
+    def save_snapshot(self, filename, fingerprint):
+        """
+        Write the pigeons to a snapshot, stored as one list per attribute
+
+        @param filename: The path of the snapshot
+        @param fingerprint: The fingerprint of the database the pigeons are in
+        """
+
+        pigeons = self.pigeons.values()
+        columns = tuple([getattr(pobj, attr) for pobj in pigeons]
+                        for attr in SNAPSHOT_ATTRIBUTES)
+        tmpfile = filename + ".tmp"
+        try:
+            with open(tmpfile, "wb") as snapfile:
+                marshal.dump((SNAPSHOT_VERSION, fingerprint), snapfile)
+                marshal.dump(columns, snapfile)
+            if os.path.exists(filename):
+                # Windows can't rename over an existing file
+                os.remove(filename)
+            os.rename(tmpfile, filename)
+        except (IOError, OSError, ValueError) as exc:
+            logger.error("Unable to write the pigeon snapshot: %s", exc)
+
+    def load_pigeons(self, rows):
+        """
+        Add pigeons that are already in the database
+
+        @param rows: Database rows with the pigeon data
+        @return: List of the new pigeon objects
+        """
+
+        pigeons = []
+        for data in rows:
+            pobj = Pigeon()
+            pobj.set_data(**data)
+            self.pigeons[pobj.pindex] = pobj
+            self.index.add(pobj)
+            self.filter_index.add(pobj)
+            pigeons.append(pobj)
+        return pigeons
 
     def get_pigeons(self):
         return self.pigeons
@@ -64,17 +159,24 @@ class PigeonParser(object):
         pobj = Pigeon()
         pobj.set_data(**data)
         self.pigeons[pobj.pindex] = pobj
+        self.index.add(pobj)
+        self.filter_index.add(pobj)
         return pobj
 
+    def add_pigeons(self, rows):
+        """
+        Add several pigeons to the database in one transaction
+
+        @param rows: List of dicts with the pigeon data, all with the same keys
+        @return: List of the new pigeon objects
+        """
+
+        if not rows:
+            return []
+        return self.load_pigeons(database.add_pigeons(rows))
+
     def add_empty_pigeon(self, pindex, sex, visible=True, sire="", dam=""):
-        if pindex == "":
-            raise ValueError
-        band, year = common.get_band_from_pindex(pindex)
-        sband, syear = common.get_band_from_pindex(sire)
-        dband, dyear = common.get_band_from_pindex(dam)
-        data = {"pindex": pindex, "band": band, "year": year, "sex": sex,
-                "show": int(visible), "sire": sband, "yearsire": syear,
-                "dam": dband, "yeardam": dyear}
+        data = get_empty_pigeon_data(pindex, sex, visible, sire, dam)
         rowid = database.add_pigeon(data)
         data.update({"Pigeonskey": rowid, "active": 1, "colour": "", "name": "",
                      "strain": "", "loft": "", "image": "", "extra1": "", "extra2": "",
@@ -86,17 +188,62 @@ class PigeonParser(object):
         if old_pindex is not None and old_pindex != pindex:
             self.pigeons[pindex] = self.pigeons.pop(old_pindex)
         pobj = self.pigeons[pindex]
+        old_band = pobj.get_band()
         pobj.set_data(**database.get_pigeon_data(pindex))
+        self.index.update(pobj, old_pindex)
+        self.filter_index.update(pobj, old_pindex)
+        if pobj.get_band() != old_band:
+            # The database changed the parents of the children as well
+            for child in self.pigeons.itervalues():
+                if child.get_sire() == old_band:
+                    child.sire, child.yearsire = pobj.get_band()
+                if child.get_dam() == old_band:
+                    child.dam, child.yeardam = pobj.get_band()
         return pobj
 
     def remove_pigeon(self, pindex):
         del self.pigeons[pindex]
+        self.index.remove(pindex)
+        self.filter_index.remove(pindex)
+
+    def search(self, query, limit=50):
+        """
+        Search pigeons by band, band/year, name, colour, strain, loft or
+        any of the extra fields
+
+        @param query: The search string
+        @param limit: Maximum number of results
+        @return: List of Pigeon objects, best matches first
+        """
+
+        return [self.pigeons[pindex] for pindex in self.index.search(query, limit)]
 
 
 # Keep a global parser instance
 parser = PigeonParser()
 
 
+def get_empty_pigeon_data(pindex, sex, visible=True, sire="", dam=""):
+    """
+    Get the data to add a pigeon with only a band
+
+    @param pindex: The pindex of the pigeon
+    @param sex: The sex of the pigeon
+    @param visible: Show the pigeon in the list
+    @param sire: The pindex of the sire
+    @param dam: The pindex of the dam
+    """
+
+    if pindex == "":
+        raise ValueError
+    band, year = common.get_band_from_pindex(pindex)
+    sband, syear = common.get_band_from_pindex(sire)
+    dband, dyear = common.get_band_from_pindex(dam)
+    return {"pindex": pindex, "band": band, "year": year, "sex": sex,
+            "show": int(visible), "sire": sband, "yearsire": syear,
+            "dam": dband, "yeardam": dyear}
+
+
 class Pigeon(object):
     def set_data(self, Pigeonskey, pindex, band, year, sex, show, active, colour,
                  name, strain, loft, image, sire, yearsire, dam, yeardam,
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of Pigeon Planner.
+
+# Pigeon Planner is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Pigeon Planner is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Pigeon Planner.  If not, see <http://www.gnu.org/licenses/>
+
+"""
+Data of the reports, read from the database while the report is written
+"""
+
+
+import operator
+import itertools
+
+from pigeonplanner import database
+from pigeonplanner.core import common
+from pigeonplanner.core import config
+from pigeonplanner.core import pigeonparser
+
+
+SQL_OPERATORS = {operator.lt: "<",
+                 operator.le: "<=",
+                 operator.eq: "=",
+                 operator.ne: "!=",
+                 operator.ge: ">=",
+                 operator.gt: ">"}
+
+SQL_TYPES = {int: "INTEGER", float: "REAL"}
+
+# SQL expressions of the values the results can be filtered on
+RESULT_FILTERS = {"date": "date",
+                  "point": "point",
+                  "type": "type",
+                  "wind": "wind",
+                  "weather": "weather",
+                  "band": "substr(pindex, 1, length(pindex)-4)",
+                  "year": "substr(pindex, -4)",
+                  "place": "place",
+                  "out": "out",
+                  "coef": "CAST(place AS REAL) / out * :coef_multiplier",
+                  "sector": "sector",
+                  "category": "category"}
+
+# SQL expressions of the values the pigeons can be filtered on
+PIGEON_FILTERS = {"year": "year",
+                  "sex": "sex",
+                  "active": "active",
+                  "colour": "colour",
+                  "strain": "strain",
+                  "loft": "loft"}
+
+# SQL expressions to order the results on for the sortable columns, like the
+# result views sort them
+RESULT_ORDERS = {"date": ["date"],
+                 "point": ["point"],
+                 "type": ["type"],
+                 "wind": ["wind"],
+                 "windspeed": ["windspeed"],
+                 "weather": ["weather"],
+                 "temperature": ["temperature"],
+                 "band": [RESULT_FILTERS["band"]],
+                 "year": [RESULT_FILTERS["year"], RESULT_FILTERS["band"]],
+                 "place": ["place"],
+                 "out": ["out"],
+                 "coef": ["CAST(place AS REAL) / out"],
+                 "speed": ["speed"],
+                 "sector": ["sector"],
+                 "category": ["category"],
+                 "comment": ["comment"]}
+RESULT_ORDER = "date ASC, point ASC, place ASC, Resultkey ASC"
+
+# SQL expressions to order the pigeons on for the sortable columns, like the
+# pigeon list sorts them. The sex and status are sorted on their labels.
+PIGEON_ORDERS = {"band": ["band"],
+                 "year": ["year", "band"],
+                 "name": ["name"],
+                 "colour": ["colour"],
+                 "loft": ["loft"],
+                 "strain": ["strain"]}
+PIGEON_ORDER = "year ASC, band ASC"
+
+
+def get_conditions(items, expressions):
+    """
+    Turn filter items into SQL conditions
+
+    @param items: Iterable of TreeviewFilter items, the names being keys of
+                  expressions
+    @param expressions: Dict of filter names to SQL expressions
+    @return: Tuple of a list of conditions and a dict of parameters
+    """
+
+    conditions = []
+    params = {}
+    for number, item in enumerate(items):
+        expression = expressions[item.name]
+        if item.type in SQL_TYPES:
+            # Compare numbers as numbers, like the filter does
+            expression = "CAST(%s AS %s)" % (expression, SQL_TYPES[item.type])
+        param = "filter%s" % number
+        conditions.append("%s %s :%s" % (expression, SQL_OPERATORS[item.operator], param))
+        value = item.type(item.value)
+        if isinstance(value, str):
+            # The entries give UTF-8 encoded strings
+            value = value.decode("utf-8")
+        params[param] = value
+    return conditions, params
+
+def get_order(sort, expressions, default):
+    """
+    Turn the sort column of a view into an SQL order
+
+    @param sort: Tuple of the sort name, a key of expressions, and True to
+                 sort descending. None to use the default order.
+    @param expressions: Dict of sort names to lists of SQL expressions
+    @param default: The order of the rows that sort the same
+    """
+
+    if sort is None:
+        return default
+    name, descending = sort
+    direction = "DESC" if descending else "ASC"
+    return ", ".join(["%s %s" % (expression, direction)
+                      for expression in expressions[name]] + [default])
+
+def get_label_order(column, labels):
+    """
+    Get an SQL expression that orders an enum column on its labels
+
+    @param column: The column with the enum values
+    @param labels: List of the labels indexed by value
+    """
+
+    values = sorted(range(len(labels)), key=labels.__getitem__)
+    return "CASE %s %s END" % (column, " ".join(["WHEN %s THEN %s" % (value, rank)
+                                                 for rank, value in enumerate(values)]))
+
+def format_result(row):
+    """
+    Get a dict with the values of a RaceResults row and the formatted values
+    that are shown in the result views
+    """
+
+    result = dict(zip(row.keys(), row))
+    band, year = common.get_band_from_pindex(result["pindex"])
+    placestr, coef, coefstr = common.format_place_coef(result["place"], result["out"])
+    result.update(band=band, year=year, ring="%s / %s" % (band, year[2:]),
+                  placestr=placestr, coef=coef, coefstr=coefstr,
+                  speedstr=common.format_speed(result["speed"]))
+    return result
+
+
+class ResultsData(object):
+    """
+    The results for the results report and export. They're read from the
+    database each time the object is iterated over. Text is returned as UTF-8
+    encoded strings, like the values of the result views.
+    """
+
+    def __init__(self, filters=(), grouped=False, sort=None):
+        """
+        @param filters: TreeviewFilter items with the keys of RESULT_FILTERS
+        @param grouped: Yield a dict with the race and its results for each
+                        race instead of the results
+        @param sort: Tuple of a key of RESULT_ORDERS and True to sort
+                     descending, or None to order by date and racepoint.
+                     Grouped results can only be sorted on a race column.
+        """
+
+        self.filters = list(filters)
+        self.grouped = grouped
+        self.sort = sort
+
+    def __iter__(self):
+        conditions, params = get_conditions(self.filters, RESULT_FILTERS)
+        params["coef_multiplier"] = config.get("options.coef-multiplier")
+        rows = database.iter_report_rows(database.Tables.RACERESULTS, conditions, params,
+                                         get_order(self.sort, RESULT_ORDERS, RESULT_ORDER),
+                                         text_factory=str)
+        results = itertools.imap(format_result, rows)
+        if not self.grouped:
+            return results
+        return self._iter_races(results)
+
+    def _iter_races(self, results):
+        # Only the results of one race are kept in memory
+        for key, race_results in itertools.groupby(results, operator.itemgetter("date", "point")):
+            race_results = list(race_results)
+            race = dict((name, race_results[0][name])
+                        for name in database.Schema.RACE_COLUMNS)
+            yield {"race": race, "results": race_results}
+
+
+class PigeonsData(object):
+    """
+    The pigeons for the pigeons report, ordered like the pigeon list. They're
+    read from the database each time the object is iterated over.
+    """
+
+    def __init__(self, filters=(), show_all=False, sort=None):
+        """
+        @param filters: TreeviewFilter items with the keys of PIGEON_FILTERS
+        @param show_all: Include the hidden pigeons
+        @param sort: Tuple of a key of PIGEON_ORDERS, "sex" or "active" and
+                     True to sort descending, or None to order by year and band
+        """
+
+        self.filters = list(filters)
+        self.show_all = show_all
+        self.sort = sort
+
+    def __iter__(self):
+        conditions, params = get_conditions(self.filters, PIGEON_FILTERS)
+        if not self.show_all:
+            conditions.append("show=1")
+        orders = dict(PIGEON_ORDERS,
+                      sex=[get_label_order("sex", common.get_sex_labels())],
+                      active=[get_label_order("active", common.get_status_labels())])
+        order = get_order(self.sort, orders, PIGEON_ORDER)
+        for row in database.iter_report_rows(database.Tables.PIGEONS, conditions,
+                                             params, order):
+            pigeon = pigeonparser.Pigeon()
+            pigeon.set_data(**row)
+            yield pigeon
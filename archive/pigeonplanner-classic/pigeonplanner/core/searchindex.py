@@ -0,0 +1,341 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of Pigeon Planner.
+
+# Pigeon Planner is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Pigeon Planner is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Pigeon Planner.  If not, see <http://www.gnu.org/licenses/>
+
+"""
+In-memory search index over the pigeons
+"""
+
+
+import re
+import sqlite3
+import collections
+import logging
+logger = logging.getLogger(__name__)
+
+from pigeonplanner.core import common
+
+
+TEXT_COLUMNS = ["name", "colour", "strain", "loft",
+                "extra1", "extra2", "extra3", "extra4", "extra5", "extra6"]
+INSERT_SQL = ("INSERT INTO Search(rowid, %s) VALUES (?, %s)"
+              % (", ".join(TEXT_COLUMNS), ", ".join("?" * len(TEXT_COLUMNS))))
+
+_band_split = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_band(band):
+    """
+    Lowercase the band and strip all separators
+
+    @param band: The band number
+    """
+
+    return "".join(_band_split.split(band.lower()))
+
+def get_band_keys(band):
+    """
+    Get all keys a band can be found with. This is the complete band and
+    every part after a separator, so 'BE-1234567' can be found by typing
+    'be12' as well as '1234'.
+
+    @param band: The band number
+    """
+
+    parts = [part for part in _band_split.split(band.lower()) if part]
+    return set("".join(parts[index:]) for index in range(len(parts)))
+
+
+class BandTrie(object):
+    """
+    Prefix tree that maps band keys to pindexes. Each node is a dict of
+    characters to child nodes, the pindexes ending in a node are stored
+    under the None key.
+    """
+
+    def __init__(self):
+        self._root = {}
+
+    def clear(self):
+        self._root = {}
+
+    def add(self, key, pindex):
+        node = self._root
+        for char in key:
+            try:
+                node = node[char]
+            except KeyError:
+                child = {}
+                node[char] = child
+                node = child
+        try:
+            node[None].add(pindex)
+        except KeyError:
+            node[None] = set([pindex])
+
+    def remove(self, key, pindex):
+        node = self._root
+        path = []
+        for char in key:
+            try:
+                child = node[char]
+            except KeyError:
+                return
+            path.append((node, char))
+            node = child
+        pindexes = node.get(None)
+        if pindexes is None:
+            return
+        pindexes.discard(pindex)
+        if not pindexes:
+            del node[None]
+        # Prune the branches that don't lead to a pigeon anymore
+        for parent, char in reversed(path):
+            if parent[char]:
+                break
+            del parent[char]
+
+    def find(self, key):
+        """
+        Get the pindexes with exactly this key
+
+        @param key: A normalized band key
+        """
+
+        node = self._find_node(key)
+        if node is None:
+            return set()
+        return set(node.get(None, ()))
+
+    def iter_prefix(self, prefix):
+        """
+        Iterate over the pindexes of all keys starting with prefix. Shorter
+        keys, which are closer to what's typed, come first.
+
+        @param prefix: A normalized band key
+        """
+
+        node = self._find_node(prefix)
+        if node is None:
+            return
+        queue = collections.deque([node])
+        while queue:
+            node = queue.popleft()
+            for char in sorted(node):
+                if char is None:
+                    for pindex in sorted(node[None]):
+                        yield pindex
+                else:
+                    queue.append(node[char])
+
+    def _find_node(self, key):
+        node = self._root
+        for char in key:
+            try:
+                node = node[char]
+            except KeyError:
+                return None
+        return node
+
+
+class PigeonSearchIndex(object):
+    """
+    Search index with a band/year prefix trie and a full-text table over the
+    descriptive fields. The full-text table lives in its own in-memory SQLite
+    database and uses FTS5 when available, FTS4 otherwise.
+
+    The index is built from the given pigeons dict in chunks with build_step,
+    or all at once on the first search, so it doesn't slow down startup.
+    """
+
+    def __init__(self, pigeons):
+        self._pigeons = pigeons
+        self._pending = None
+        self._built = False
+        self._trie = BandTrie()
+        self._rowids = {}
+        self._pindexes = {}
+        self._next_rowid = 1
+        self._connection = sqlite3.connect(":memory:", isolation_level=None)
+        self._fts = None
+        for module in ("fts5", "fts4"):
+            try:
+                self._connection.execute("CREATE VIRTUAL TABLE Search USING %s(%s)"
+                                         % (module, ", ".join(TEXT_COLUMNS)))
+            except sqlite3.OperationalError:
+                continue
+            self._fts = module
+            break
+        else:
+            logger.warning("SQLite has no full-text search support")
+        logger.debug("Search index using %s", self._fts)
+
+    def invalidate(self):
+        """
+        Drop the index, it will be rebuilt from the pigeons when needed
+        """
+
+        self._pending = None
+        self._built = False
+        self._trie.clear()
+        self._rowids = {}
+        self._pindexes = {}
+        self._next_rowid = 1
+        if self._fts is not None:
+            self._connection.execute("DELETE FROM Search")
+
+    def build_step(self, chunksize=5000):
+        """
+        Index the next chunk of pigeons
+
+        @param chunksize: Number of pigeons to index in this step
+        @return: True if there are pigeons left to index
+        """
+
+        if self._built:
+            return False
+        if self._pending is None:
+            self._pending = self._pigeons.values()
+        chunk = self._pending[:chunksize]
+        del self._pending[:chunksize]
+        rows = [self._index_pigeon(pigeon) for pigeon in chunk]
+        if self._fts is not None:
+            self._connection.execute("BEGIN")
+            self._connection.executemany(INSERT_SQL, rows)
+            self._connection.execute("COMMIT")
+        if self._pending:
+            return True
+        self._pending = None
+        self._built = True
+        return False
+
+    def build(self):
+        while self.build_step():
+            pass
+
+    def add(self, pigeon):
+        if not self._built:
+            if self._pending is None:
+                # Nothing indexed yet, it'll be picked up by the build
+                return
+            self.build()
+        row = self._index_pigeon(pigeon)
+        if self._fts is not None:
+            self._connection.execute(INSERT_SQL, row)
+
+    def update(self, pigeon, old_pindex=None):
+        self.remove(old_pindex or pigeon.pindex)
+        self.add(pigeon)
+
+    def remove(self, pindex):
+        if not self._built:
+            if self._pending is None:
+                return
+            self.build()
+        self._unindex_pigeon(pindex)
+
+    def search(self, query, limit=50):
+        """
+        Search pigeons by band, band/year or any of the text fields.
+        Band matches are ranked first, exact matches before prefix matches.
+
+        @param query: The search string
+        @param limit: Maximum number of results
+        @return: List of pindexes
+        """
+
+        query = query.strip()
+        if not query:
+            return []
+        self.build()
+
+        if "/" in query:
+            band, year = query.rsplit("/", 1)
+            year = year.strip()
+        else:
+            band, year = query, ""
+        key = normalize_band(band)
+
+        results = []
+        seen = set()
+        def add_result(pindex):
+            if pindex in seen:
+                return
+            if year and not pindex[-4:].startswith(year):
+                return
+            seen.add(pindex)
+            results.append(pindex)
+
+        if key:
+            for pindex in sorted(self._trie.find(key)):
+                add_result(pindex)
+            for pindex in self._trie.iter_prefix(key):
+                if len(results) >= limit:
+                    break
+                add_result(pindex)
+
+        if len(results) < limit and not year:
+            for pindex in self._search_text(query, limit):
+                if len(results) >= limit:
+                    break
+                add_result(pindex)
+
+        return results[:limit]
+
+    # Internal methods
+    def _index_pigeon(self, pigeon):
+        pindex = pigeon.pindex
+        # Objects in a pending chunk may have been updated in the meantime
+        self._unindex_pigeon(pindex)
+        rowid = self._next_rowid
+        self._next_rowid += 1
+        self._rowids[pindex] = rowid
+        self._pindexes[rowid] = pindex
+        for key in get_band_keys(pigeon.ring):
+            self._trie.add(key, pindex)
+        return [rowid] + [getattr(pigeon, column) or "" for column in TEXT_COLUMNS]
+
+    def _unindex_pigeon(self, pindex):
+        try:
+            rowid = self._rowids.pop(pindex)
+        except KeyError:
+            return
+        del self._pindexes[rowid]
+        band, year = common.get_band_from_pindex(pindex)
+        for key in get_band_keys(band):
+            self._trie.remove(key, pindex)
+        if self._fts is not None:
+            self._connection.execute("DELETE FROM Search WHERE rowid=?", (rowid,))
+
+    def _search_text(self, query, limit):
+        if self._fts is None:
+            return []
+        terms = [term.replace('"', "") for term in query.split()]
+        terms = [term for term in terms if term]
+        if not terms:
+            return []
+        if self._fts == "fts5":
+            match = " ".join('"%s"*' % term for term in terms)
+            sql = "SELECT rowid FROM Search WHERE Search MATCH ? ORDER BY rank LIMIT ?"
+        else:
+            match = " ".join('"%s*"' % term for term in terms)
+            sql = "SELECT rowid FROM Search WHERE Search MATCH ? LIMIT ?"
+        try:
+            cursor = self._connection.execute(sql, (match, limit))
+        except sqlite3.OperationalError as exc:
+            logger.debug("Invalid search query '%s': %s", query, exc)
+            return []
+        return [self._pindexes[row[0]] for row in cursor]
@@ -20,6 +20,9 @@ from pigeonplanner.database.main import *
 
 session = DatabaseSession()
 
+from pigeonplanner.database.worker import DatabaseWorker
+worker = DatabaseWorker(session)
+
 from pigeonplanner.database.data import *
 from pigeonplanner.database.pigeon import *
 
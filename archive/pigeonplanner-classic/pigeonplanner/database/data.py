@@ -33,20 +33,24 @@ def get_address_data(data):
     session.cursor.execute("SELECT * FROM Addresses WHERE %s" % cols, data)
     return session.cursor.fetchone()
 
+@session.writes
 def add_address(data):
     sqldata = utils.build_sql_insert_cols(data)
     session.cursor.execute("INSERT INTO Addresses(%(columns)s) VALUES(%(values)s)" % sqldata, data)
     session.connection.commit()
     return session.cursor.lastrowid
 
+@session.writes
 def update_address(key, data):
     cols = utils.build_sql_cols(data)
     data["key"] = key
     session.cursor.execute("UPDATE Addresses SET %s WHERE Addresskey=:key" % cols, data)
     session.connection.commit()
 
+@session.writes
 def remove_address(key):
     session.cursor.execute("DELETE FROM Addresses WHERE Addresskey=?", (key,))
+    session.cursor.execute("DELETE FROM Distances WHERE address=?", (key,))
     session.connection.commit()
 
 ##############
@@ -60,43 +64,133 @@ def get_racepoint_data(racepoint):
     session.cursor.execute("SELECT * FROM Racepoints WHERE racepoint=?", (racepoint,))
     return session.cursor.fetchone()
 
+@session.writes
 def add_racepoint(data):
     sqldata = utils.build_sql_insert_cols(data)
     session.cursor.execute("INSERT OR IGNORE INTO Racepoints(%(columns)s) VALUES(%(values)s)" % sqldata, data)
     session.connection.commit()
-    return session.cursor.lastrowid
+    rowid = session.cursor.lastrowid
+    if session.cursor.rowcount > 0:
+        notify_data_changed(main.Tables.RACEPOINTS)
+    return rowid
 
+@session.writes
 def update_racepoint(racepoint, data):
     cols = utils.build_sql_cols(data)
     data["racepoint"] = racepoint
     session.cursor.execute("UPDATE Racepoints SET %s WHERE racepoint=:racepoint" % cols, data)
     session.connection.commit()
 
+##############
+##  Distances
+##############
+def get_all_distances():
+    session.cursor.execute("SELECT address, racepoint, distance FROM Distances")
+    return session.cursor.fetchall()
+
+def get_distance(address, racepoint):
+    session.cursor.execute("SELECT distance FROM Distances WHERE address=? AND racepoint=?",
+                           (address, racepoint))
+    row = session.cursor.fetchone()
+    return None if row is None else row[0]
+
+@session.writes
+def set_distances(rows, addresses=None, racepoints=None):
+    """
+    Replace the distances of the given lofts and racepoints in one transaction
+
+    @param rows: Iterable of (address key, racepoint, distance) tuples
+    @param addresses: List of address keys to replace, None for all
+    @param racepoints: List of racepoints to replace, None for all
+    """
+
+    where = []
+    values = []
+    for column, keys in (("address", addresses), ("racepoint", racepoints)):
+        if keys is not None:
+            where.append("%s IN (%s)" % (column, ", ".join("?" * len(keys))))
+            values.extend(keys)
+    sql = "DELETE FROM Distances"
+    if where:
+        sql += " WHERE " + utils.AND.join(where)
+    try:
+        session.cursor.execute(sql, values)
+        session.cursor.executemany("INSERT INTO Distances(address, racepoint, distance) "
+                                   "VALUES(?, ?, ?)", rows)
+    except:
+        session.connection.rollback()
+        raise
+    session.connection.commit()
+
 ##############
 ##  Data
 ##############
-def get_all_data(table):
+_data_callbacks = []
+
+def connect_data_changed(callback):
+    """
+    Call callback with the table name after items were added to or removed
+    from a data table
+    """
+
+    _data_callbacks.append(callback)
+
+def disconnect_data_changed(callback):
+    """
+    Remove a callback added with connect_data_changed
+    """
+
+    _data_callbacks.remove(callback)
+
+def notify_data_changed(table):
+    """
+    Drop the cached items of a data table and call the callbacks, used after
+    items were added or removed
+    """
+
+    session.data_cache.pop(table, None)
+    for callback in _data_callbacks:
+        callback(table)
+
+def _get_data_column(table):
     try:
-        column = main.Schema.get_column_names(table)[1]
+        return main.Schema.get_column_names(table)[1]
     except KeyError:
         raise ValueError("Invalid table name '%s'" % table)
-    session.cursor.execute("SELECT %s FROM %s ORDER BY %s ASC" % (column, table, column))
-    return [row[0] for row in session.cursor.fetchall()]
 
-def add_data(table, item):
-    if not item: return
+def get_all_data(table):
+    """
+    Get the sorted items of a data table. They're read once and kept until
+    items are added or removed.
+
+    @param table: One of the data tables
+    @return: A new list of the items
+    """
+
     try:
-        column = main.Schema.get_column_names(table)[1]
+        items = session.data_cache[table]
     except KeyError:
-        raise ValueError("Invalid table name '%s'" % table)
+        column = _get_data_column(table)
+        session.cursor.execute("SELECT %s FROM %s ORDER BY %s ASC" % (column, table, column))
+        items = session.data_cache[table] = [row[0] for row in session.cursor.fetchall()]
+    return list(items)
+
+@session.writes
+def add_data(table, item):
+    if not item: return
+    column = _get_data_column(table)
     session.cursor.execute("INSERT OR IGNORE INTO %s(%s) VALUES(?)" % (table, column), (item,))
     session.connection.commit()
+    if session.cursor.rowcount > 0:
+        notify_data_changed(table)
 
+@session.writes
 def remove_data(table, item):
-    try:
-        column = main.Schema.get_column_names(table)[1]
-    except KeyError:
-        raise ValueError("Invalid table name '%s'" % table)
+    column = _get_data_column(table)
     session.cursor.execute("DELETE FROM %s WHERE %s=?" % (table, column), (item,))
+    changed = session.cursor.rowcount > 0
+    if table == main.Tables.RACEPOINTS:
+        session.cursor.execute("DELETE FROM Distances WHERE racepoint=?", (item,))
     session.connection.commit()
-
+    if changed:
+        notify_data_changed(table)
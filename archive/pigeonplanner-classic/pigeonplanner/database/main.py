@@ -19,7 +19,10 @@
 import os
 import sys
 import shutil
+import struct
 import logging
+import functools
+import threading
 logger = logging.getLogger(__name__)
 import sqlite3
 sqlite3.register_adapter(str, lambda s: s.decode("utf-8"))
@@ -28,34 +31,110 @@ from pigeonplanner.core import const
 from .schemas import Tables, Schema
 
 
-__all__ = ["DatabaseSession", "MigrationError", "InvalidValueError", "Tables", "Schema"]
+__all__ = ["DatabaseSession", "MigrationError", "InvalidValueError", "DatabaseLockedError",
+           "Tables", "Schema"]
 
+# Seconds a write waits for a lock that's held by another connection
+BUSY_TIMEOUT = 5.0
 
 
 class MigrationError(Exception): pass
 class InvalidValueError(Exception): pass
+class DatabaseLockedError(Exception): pass
 
 
 class DatabaseSession(object):
     def __init__(self):
         self.dbfile = None
-        self.connection = None
-        self.cursor = None
+        self._connection = None
+        self._cursor = None
+        # Connections of other threads, see open_thread_connection
+        self._local = threading.local()
+        # Sorted items of the data tables, see database.get_all_data
+        self.data_cache = {}
+
+    @property
+    def connection(self):
+        return getattr(self._local, "connection", self._connection)
+
+    @property
+    def cursor(self):
+        return getattr(self._local, "cursor", self._cursor)
 
     def open(self, dbfile=None):
         self.dbfile = dbfile or const.DATABASE
+        self.data_cache = {}
         self.is_new_db = not os.path.exists(self.dbfile)
-        self.connection, self.cursor = self.__db_connect()
+        self._connection, self._cursor = self.__db_connect()
+        # With a write-ahead log the reads of the database worker don't block
+        # the writes of the main thread. The mode is stored in the file.
+        self._cursor.execute("PRAGMA journal_mode=WAL")
 
         if self.is_new_db:
             Schema.create_new(self)
 
     def close(self):
-        self.connection.close()
+        if self._connection is None:
+            return
+        self._connection.close()
+        self._connection = self._cursor = None
+
+    def checkpoint(self):
+        """
+        Copy the changes in the write-ahead log to the database file, so the
+        file can be copied on its own. Closing the database does this as well.
+        """
+
+        if self._connection is None:
+            return
+        self._connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def writes(self, func):
+        """
+        Decorator for the functions that write to the database. When the
+        database stays locked by another connection, the changes of the
+        function are rolled back and DatabaseLockedError is raised.
+        """
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            except sqlite3.OperationalError as exc:
+                # The sqlite3 module of Python 2 doesn't give the error code
+                if str(exc) != "database is locked":
+                    raise
+                logger.error("Database write failed: %s" % exc)
+                self.connection.rollback()
+                raise DatabaseLockedError(exc)
+        return wrapper
+
+    def open_thread_connection(self):
+        """
+        Open a connection to the current database for the calling thread. The
+        database functions that are called in this thread use it instead of
+        the connection of the main thread. An open connection to another
+        database file is closed first.
+
+        @return: The thread's connection
+        """
+
+        if getattr(self._local, "dbfile", None) == self.dbfile:
+            return self._local.connection
+        self.close_thread_connection()
+        self._local.connection, self._local.cursor = self.__db_connect()
+        self._local.dbfile = self.dbfile
+        return self._local.connection
+
+    def close_thread_connection(self):
+        if getattr(self._local, "dbfile", None) is None:
+            return
+        self._local.connection.close()
+        del self._local.connection, self._local.cursor, self._local.dbfile
 
     def __db_connect(self):
         try:
-            conn = sqlite3.connect(self.dbfile,
+            conn = sqlite3.connect(self.dbfile, timeout=BUSY_TIMEOUT,
                             detect_types=sqlite3.PARSE_DECLTYPES|sqlite3.PARSE_COLNAMES)
         except Exception as e:
             logger.critical("Could not connect to database")
@@ -70,6 +149,8 @@ class DatabaseSession(object):
             sys.exit()
 
         conn.row_factory = sqlite3.Row
+        # Foreign keys are only enforced when they're enabled for each connection
+        conn.execute("PRAGMA foreign_keys=ON")
         return (conn, conn.cursor())
 
     ##############
@@ -114,6 +195,25 @@ class DatabaseSession(object):
         self.cursor.execute("PRAGMA user_version=%s" % version)
         self.connection.commit()
 
+    def get_fingerprint(self):
+        """
+        Get values that change whenever the database file is written, used to
+        check if data that's kept outside the database is still valid. The
+        file header holds the change counter and the user version. Changes
+        that aren't checkpointed yet are only in the write-ahead log.
+        """
+
+        stat = os.stat(self.dbfile)
+        with open(self.dbfile, "rb") as dbfile:
+            header = dbfile.read(100)
+        counter, = struct.unpack(">I", header[24:28])
+        version, = struct.unpack(">I", header[60:64])
+        try:
+            walsize = os.path.getsize(self.dbfile + "-wal")
+        except OSError:
+            walsize = 0
+        return (counter, version, stat.st_size, stat.st_mtime, walsize)
+
     def optimize_database(self):
         self.cursor.execute("VACUUM")
 
@@ -139,6 +239,7 @@ class DatabaseSession(object):
         backupdb = self.dbfile + "_bckp"
         if db_version < Schema.VERSION:
             # Make a backup of the database before migrating
+            self.checkpoint()
             shutil.copy(self.dbfile, backupdb)
 
         while db_version < Schema.VERSION:
@@ -149,13 +250,19 @@ class DatabaseSession(object):
             except:
                 # Catch any exception during migration!
                 logger.error("Database migration failed!", exc_info=True)
+                # Closing moves the migrated changes out of the write-ahead
+                # log, so they're overwritten by the backup as well
+                self.close()
                 shutil.copy(backupdb, self.dbfile)
                 os.remove(backupdb)
+                self.open(self.dbfile)
                 raise MigrationError
 
             db_version += 1
             changed = True
-        self.set_database_version(db_version)
+        if changed:
+            # Setting it writes to the file, even if it's the same version
+            self.set_database_version(db_version)
 
         try:
             os.remove(backupdb)
@@ -22,7 +22,50 @@ from pigeonplanner.database import main
 from pigeonplanner.database import utils
 from pigeonplanner.database import session
 from pigeonplanner.database.main import InvalidValueError
-
+from pigeonplanner.database.data import notify_data_changed
+
+
+# The tables that belong to a pigeon refer to it by its Pigeonskey in the
+# pigeon column. The functions take and return the pindex, it's turned into
+# the key in SQL. Results keep the pindex as well, it's still shown after
+# the pigeon is removed.
+PIGEON_KEY = "(SELECT Pigeonskey FROM Pigeons WHERE pindex=%s)"
+
+def _build_insert_cols(data, keep_pindex=False):
+    """
+    Like utils.build_sql_insert_cols, the pindex is stored as the key of the pigeon
+
+    @param keep_pindex: Store the pindex itself as well
+    """
+
+    cols = []
+    values = []
+    for key in data.keys():
+        if key == "pindex":
+            cols.append("pigeon")
+            values.append(PIGEON_KEY % ":pindex")
+            if not keep_pindex:
+                continue
+        cols.append(key)
+        values.append(":%s" % key)
+    return {"columns": ", ".join(cols), "values": ", ".join(values)}
+
+def _build_cols(data, delimiter=", ", keep_pindex=False):
+    """
+    Like utils.build_sql_cols, the pindex is compared to or stored as the key
+    of the pigeon
+
+    @param keep_pindex: Store the pindex itself as well
+    """
+
+    cols = []
+    for key in data.keys():
+        if key == "pindex":
+            cols.append("pigeon=%s" % (PIGEON_KEY % ":pindex"))
+            if not keep_pindex:
+                continue
+        cols.append("%s=:%s" % (key, key))
+    return delimiter.join(cols)
 
 ##############
 ##  Pigeons
@@ -35,6 +78,7 @@ def get_pigeon_data(pindex):
     session.cursor.execute("SELECT * FROM Pigeons WHERE pindex=?", (pindex,))
     return session.cursor.fetchone()
 
+@session.writes
 def add_pigeon(data):
     sqldata = utils.build_sql_insert_cols(data)
     try:
@@ -44,6 +88,34 @@ def add_pigeon(data):
     session.connection.commit()
     return session.cursor.lastrowid
 
+@session.writes
+def add_pigeons(rows):
+    """
+    Insert several pigeons in one transaction
+
+    @param rows: List of dicts with the pigeon data, all with the same keys
+    @return: The new rows
+    """
+
+    last_key = get_last_pigeon_key()
+    sqldata = utils.build_sql_insert_cols(rows[0])
+    try:
+        session.cursor.executemany("INSERT INTO Pigeons(%(columns)s) VALUES(%(values)s)" % sqldata, rows)
+    except sqlite3.IntegrityError as exc:
+        session.connection.rollback()
+        raise InvalidValueError(exc)
+    session.connection.commit()
+    return get_pigeons_after(last_key)
+
+def get_last_pigeon_key():
+    session.cursor.execute("SELECT IFNULL(MAX(Pigeonskey), 0) FROM Pigeons")
+    return session.cursor.fetchone()[0]
+
+def get_pigeons_after(key):
+    session.cursor.execute("SELECT * FROM Pigeons WHERE Pigeonskey>? ORDER BY Pigeonskey", (key,))
+    return session.cursor.fetchall()
+
+@session.writes
 def update_pigeon(pindex, data):
     cols = utils.build_sql_cols(data)
     data["pindex_old"] = pindex
@@ -53,6 +125,7 @@ def update_pigeon(pindex, data):
         raise InvalidValueError(exc)
     session.connection.commit()
 
+@session.writes
 def remove_pigeon(pindex):
     session.cursor.execute("DELETE FROM Pigeons WHERE pindex=?", (pindex,))
     session.connection.commit()
@@ -74,151 +147,317 @@ def get_all_images():
     session.cursor.execute("SELECT pindex, band, year, image FROM Pigeons")
     return session.cursor.fetchall()
 
+def get_all_pindexes():
+    session.cursor.execute("SELECT pindex FROM Pigeons")
+    return set(row[0] for row in session.cursor.fetchall())
+
 ##############
 ##  Status
 ##############
 def get_status(table, pindex):
     try:
-        columns = ", ".join(main.Schema.get_column_names(table))
+        columns = ", ".join("%s.%s" % (table, column)
+                            for column in main.Schema.get_column_names(table))
     except KeyError:
         raise ValueError("Invalid table name '%s'" % table)
-    session.cursor.execute("SELECT %s FROM %s WHERE pindex=?" % (columns, table), (pindex,))
+    session.cursor.execute("SELECT %s, Pigeons.pindex FROM %s JOIN Pigeons "
+                           "ON %s.pigeon=Pigeons.Pigeonskey WHERE Pigeons.pindex=?"
+                           % (columns, table, table), (pindex,))
     return session.cursor.fetchone()
 
+@session.writes
 def add_status(table, data):
     if not table in main.Schema.get_table_names():
         raise ValueError("Invalid table name '%s'" % table)
-    sqldata = utils.build_sql_insert_cols(data)
+    sqldata = _build_insert_cols(data)
     sqldata["table"] = table
     session.cursor.execute("INSERT INTO %(table)s(%(columns)s) VALUES(%(values)s)" % sqldata, data)
     session.connection.commit()
     return session.cursor.lastrowid
 
+@session.writes
 def update_status(table, pindex, data):
+    # The status stays with the same pigeon
+    data = dict((key, value) for key, value in data.items() if key != "pindex")
     cols = utils.build_sql_cols(data)
     data["pindex_old"] = pindex
-    session.cursor.execute("UPDATE %s SET %s WHERE pindex=:pindex_old" % (table, cols), data)
+    session.cursor.execute("UPDATE %s SET %s WHERE pigeon=%s"
+                           % (table, cols, PIGEON_KEY % ":pindex_old"), data)
     session.connection.commit()
 
+@session.writes
 def remove_status(table, pindex):
     if not table in main.Schema.get_table_names():
         raise ValueError("Invalid table name '%s'" % table)
-    session.cursor.execute("DELETE FROM %s WHERE pindex=?" % table, (pindex,))
+    session.cursor.execute("DELETE FROM %s WHERE pigeon=%s" % (table, PIGEON_KEY % "?"), (pindex,))
     session.connection.commit()
 
 ##############
 ##  Results
 ##############
+# The race data is stored once in the Races table. Results are passed and
+# returned with the race data included, like the rows of the RaceResults view.
 def result_exists(data):
-    cols = utils.build_sql_cols(data, delimiter=utils.AND)
-    session.cursor.execute("SELECT EXISTS(SELECT 1 FROM Results WHERE %s LIMIT 1)" % cols, data)
+    cols = _build_cols(data, delimiter=utils.AND)
+    session.cursor.execute("SELECT EXISTS(SELECT 1 FROM RaceResults WHERE %s LIMIT 1)" % cols, data)
     return bool(session.cursor.fetchone()[0])
 
 def pigeon_has_results(pindex):
-    session.cursor.execute("SELECT EXISTS(SELECT 1 FROM Results WHERE pindex=? LIMIT 1)", (pindex,))
+    session.cursor.execute("SELECT EXISTS(SELECT 1 FROM Results WHERE pigeon=%s LIMIT 1)"
+                           % PIGEON_KEY % "?", (pindex,))
     return bool(session.cursor.fetchone()[0])
 
 def get_all_results():
-    session.cursor.execute("SELECT * FROM Results")
+    session.cursor.execute("SELECT * FROM RaceResults")
     return session.cursor.fetchall()
 
 def get_all_races():
-    session.cursor.execute("SELECT * FROM Results GROUP BY date, point ORDER BY date ASC")
+    session.cursor.execute("SELECT * FROM Races ORDER BY date ASC, point ASC")
     return session.cursor.fetchall()
 
 def get_races_for_pigeon(pindex):
-    session.cursor.execute("SELECT * FROM Results WHERE pindex=? GROUP BY date, point ORDER BY date ASC", (pindex,))
+    session.cursor.execute("SELECT * FROM Races WHERE Racekey IN "
+                           "(SELECT race FROM Results WHERE pigeon=%s) ORDER BY date ASC, point ASC"
+                           % PIGEON_KEY % "?", (pindex,))
     return session.cursor.fetchall()
 
 def get_race_info(date, racepoint):
-    session.cursor.execute("SELECT * FROM Results WHERE date=? AND point=? LIMIT 1", (date, racepoint))
+    session.cursor.execute("SELECT * FROM Races WHERE date=? AND point=?", (date, racepoint))
     return session.cursor.fetchone()
 
 def get_results_for_data(data):
-    cols = utils.build_sql_cols(data, delimiter=utils.AND)
-    session.cursor.execute("SELECT * FROM Results WHERE %s ORDER BY place ASC" % cols, data)
+    cols = _build_cols(data, delimiter=utils.AND)
+    session.cursor.execute("SELECT * FROM RaceResults WHERE %s ORDER BY place ASC" % cols, data)
     return session.cursor.fetchall()
 
+@session.writes
 def add_result(data):
-    sqldata = utils.build_sql_insert_cols(data)
-    session.cursor.execute("INSERT INTO Results(%(columns)s) VALUES(%(values)s)" % sqldata, data)
+    """
+    Add a result, the race is added when it doesn't exist yet. The race data
+    of an existing race is only changed for the values that are filled in.
+
+    @param data: Dict with the result and race data
+    """
+
+    racedata, resultdata = _split_result_data(data)
+    resultdata["race"] = _get_race_key(racedata, dict((key, value) for key, value
+                                                      in racedata.items() if value))
+    sqldata = _build_insert_cols(resultdata, keep_pindex=True)
+    session.cursor.execute("INSERT INTO Results(%(columns)s) VALUES(%(values)s)" % sqldata, resultdata)
     session.connection.commit()
     return session.cursor.lastrowid
 
-def update_result_for_pindex(pindex, data):
-    cols = utils.build_sql_cols(data)
-    data["pindex_old"] = pindex
-    session.cursor.execute("UPDATE Results SET %s WHERE pindex=:pindex_old" % cols, data)
-    session.connection.commit()
-
+@session.writes
 def update_result_for_key(key, data):
-    cols = utils.build_sql_cols(data)
-    data["key"] = key
-    session.cursor.execute("UPDATE Results SET %s WHERE Resultkey=:key" % cols, data)
+    """
+    Update a result. The result is moved to another race when the date or
+    racepoint changes, the race data is changed for all results of the race.
+
+    @param key: The Resultkey
+    @param data: Dict with the result and race data
+    """
+
+    racedata, resultdata = _split_result_data(data)
+    session.cursor.execute("SELECT race FROM Results WHERE Resultkey=?", (key,))
+    old_race = session.cursor.fetchone()[0]
+    if racedata:
+        session.cursor.execute("SELECT * FROM Races WHERE Racekey=?", (old_race,))
+        race = dict(session.cursor.fetchone())
+        del race["Racekey"]
+        race.update(racedata)
+        resultdata["race"] = _get_race_key(race, racedata)
+    if resultdata:
+        cols = _build_cols(resultdata, keep_pindex=True)
+        resultdata["key"] = key
+        session.cursor.execute("UPDATE Results SET %s WHERE Resultkey=:key" % cols, resultdata)
+    _remove_unused_races([old_race])
     session.connection.commit()
 
+@session.writes
 def update_result_as_race(date, racepoint, type_, wind, windspeed, weather, temperature):
-    session.cursor.execute("UPDATE Results SET type=?, wind=?, windspeed=?, weather=?, temperature=? WHERE date=? AND point=?", (type_, wind, windspeed, weather, temperature, date, racepoint))
+    session.cursor.execute("UPDATE Races SET type=?, wind=?, windspeed=?, weather=?, temperature=? WHERE date=? AND point=?", (type_, wind, windspeed, weather, temperature, date, racepoint))
     session.connection.commit()
 
+@session.writes
 def remove_result(key):
+    session.cursor.execute("SELECT race FROM Results WHERE Resultkey=?", (key,))
+    races = [row[0] for row in session.cursor.fetchall()]
     session.cursor.execute("DELETE FROM Results WHERE Resultkey=?", (key,))
+    _remove_unused_races(races)
     session.connection.commit()
 
+@session.writes
 def remove_result_for_pigeon(pindex):
-    session.cursor.execute("DELETE FROM Results WHERE pindex=?", (pindex,))
+    session.cursor.execute("SELECT DISTINCT race FROM Results WHERE pigeon=%s"
+                           % PIGEON_KEY % "?", (pindex,))
+    races = [row[0] for row in session.cursor.fetchall()]
+    session.cursor.execute("DELETE FROM Results WHERE pigeon=%s" % PIGEON_KEY % "?", (pindex,))
+    _remove_unused_races(races)
     session.connection.commit()
 
 def count_results():
     session.cursor.execute("SELECT COUNT(*) FROM Results")
     return session.cursor.fetchone()[0]
 
+def _split_result_data(data):
+    racedata = {}
+    resultdata = {}
+    for key, value in data.items():
+        if key in main.Schema.RACE_COLUMNS:
+            racedata[key] = value
+        else:
+            resultdata[key] = value
+    return racedata, resultdata
+
+def _get_race_key(race, update):
+    """
+    Get the key of the race with the date and point of the race dict. The
+    race is added if it doesn't exist, otherwise it's updated with the values
+    of the update dict.
+    """
+
+    session.cursor.execute("SELECT Racekey FROM Races WHERE date=? AND point=?",
+                           (race["date"], race["point"]))
+    row = session.cursor.fetchone()
+    if row is None:
+        sqldata = utils.build_sql_insert_cols(race)
+        session.cursor.execute("INSERT INTO Races(%(columns)s) VALUES(%(values)s)" % sqldata, race)
+        return session.cursor.lastrowid
+    update = dict((key, value) for key, value in update.items() if key not in ("date", "point"))
+    if update:
+        cols = utils.build_sql_cols(update)
+        update["key"] = row[0]
+        session.cursor.execute("UPDATE Races SET %s WHERE Racekey=:key" % cols, update)
+    return row[0]
+
+def _remove_unused_races(races):
+    session.cursor.executemany("DELETE FROM Races WHERE Racekey=:race AND NOT EXISTS "
+                               "(SELECT 1 FROM Results WHERE race=:race)",
+                               [{"race": race} for race in races])
+
 ##############
 ##  Medication
 ##############
+# The medication data is stored once in the Medication table, the pigeons
+# it's given to in the MedicationPigeons table.
 def pigeon_has_medication(pindex):
-    session.cursor.execute("SELECT EXISTS(SELECT 1 FROM Medication WHERE pindex=? LIMIT 1)", (pindex,))
+    session.cursor.execute("SELECT EXISTS(SELECT 1 FROM MedicationPigeons WHERE pigeon=%s LIMIT 1)"
+                           % PIGEON_KEY % "?", (pindex,))
     return bool(session.cursor.fetchone()[0])
 
 def get_pigeons_for_medid(medid):
-    session.cursor.execute("SELECT pindex FROM Medication WHERE medid=?", (medid,))
+    session.cursor.execute("SELECT Pigeons.pindex FROM MedicationPigeons JOIN Pigeons "
+                           "ON MedicationPigeons.pigeon=Pigeons.Pigeonskey WHERE medid=?", (medid,))
     return [row[0] for row in session.cursor.fetchall() if row[0]]
 
 def get_medication_for_pigeon(pindex):
-    session.cursor.execute("SELECT * FROM Medication WHERE pindex=?", (pindex,))
+    session.cursor.execute("SELECT Medication.*, Pigeons.pindex FROM MedicationPigeons "
+                           "JOIN Medication USING (medid) "
+                           "JOIN Pigeons ON MedicationPigeons.pigeon=Pigeons.Pigeonskey "
+                           "WHERE Pigeons.pindex=?", (pindex,))
     return session.cursor.fetchall()
 
 def get_medication_for_id(ID):
     session.cursor.execute("SELECT * FROM Medication WHERE medid=?", (ID,))
     return session.cursor.fetchone()
 
+@session.writes
 def add_medication(data):
-    sqldata = utils.build_sql_insert_cols(data)
-    session.cursor.execute("INSERT INTO Medication(%(columns)s) VALUES(%(values)s)" % sqldata, data)
+    """
+    Add a medication for a pigeon
+
+    @param data: Dict with the medication data and the pindex
+    """
+
+    data = data.copy()
+    pindex = data.pop("pindex")
+    _add_medication_data(data)
+    session.cursor.execute("INSERT INTO MedicationPigeons(medid, pigeon) VALUES(?, %s)"
+                           % PIGEON_KEY % "?", (data["medid"], pindex))
     session.connection.commit()
     return session.cursor.lastrowid
 
-def update_medication(medid, data):
+@session.writes
+def add_medication_for_pigeons(data, pindexes):
+    """
+    Add a medication for all pigeons in one transaction
+
+    @param data: Dict with the medication data, without pindex
+    @param pindexes: The pigeons to add the medication to
+    """
+
+    if not pindexes:
+        return
+    try:
+        _add_medication_data(data)
+        session.cursor.executemany("INSERT INTO MedicationPigeons(medid, pigeon) VALUES(?, %s)"
+                                   % PIGEON_KEY % "?",
+                                   [(data["medid"], pindex) for pindex in pindexes])
+    except sqlite3.Error:
+        session.connection.rollback()
+        raise
+    session.connection.commit()
+
+@session.writes
+def update_medication_pigeons(medid, data, added, removed):
+    """
+    Update a medication and the pigeons it's given to in one transaction
+
+    @param medid: The medication id
+    @param data: Dict with the medication data
+    @param added: The pigeons to add the medication to
+    @param removed: The pigeons to remove the medication from
+    """
+
     cols = utils.build_sql_cols(data)
-    data["medid"] = medid
-    session.cursor.execute("UPDATE Medication SET %s WHERE medid=:medid" % cols, data)
+    try:
+        session.cursor.executemany("DELETE FROM MedicationPigeons WHERE medid=? AND pigeon=%s"
+                                   % PIGEON_KEY % "?",
+                                   [(medid, pindex) for pindex in removed])
+        session.cursor.executemany("INSERT INTO MedicationPigeons(medid, pigeon) VALUES(?, %s)"
+                                   % PIGEON_KEY % "?",
+                                   [(medid, pindex) for pindex in added])
+        session.cursor.execute("UPDATE Medication SET %s WHERE medid=:medid" % cols,
+                               dict(data, medid=medid))
+    except sqlite3.Error:
+        session.connection.rollback()
+        raise
     session.connection.commit()
 
-def update_medication_for_pindex(pindex, data):
+@session.writes
+def update_medication(medid, data):
     cols = utils.build_sql_cols(data)
-    data["pindex_old"] = pindex
-    session.cursor.execute("UPDATE Medication SET %s WHERE pindex=:pindex_old" % cols, data)
+    data["medid"] = medid
+    session.cursor.execute("UPDATE Medication SET %s WHERE medid=:medid" % cols, data)
     session.connection.commit()
 
+@session.writes
 def remove_medication(data):
-    cols = utils.build_sql_cols(data, delimiter=utils.AND)
-    session.cursor.execute("DELETE FROM Medication WHERE %s" % cols, data)
+    """
+    Remove the medication of the pigeons. The medication data is removed
+    when it's no longer given to any pigeon.
+
+    @param data: Dict with the medid, the pindex or both
+    """
+
+    cols = _build_cols(data, delimiter=utils.AND)
+    session.cursor.execute("SELECT DISTINCT medid FROM MedicationPigeons WHERE %s" % cols, data)
+    medids = session.cursor.fetchall()
+    session.cursor.execute("DELETE FROM MedicationPigeons WHERE %s" % cols, data)
+    session.cursor.executemany("DELETE FROM Medication WHERE medid=:medid AND NOT EXISTS "
+                               "(SELECT 1 FROM MedicationPigeons WHERE medid=:medid)",
+                               [{"medid": row[0]} for row in medids])
     session.connection.commit()
 
 def count_medication_records_for_medid(medid):
-    session.cursor.execute("SELECT COUNT(*) FROM Medication WHERE medid=?", (medid,))
+    session.cursor.execute("SELECT COUNT(*) FROM MedicationPigeons WHERE medid=?", (medid,))
     return session.cursor.fetchone()[0]
 
+def _add_medication_data(data):
+    sqldata = utils.build_sql_insert_cols(data)
+    # The medication can be given to another pigeon later on
+    session.cursor.execute("INSERT OR IGNORE INTO Medication(%(columns)s) VALUES(%(values)s)" % sqldata, data)
+
 ##############
 ##  Breeding
 ##############
@@ -232,18 +471,21 @@ def get_breeding_for_key(key):
     session.cursor.execute("SELECT * FROM Breeding WHERE Breedingkey=?", (key,))
     return session.cursor.fetchone()
 
+@session.writes
 def add_breeding(data):
     sqldata = utils.build_sql_insert_cols(data)
     session.cursor.execute("INSERT INTO Breeding(%(columns)s) VALUES(%(values)s)" % sqldata, data)
     session.connection.commit()
     return session.cursor.lastrowid
 
+@session.writes
 def update_breeding(key, data):
     cols = utils.build_sql_cols(data)
     data["key"] = key
     session.cursor.execute("UPDATE Breeding SET %s WHERE Breedingkey=:key" % cols, data)
     session.connection.commit()
 
+@session.writes
 def remove_breeding(key):
     session.cursor.execute("DELETE FROM Breeding WHERE Breedingkey=?", (key,))
     session.connection.commit()
@@ -256,23 +498,235 @@ def count_breeding_records():
 ##  Media
 ##############
 def get_media_for_pigeon(pindex):
-    session.cursor.execute("SELECT * FROM Media WHERE pindex=?", (pindex,))
+    session.cursor.execute("SELECT Media.*, Pigeons.pindex FROM Media JOIN Pigeons "
+                           "ON Media.pigeon=Pigeons.Pigeonskey WHERE Pigeons.pindex=?", (pindex,))
     return session.cursor.fetchall()
 
+@session.writes
 def add_media(data):
-    sqldata = utils.build_sql_insert_cols(data)
+    sqldata = _build_insert_cols(data)
     session.cursor.execute("INSERT INTO Media(%(columns)s) VALUES(%(values)s)" % sqldata, data)
     session.connection.commit()
     return session.cursor.lastrowid
 
-def update_media_for_pindex(pindex, data):
-    cols = utils.build_sql_cols(data)
-    data["pindex_old"] = pindex
-    session.cursor.execute("UPDATE Media SET %s WHERE pindex=:pindex_old" % cols, data)
-    session.connection.commit()
-
+@session.writes
 def remove_media(data):
-    cols = utils.build_sql_cols(data, delimiter=utils.AND)
+    cols = _build_cols(data, delimiter=utils.AND)
     session.cursor.execute("DELETE FROM Media WHERE %s" %cols, data)
     session.connection.commit()
 
+
+##############
+##  Export
+##############
+def set_export_pigeons(pindexes):
+    """
+    Store the pigeons to export in a temporary table, which is used by
+    iter_table_rows when only the selected pigeons are exported.
+    """
+
+    session.cursor.execute("CREATE TEMP TABLE IF NOT EXISTS ExportPigeons(pindex TEXT PRIMARY KEY)")
+    session.cursor.execute("DELETE FROM ExportPigeons")
+    session.cursor.executemany("INSERT OR IGNORE INTO ExportPigeons(pindex) VALUES(?)",
+                               ((pindex,) for pindex in pindexes))
+    session.connection.commit()
+
+def iter_table_rows(table, columns, pindex_columns=None, chunksize=1000, text_factory=None):
+    """
+    Iterate over the rows of a table, fetching them in chunks from a separate
+    cursor so the whole table is never loaded in memory.
+
+    @param table: Name of the table
+    @param columns: List of columns to select
+    @param pindex_columns: Only include rows where one of these columns
+                           holds a pigeon set with set_export_pigeons, see
+                           ExportTable for columns that refer to them
+                           through another table
+    @param chunksize: Number of rows to fetch at once
+    @param text_factory: Type to return text as, str gives UTF-8 encoded
+                         strings which saves decoding and encoding the values
+    @return: Generator of row tuples
+    """
+
+    sql = _get_export_select(table, columns, pindex_columns)
+    return _iter_query_rows(sql, {}, chunksize, text_factory, True)
+
+def _iter_query_rows(sql, params, chunksize, text_factory, tuples):
+    connection = session.connection
+    default_factory = connection.text_factory
+    def fetch(method, *args):
+        # The text factory of the connection is used while rows are fetched.
+        # Only change it for this cursor, between yields others may use it.
+        connection.text_factory = text_factory or default_factory
+        try:
+            return method(*args)
+        finally:
+            connection.text_factory = default_factory
+
+    cursor = connection.cursor()
+    if tuples:
+        # Plain tuples are a lot cheaper than Row objects
+        cursor.row_factory = None
+    try:
+        fetch(cursor.execute, sql, params)
+        while True:
+            rows = fetch(cursor.fetchmany, chunksize)
+            if not rows:
+                break
+            for row in rows:
+                yield row
+    finally:
+        cursor.close()
+
+def attach_export_database(dbfile):
+    """
+    Attach a new database to copy tables to with copy_table_rows. There's
+    nothing to recover when the export fails, so journaling is turned off.
+    """
+
+    session.connection.commit()
+    session.cursor.execute("ATTACH DATABASE ? AS export", (dbfile,))
+    session.cursor.execute("PRAGMA export.journal_mode=OFF")
+    session.cursor.execute("PRAGMA export.synchronous=OFF")
+
+def detach_export_database():
+    session.connection.commit()
+    session.cursor.execute("DETACH DATABASE export")
+
+def copy_table_rows(table, columns, pindex_columns=None):
+    """
+    Create the table in the attached export database and copy the rows.
+    The copy is done by SQLite, the rows never go through Python.
+
+    @param table: Name of the table
+    @param columns: List of columns to copy
+    @param pindex_columns: See iter_table_rows
+    """
+
+    columns_sql = ", ".join(" ".join(column) for column in _get_export_columns(table)
+                            if column[0] in columns)
+    session.cursor.execute("CREATE TABLE export.%s (%s)" % (table, columns_sql))
+    sql = "INSERT INTO export.%s(%s) %s" % (table, ", ".join(columns),
+                                           _get_export_select(table, columns, pindex_columns))
+    session.cursor.execute(sql)
+    session.connection.commit()
+
+# The key of a pigeon means nothing outside the database, the tables that
+# refer to a pigeon by key are exported with its pindex instead.
+PINDEX_COLUMN = ("pindex", "TEXT", "NOT NULL")
+
+def _refers_by_key(table):
+    columns = main.Schema.get_column_names(table)
+    return "pigeon" in columns and not "pindex" in columns
+
+def _get_export_columns(table):
+    if not _refers_by_key(table):
+        return main.Schema.get_columns(table)
+    return [PINDEX_COLUMN if column[0] == "pigeon" else column
+            for column in main.Schema.get_columns(table)]
+
+def _get_export_select(table, columns, pindex_columns):
+    if not table in main.Schema.get_table_names() + main.Schema.get_view_names():
+        raise ValueError("Invalid table name '%s'" % table)
+    values = []
+    for column in columns:
+        if column == "pindex" and _refers_by_key(table):
+            column = ("(SELECT pindex FROM main.Pigeons WHERE Pigeonskey=%s.pigeon) AS pindex"
+                      % table)
+        values.append(column)
+    sql = "SELECT %s FROM main.%s" % (", ".join(values), table)
+    if pindex_columns:
+        sql += " WHERE " + utils.OR.join(_get_export_condition(table, column)
+                                         for column in pindex_columns)
+    return sql
+
+def _get_export_condition(table, column):
+    condition = "%s IN (SELECT pindex FROM temp.ExportPigeons)"
+    if isinstance(column, tuple):
+        column, other = column
+        if not other in main.Schema.get_table_names():
+            raise ValueError("Invalid table name '%s'" % other)
+        return "%s IN (SELECT %s FROM main.%s WHERE %s)" % (
+                    column, column, other, _get_export_condition(other, "pindex"))
+    if column == "pindex" and _refers_by_key(table):
+        return "pigeon IN (SELECT Pigeonskey FROM main.Pigeons WHERE %s)" % (condition % "pindex")
+    return condition % column
+
+##############
+##  Reports
+##############
+def iter_report_rows(table, conditions=None, params=None, order=None, chunksize=1000,
+                     text_factory=None):
+    """
+    Iterate over the rows of a table or view that match all conditions,
+    fetched in chunks from a separate cursor so they're never all in memory.
+
+    @param table: Name of the table or view
+    @param conditions: List of SQL conditions with named parameters
+    @param params: Dict with the values of the parameters
+    @param order: SQL to order the rows by
+    @param chunksize: Number of rows to fetch at once
+    @param text_factory: See iter_table_rows
+    @return: Generator of rows
+    """
+
+    if not table in main.Schema.get_table_names() + main.Schema.get_view_names():
+        raise ValueError("Invalid table name '%s'" % table)
+    sql = "SELECT * FROM %s" % table
+    if conditions:
+        sql += " WHERE " + utils.AND.join(conditions)
+    if order:
+        sql += " ORDER BY " + order
+    return _iter_query_rows(sql, params or {}, chunksize, text_factory, False)
+
+
+##############
+##  Import
+##############
+# Lookup tables that are filled with the values of the imported pigeons
+IMPORT_DATA_TABLES = ((main.Tables.COLOURS, "colour"),
+                      (main.Tables.STRAINS, "strain"),
+                      (main.Tables.LOFTS, "loft"))
+
+@session.writes
+def import_rows(chunks):
+    """
+    Insert rows into several tables in one transaction. Nothing is inserted
+    when one of the inserts fails. The lookup tables are filled with the
+    colours, strains and lofts of the new pigeons afterwards.
+
+    @param chunks: Iterable of (table, columns, rows) tuples, the rows are
+                   inserted with executemany
+    @return: Dict of table names to the number of inserted rows
+    """
+
+    # Don't roll back anything that was done before the import
+    session.connection.commit()
+    last_key = get_last_pigeon_key()
+    counts = {}
+    try:
+        for table, columns, rows in chunks:
+            if not table in main.Schema.get_table_names() + main.Schema.get_view_names():
+                raise ValueError("Invalid table name '%s'" % table)
+            sql = "INSERT INTO %s(%s) VALUES(%s)" % (table, ", ".join(columns),
+                                                      ", ".join("?" * len(columns)))
+            session.cursor.executemany(sql, rows)
+            # The rowcount of views is always 0
+            counts[table] = counts.get(table, 0) + len(rows)
+        changed = []
+        for table, column in IMPORT_DATA_TABLES:
+            session.cursor.execute("INSERT OR IGNORE INTO %s(%s) SELECT DISTINCT %s "
+                                   "FROM Pigeons WHERE Pigeonskey>? AND %s!=''"
+                                   % (table, column, column, column), (last_key,))
+            if session.cursor.rowcount > 0:
+                changed.append(table)
+    except sqlite3.IntegrityError as exc:
+        session.connection.rollback()
+        raise InvalidValueError(exc)
+    except:
+        session.connection.rollback()
+        raise
+    session.connection.commit()
+    for table in changed:
+        notify_data_changed(table)
+    return counts
@@ -23,6 +23,12 @@ class BaseSchema(object):
     # SCHEMA should be a dict with a list of tuples
     # { table_name: [ (column_name, data_type, constraints) ] }
     SCHEMA = None
+    # VIEWS is an optional dict like SCHEMA for views that have a table layout
+    VIEWS = {}
+    # FOREIGN_KEYS is an optional dict with a list of tuples, on_delete being
+    # the action when the parent row is removed, like CASCADE or SET NULL
+    # { table_name: [ (column_name, parent_table, parent_column, on_delete) ] }
+    FOREIGN_KEYS = {}
 
     @classmethod
     def migrate(cls, session):
@@ -36,9 +42,24 @@ class BaseSchema(object):
     def get_table_names(cls):
         return cls.SCHEMA.keys()
 
+    @classmethod
+    def get_view_names(cls):
+        return cls.VIEWS.keys()
+
+    @classmethod
+    def get_columns(cls, table):
+        """
+        Get the (column_name, data_type, constraints) tuples of a table or view
+        """
+
+        try:
+            return cls.SCHEMA[table]
+        except KeyError:
+            return cls.VIEWS[table]
+
     @classmethod
     def get_column_names(cls, table):
-        return [col[0] for col in cls.SCHEMA[table]]
+        return [col[0] for col in cls.get_columns(table)]
 
     @classmethod
     def get_column_sql(cls, table, name):
@@ -53,5 +74,8 @@ class BaseSchema(object):
         data = []
         for column_data in cls.SCHEMA[table]:
             data.append(" ".join(column_data))
+        for column, parent, parent_column, on_delete in cls.FOREIGN_KEYS.get(table, []):
+            data.append("FOREIGN KEY(%s) REFERENCES %s(%s) ON UPDATE CASCADE ON DELETE %s"
+                        % (column, parent, parent_column, on_delete))
         return ", ".join(data)
 
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of Pigeon Planner.
+
+# Pigeon Planner is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Pigeon Planner is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Pigeon Planner.  If not, see <http://www.gnu.org/licenses/>
+
+"""
+Run slow database queries on a worker thread
+"""
+
+
+import Queue
+import logging
+import threading
+logger = logging.getLogger(__name__)
+
+
+class DatabaseFuture(object):
+    """
+    The pending result of a function that runs on the database worker.
+    Connected callbacks are called with the result, or the error callback
+    with the exception, through the dispatch function of the worker.
+    """
+
+    def __init__(self, worker, func, args, kwargs):
+        self._worker = worker
+        self._func = func
+        self._args = args
+        self._kwargs = kwargs
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._callbacks = []
+        self._result = None
+        self._error = None
+        self.cancelled = False
+
+    def connect(self, callback, error_callback=None):
+        """
+        Call callback with the result when it's ready. Errors are logged if
+        there's no error_callback.
+
+        @param callback: Function that takes the result
+        @param error_callback: Function that takes the exception
+        """
+
+        with self._lock:
+            self._callbacks.append((callback, error_callback))
+            done = self._done.is_set()
+        if done:
+            self._worker.dispatch(self._deliver)
+
+    def cancel(self):
+        """
+        Cancel the function, a running query is interrupted. The callbacks
+        won't be called anymore.
+        """
+
+        with self._lock:
+            self.cancelled = True
+            self._callbacks = []
+        self._worker._interrupt(self)
+
+    def done(self):
+        return self._done.is_set()
+
+    def result(self, timeout=None):
+        """
+        Wait for the function to finish
+
+        @param timeout: Maximum number of seconds to wait, None to wait forever
+        @return: The result of the function, None if it was cancelled
+        @raise: The exception raised by the function
+        """
+
+        self._done.wait(timeout)
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+    def _run(self):
+        try:
+            self._worker._connection = self._worker.session.open_thread_connection()
+            self._result = self._func(*self._args, **self._kwargs)
+        # The connection exits when it fails to open the database
+        except (Exception, SystemExit) as exc:
+            self._error = exc
+        self._done.set()
+        self._worker.dispatch(self._deliver)
+
+    def _deliver(self):
+        with self._lock:
+            callbacks, self._callbacks = self._callbacks, []
+            cancelled = self.cancelled
+        if cancelled:
+            return False
+        for callback, error_callback in callbacks:
+            if self._error is None:
+                callback(self._result)
+            elif error_callback is not None:
+                error_callback(self._error)
+            else:
+                logger.error("Database query failed: %s", self._error)
+        # Called from gobject.idle_add, don't call again
+        return False
+
+
+class DatabaseWorker(object):
+    """
+    A thread with its own database connection that runs functions of the
+    database module one at a time. It's started when the first function is
+    submitted. Writes are left to the main thread, so only use it for queries.
+
+    Results are passed on with the dispatch function, which is called in
+    the worker thread with a function to run. The UI sets it to
+    gobject.idle_add to get the results in the main loop, by default the
+    function is called right away.
+    """
+
+    def __init__(self, session, dispatch=None):
+        self.session = session
+        self.dispatch = dispatch or (lambda func: func())
+        self._queue = Queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._current = None
+        self._connection = None
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Run a function on the worker thread
+
+        @param func: The function to run, mostly one of the database module
+        @return: A DatabaseFuture
+        """
+
+        future = DatabaseFuture(self, func, args, kwargs)
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="DatabaseWorker")
+                self._thread.daemon = True
+                self._thread.start()
+        self._queue.put(future)
+        return future
+
+    def shutdown(self):
+        """
+        Cancel the pending functions and stop the thread, it's started again
+        when another function is submitted.
+        """
+
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        while True:
+            try:
+                future = self._queue.get_nowait()
+            except Queue.Empty:
+                break
+            future.cancel()
+            future._done.set()
+        with self._lock:
+            current = self._current
+        if current is not None:
+            current.cancel()
+        self._queue.put(None)
+        thread.join()
+
+    def _interrupt(self, future):
+        with self._lock:
+            if future is self._current and self._connection is not None:
+                self._connection.interrupt()
+
+    def _run(self):
+        while True:
+            future = self._queue.get()
+            if future is None:
+                break
+            with self._lock:
+                if future.cancelled:
+                    future._done.set()
+                    continue
+                self._current = future
+            future._run()
+            with self._lock:
+                self._current = None
+        self.session.close_thread_connection()
+        self._connection = None
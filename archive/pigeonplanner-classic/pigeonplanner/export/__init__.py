@@ -22,5 +22,7 @@ def get_exporters():
     global _exporters
     if _exporters is None:
         from exportcsv import ExportCSV
-        _exporters = [ExportCSV]
+        from exportjson import ExportJSONLines
+        from exportsqlite import ExportSQLite
+        _exporters = [ExportCSV, ExportJSONLines, ExportSQLite]
     return _exporters
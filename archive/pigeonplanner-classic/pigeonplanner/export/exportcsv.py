@@ -16,43 +16,52 @@
 # along with Pigeon Planner.  If not, see <http://www.gnu.org/licenses/>
 
 
+import os
+import csv
+
 from . import utils
-from pigeonplanner.core import common
 
 
 __all__ = ["ExportCSV"]
 
 
-class ExportCSV(object):
+class CSVWriter(object):
+    """
+    Write each table to its own CSV file. The first table goes to the chosen
+    file, the others are written next to it with the table name appended.
+    """
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.filepaths = []
+
+    def write_table(self, table, selected):
+        # The csv module only handles byte strings
+        rows = table.iter_rows(selected, text_factory=str)
+        if not self.filepaths:
+            filepath = self.filepath
+        else:
+            root, ext = os.path.splitext(self.filepath)
+            filepath = "%s-%s%s" % (root, table.name, ext or ".csv")
+        self.filepaths.append(filepath)
+        with open(filepath, "wb", utils.BUFFER_SIZE) as output:
+            writer = csv.writer(output, quoting=csv.QUOTE_ALL)
+            writer.writerow(table.headers)
+            writer.writerows(rows)
+
+    def close(self):
+        pass
+
+    def abort(self):
+        for filepath in self.filepaths:
+            try:
+                os.remove(filepath)
+            except OSError:
+                pass
+
+
+class ExportCSV(utils.BaseExporter):
     name = "CSV"
     extension = ".csv"
     filefilter = ("CSV", "*.csv")
-
-    @classmethod
-    def run(self, filepath, pigeons):
-        with open(filepath, "wb") as output:
-            writer = common.UnicodeWriter(output, fieldnames=utils.COLS_PIGEON)
-            writer.writerow(dict((name, name) for name in utils.COLS_PIGEON))
-            for pigeon in pigeons:
-                writer.writerow({"pindex": pigeon.pindex,
-                                 "band": pigeon.ring,
-                                 "year": pigeon.year,
-                                 "sex": pigeon.sex,
-                                 "visible": pigeon.show,
-                                 "status": pigeon.active,
-                                 "colour": pigeon.colour,
-                                 "name": pigeon.name,
-                                 "strain": pigeon.strain,
-                                 "loft": pigeon.loft,
-                                 "image": pigeon.image,
-                                 "sire band": pigeon.sire,
-                                 "sire year": pigeon.yearsire,
-                                 "dam band": pigeon.dam,
-                                 "dam year": pigeon.yeardam,
-                                 "extra1": pigeon.extra1,
-                                 "extra2": pigeon.extra2,
-                                 "extra3": pigeon.extra3,
-                                 "extra4": pigeon.extra4,
-                                 "extra5": pigeon.extra5,
-                                 "extra6": pigeon.extra6})
-
+    writer = CSVWriter
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of Pigeon Planner.
+
+# Pigeon Planner is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Pigeon Planner is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Pigeon Planner.  If not, see <http://www.gnu.org/licenses/>
+
+
+import os
+import json
+
+from . import utils
+
+
+__all__ = ["ExportJSONLines"]
+
+
+class JSONLinesWriter(object):
+    """
+    Write all tables to one file with a JSON object per line. Each object
+    holds the columns of a row and the table name under the "_table" key.
+    """
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self._output = open(filepath, "wb", utils.BUFFER_SIZE)
+        # Escaping non-ASCII characters is done by the much faster C encoder
+        self._encoder = json.JSONEncoder(separators=(",", ":"))
+
+    def write_table(self, table, selected):
+        # The JSON encoder decodes UTF-8 strings itself
+        rows = table.iter_rows(selected, text_factory=str)
+        encode = self._encoder.encode
+        write = self._output.write
+        headers = ["_table"] + list(table.headers)
+        for row in rows:
+            write(encode(dict(zip(headers, (table.name,) + row))))
+            write("\n")
+
+    def close(self):
+        self._output.close()
+
+    def abort(self):
+        self._output.close()
+        try:
+            os.remove(self.filepath)
+        except OSError:
+            pass
+
+
+class ExportJSONLines(utils.BaseExporter):
+    name = "JSON Lines"
+    extension = ".jsonl"
+    filefilter = ("JSON Lines", "*.jsonl")
+    writer = JSONLinesWriter
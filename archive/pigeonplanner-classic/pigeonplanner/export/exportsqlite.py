@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of Pigeon Planner.
+
+# Pigeon Planner is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Pigeon Planner is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Pigeon Planner.  If not, see <http://www.gnu.org/licenses/>
+
+
+import os
+import sqlite3
+
+from . import utils
+from pigeonplanner import database
+
+
+__all__ = ["ExportSQLite"]
+
+
+class SQLiteWriter(object):
+    """
+    Write the tables to a new SQLite database with the same table definitions
+    as the Pigeon Planner database. The database is built in a temporary file
+    which replaces the chosen file when everything is written.
+    """
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self._tmppath = filepath + ".tmp"
+        if os.path.exists(self._tmppath):
+            os.remove(self._tmppath)
+        try:
+            database.attach_export_database(self._tmppath)
+        except sqlite3.OperationalError as exc:
+            raise IOError(exc)
+
+    def write_table(self, table, selected):
+        table.copy_rows(selected)
+
+    def close(self):
+        database.detach_export_database()
+        if os.path.exists(self.filepath):
+            os.remove(self.filepath)
+        os.rename(self._tmppath, self.filepath)
+
+    def abort(self):
+        database.session.connection.rollback()
+        database.detach_export_database()
+        try:
+            os.remove(self._tmppath)
+        except OSError:
+            pass
+
+
+class ExportSQLite(utils.BaseExporter):
+    name = "SQLite"
+    extension = ".db"
+    filefilter = ("SQLite", "*.db")
+    writer = SQLiteWriter
@@ -16,6 +16,13 @@
 # along with Pigeon Planner.  If not, see <http://www.gnu.org/licenses/>
 
 
+from pigeonplanner import database
+from pigeonplanner.database import Tables, Schema
+
+
+# Size of the file buffers of the writers
+BUFFER_SIZE = 1024 * 1024
+
 COLS_PIGEON = ("pindex",
                "band",
                "year",
@@ -38,4 +45,118 @@ COLS_PIGEON = ("pindex",
                "extra5",
                "extra6")
 
+STATUS_TABLES = (Tables.SOLD, Tables.LOST, Tables.DEAD,
+                 Tables.BREEDER, Tables.LOANED, Tables.WIDOW)
+
+
+class ExportTable(object):
+    """
+    A database table that can be exported
+
+    @param name: Name of the table in the exported data
+    @param table: The database table or view
+    @param headers: Column names in the exported data, defaults to the
+                    database column names
+    @param pindex_columns: Columns that refer to a pigeon, or (column, table)
+                           tuples for a column that refers to the pigeons
+                           through the same column of another table
+    """
+
+    def __init__(self, name, table, headers=None, pindex_columns=("pindex",)):
+        self.name = name
+        self.table = table
+        # Leave out the primary key, it means nothing outside the database.
+        # Neither does the key of a pigeon, its pindex is exported instead.
+        self.columns = ["pindex" if column == "pigeon" else column
+                        for column in Schema.get_column_names(table)[1:]]
+        self.headers = headers or self.columns
+        self.pindex_columns = pindex_columns
+
+    def iter_rows(self, selected=False, chunksize=1000, text_factory=None):
+        """
+        Iterate over the rows
+
+        @param selected: Only include the pigeons set with
+                         database.set_export_pigeons
+        @param text_factory: See database.iter_table_rows
+        """
+
+        return database.iter_table_rows(self.table, self.columns,
+                                        self._get_pindex_columns(selected),
+                                        chunksize, text_factory)
+
+    def copy_rows(self, selected=False):
+        """
+        Copy the rows to the database attached with
+        database.attach_export_database
+        """
+
+        database.copy_table_rows(self.table, self.columns,
+                                 self._get_pindex_columns(selected))
+
+    def _get_pindex_columns(self, selected):
+        return self.pindex_columns if selected else None
+
+
+PIGEONS = ExportTable("pigeons", Tables.PIGEONS, COLS_PIGEON)
+
+TABLES = {
+    "results": [ExportTable("results", Tables.RACERESULTS)],
+    "breeding": [ExportTable("breeding", Tables.BREEDING,
+                             pindex_columns=("sire", "dam"))],
+    "medication": [ExportTable("medication", Tables.MED,
+                               pindex_columns=(("medid", Tables.MEDPIGEONS),)),
+                   ExportTable("medicationpigeons", Tables.MEDPIGEONS)],
+    "media": [ExportTable("media", Tables.MEDIA)],
+    "status": [ExportTable(table.lower(), table) for table in STATUS_TABLES],
+}
+
+
+def get_tables(groups):
+    """
+    Get the tables to export, the pigeons table always comes first
+
+    @param groups: Keys of TABLES to include
+    """
+
+    tables = [PIGEONS]
+    for group in groups:
+        tables.extend(TABLES[group])
+    return tables
+
+
+class BaseExporter(object):
+    """
+    Base class for exporters. Subclasses set the writer attribute to a class
+    that takes the file path and has write_table(table, selected), close()
+    and abort() methods. Writers get the rows with ExportTable.iter_rows,
+    which streams them from the database, and should never keep them around,
+    or let SQLite copy them with ExportTable.copy_rows.
+    """
+
+    name = None
+    extension = None
+    filefilter = None
+    writer = None
+
+    @classmethod
+    def run(cls, filepath, pigeons=None, groups=()):
+        """
+        Export the pigeons and their related data
+
+        @param filepath: The file to write to
+        @param pigeons: List of pigeon objects, None to export all pigeons
+        @param groups: Keys of TABLES to export along with the pigeons
+        """
 
+        selected = pigeons is not None
+        if selected:
+            database.set_export_pigeons(pigeon.pindex for pigeon in pigeons)
+        writer = cls.writer(filepath)
+        try:
+            for table in get_tables(groups):
+                writer.write_table(table, selected)
+        except:
+            writer.abort()
+            raise
+        writer.close()
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of Pigeon Planner.
+
+# Pigeon Planner is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Pigeon Planner is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Pigeon Planner.  If not, see <http://www.gnu.org/licenses/>
+
+
+import os
+import csv
+
+from . import utils
+
+
+__all__ = ["ImportCSV"]
+
+
+class CSVReader(object):
+    """
+    Read the tables from CSV files as they are written by the CSV exporter.
+    The pigeons are in the chosen file, the results and breeding records in
+    the files next to it with the table name appended, if they exist.
+    """
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+
+    def iter_rows(self):
+        root, ext = os.path.splitext(self.filepath)
+        filepaths = [("pigeons", self.filepath)]
+        for name in ["results", "breeding"]:
+            filepath = "%s-%s%s" % (root, name, ext or ".csv")
+            if os.path.exists(filepath):
+                filepaths.append((name, filepath))
+        for name, filepath in filepaths:
+            with open(filepath, "rb") as source:
+                reader = csv.DictReader(source)
+                for row in reader:
+                    try:
+                        row = dict((key, value.decode("utf-8"))
+                                   for key, value in row.iteritems()
+                                   if key is not None and value is not None)
+                    except UnicodeDecodeError:
+                        yield None, reader.line_num, None
+                        continue
+                    yield name, reader.line_num, row
+
+
+class ImportCSV(utils.BaseImporter):
+    name = "CSV"
+    extension = ".csv"
+    filefilter = ("CSV", "*.csv")
+    reader = CSVReader
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of Pigeon Planner.
+
+# Pigeon Planner is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Pigeon Planner is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Pigeon Planner.  If not, see <http://www.gnu.org/licenses/>
+
+
+import json
+
+from . import utils
+
+
+__all__ = ["ImportJSONLines"]
+
+
+class JSONLinesReader(object):
+    """
+    Read the tables from a file with a JSON object per line as written by the
+    JSON Lines exporter. Lines without a "_table" key are pigeons.
+    """
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+
+    def iter_rows(self):
+        with open(self.filepath, "rb") as source:
+            for lineno, line in enumerate(source, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    yield None, lineno, None
+                    continue
+                if not isinstance(row, dict):
+                    yield None, lineno, None
+                    continue
+                yield row.pop("_table", "pigeons"), lineno, row
+
+
+class ImportJSONLines(utils.BaseImporter):
+    name = "JSON Lines"
+    extension = ".jsonl"
+    filefilter = ("JSON Lines", "*.jsonl")
+    reader = JSONLinesReader
@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of Pigeon Planner.
+
+# Pigeon Planner is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Pigeon Planner is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Pigeon Planner.  If not, see <http://www.gnu.org/licenses/>
+
+
+import logging
+logger = logging.getLogger(__name__)
+
+from pigeonplanner import database
+from pigeonplanner.core import enums
+from pigeonplanner.core import common
+from pigeonplanner.core import checks
+from pigeonplanner.core import errors
+from pigeonplanner.core import pigeonparser
+from pigeonplanner.database import Tables, Schema
+from pigeonplanner.export.utils import ExportTable, COLS_PIGEON
+
+
+# Number of rows that are inserted at once
+CHUNK_SIZE = 1000
+# Stop collecting errors after this many, the file needs fixing anyway
+MAX_ERRORS = 25
+
+SEXES = (enums.Sex.cock, enums.Sex.hen, enums.Sex.unknown)
+STATUSES = (enums.Status.dead, enums.Status.active, enums.Status.sold,
+            enums.Status.lost, enums.Status.breeder, enums.Status.loaned,
+            enums.Status.widow)
+
+
+class RowError(Exception):
+    pass
+
+
+def _get_default(constraints):
+    """
+    Get the value of the DEFAULT constraint of a column. The value is
+    required if there's no default.
+    """
+
+    if not constraints.startswith("DEFAULT "):
+        return None
+    value = constraints[len("DEFAULT "):]
+    if value.startswith("'"):
+        return value.strip("'")
+    if "." in value:
+        return float(value)
+    return int(value)
+
+
+class ImportTable(ExportTable):
+    """
+    A database table that can be imported, with the same layout as it is
+    exported. Rows are converted to the column types of the database schema
+    and checked with check_row.
+    """
+
+    def __init__(self, name, table, headers=None):
+        ExportTable.__init__(self, name, table, headers)
+        schema = dict((column[0], column[1:]) for column in Schema.get_columns(table))
+        self.types = [schema[column][0] for column in self.columns]
+        self.defaults = [_get_default(schema[column][1]) for column in self.columns]
+
+    def convert_row(self, row):
+        """
+        Convert a row read from the file to the values to insert
+
+        @param row: Dict of headers to values
+        @return: Dict of columns to values
+        """
+
+        values = {}
+        for header, column, type_, default in zip(self.headers, self.columns,
+                                                   self.types, self.defaults):
+            value = row.get(header)
+            if value is None or value == "":
+                if default is None:
+                    raise RowError("Missing value for '%s'" % header)
+                value = default
+            elif type_ == "INTEGER":
+                try:
+                    value = int(value)
+                except ValueError:
+                    raise RowError("Invalid number for '%s': %s" % (header, value))
+            elif type_ == "REAL":
+                try:
+                    value = float(value)
+                except ValueError:
+                    raise RowError("Invalid number for '%s': %s" % (header, value))
+            elif not isinstance(value, basestring):
+                value = unicode(value)
+            values[column] = value
+        return values
+
+    def check_row(self, values, validator):
+        """
+        Check the converted values of a row, raise RowError when they're invalid
+
+        @param values: Dict of columns to values
+        @param validator: The ImportValidator
+        """
+
+        pass
+
+    def get_row(self, values):
+        return tuple(values[column] for column in self.columns)
+
+
+class PigeonTable(ImportTable):
+    def __init__(self, name, table, headers=None):
+        ImportTable.__init__(self, name, table, headers)
+        # The pindex is always built from the band and year
+        index = self.columns.index("pindex")
+        self.defaults[index] = ""
+
+    def check_row(self, values, validator):
+        band, year = values["band"], values["year"]
+        _check_band(band, year)
+        pindex = common.get_pindex_from_band(band, year)
+        values["pindex"] = pindex
+        if values["sex"] not in SEXES:
+            raise RowError("Invalid sex: %s" % values["sex"])
+        if values["show"] not in (0, 1):
+            raise RowError("Invalid visibility: %s" % values["show"])
+        if values["active"] not in STATUSES:
+            raise RowError("Invalid status: %s" % values["active"])
+        for band_col, year_col, sex in (("sire", "yearsire", enums.Sex.cock),
+                                        ("dam", "yeardam", enums.Sex.hen)):
+            band, year = values[band_col], values[year_col]
+            if band or year:
+                _check_band(band, year)
+                validator.add_parent(common.get_pindex_from_band(band, year), sex)
+        validator.add_pigeon(pindex, values["sex"])
+
+
+class ResultTable(ImportTable):
+    def check_row(self, values, validator):
+        validator.add_reference(values["pindex"])
+
+
+class BreedingTable(ImportTable):
+    def check_row(self, values, validator):
+        validator.add_reference(values["sire"])
+        validator.add_reference(values["dam"])
+
+
+def _check_band(band, year):
+    try:
+        checks.check_ring_entry(band, year)
+    except errors.InvalidInputError as exc:
+        raise RowError("%s %s/%s" % (exc.value[1], band, year))
+
+
+PIGEONS = PigeonTable("pigeons", Tables.PIGEONS, COLS_PIGEON)
+
+TABLES = {
+    "pigeons": PIGEONS,
+    "results": ResultTable("results", Tables.RACERESULTS),
+    "breeding": BreedingTable("breeding", Tables.BREEDING),
+}
+
+
+class ImportValidator(object):
+    """
+    Validate the rows of an import in one pass over the file. Only the
+    pindexes are kept, so the check on references between the rows, like
+    parents and results, is done at the end with finish.
+    """
+
+    def __init__(self):
+        self.errors = []
+        self.counts = {}
+        self.existing = database.get_all_pindexes()
+        self.pigeons = {}
+        self.parents = {}
+        self.references = {}
+        self.missing_parents = []
+        self._lineinfo = None
+
+    def validate_row(self, name, lineno, row):
+        """
+        Convert and check a row, the error is stored if it's invalid
+
+        @param name: The table name in the file, None if the row couldn't be read
+        @param lineno: The line number in the file
+        @param row: Dict of headers to values
+        @return: Dict of columns to values or None if the row is invalid
+        """
+
+        self._lineinfo = (name, lineno)
+        if name is None:
+            self.add_error("Unreadable row")
+            return None
+        try:
+            table = TABLES[name]
+        except KeyError:
+            if name not in self.counts:
+                logger.info("Skipping unsupported table '%s'", name)
+            self.counts[name] = 0
+            return None
+        try:
+            values = table.convert_row(row)
+            table.check_row(values, self)
+        except RowError as exc:
+            self.add_error(str(exc))
+            return None
+        self.counts[name] = self.counts.get(name, 0) + 1
+        return values
+
+    def add_error(self, message, lineinfo=None):
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append((lineinfo or self._lineinfo) + (message,))
+
+    def add_pigeon(self, pindex, sex):
+        if pindex in self.pigeons:
+            raise RowError("Pigeon %s is already in the file" % pindex)
+        if pindex in self.existing:
+            raise RowError("Pigeon %s already exists" % pindex)
+        self.pigeons[pindex] = sex
+
+    def add_parent(self, pindex, sex):
+        self.parents.setdefault(pindex, (sex, self._lineinfo))
+
+    def add_reference(self, pindex):
+        self.references.setdefault(pindex, self._lineinfo)
+
+    def finish(self):
+        """
+        Resolve the parents and references against the pigeons in the file
+        and database. Unknown parents are added as hidden pigeons, just like
+        the pedigree does.
+        """
+
+        for pindex, (sex, lineinfo) in sorted(self.parents.items()):
+            if pindex in self.pigeons:
+                own_sex = self.pigeons[pindex]
+                if own_sex != sex and own_sex != enums.Sex.unknown:
+                    self.add_error("Parent %s has the wrong sex" % pindex, lineinfo)
+            elif pindex not in self.existing:
+                self.missing_parents.append((pindex, sex))
+        for pindex, lineinfo in sorted(self.references.items()):
+            if pindex not in self.pigeons and pindex not in self.existing:
+                self.add_error("Unknown pigeon %s" % pindex, lineinfo)
+
+
+class BaseImporter(object):
+    """
+    Base class for importers. Subclasses set the reader attribute to a class
+    that takes the file path and has an iter_rows() method which yields
+    (name, lineno, row) tuples, row being a dict of headers to values and
+    name None if the row couldn't be read. The file is read twice, once to
+    validate and once to insert the rows, so it's never loaded in memory.
+    """
+
+    name = None
+    extension = None
+    filefilter = None
+    reader = None
+
+    @classmethod
+    def validate(cls, filepath):
+        """
+        Validate the file without importing anything
+
+        @param filepath: The file to read
+        @return: The ImportValidator
+        """
+
+        validator = ImportValidator()
+        for name, lineno, row in cls.reader(filepath).iter_rows():
+            validator.validate_row(name, lineno, row)
+        validator.finish()
+        return validator
+
+    @classmethod
+    def run(cls, filepath):
+        """
+        Import the pigeons, results and breeding records
+
+        @param filepath: The file to read
+        @return: Tuple of a dict of table names to the number of imported
+                 rows and a list of the new pigeon objects
+        """
+
+        validator = cls.validate(filepath)
+        if validator.errors:
+            raise errors.InvalidImportError(validator.errors)
+        last_key = database.get_last_pigeon_key()
+        counts = database.import_rows(cls._iter_chunks(filepath, validator))
+        pigeons = pigeonparser.parser.load_pigeons(database.get_pigeons_after(last_key))
+        return counts, pigeons
+
+    @classmethod
+    def _iter_chunks(cls, filepath, validator):
+        chunks = dict((table.name, []) for table in TABLES.values())
+        for name, lineno, row in cls.reader(filepath).iter_rows():
+            table = TABLES.get(name)
+            if table is None:
+                continue
+            values = table.convert_row(row)
+            if table is PIGEONS:
+                values["pindex"] = common.get_pindex_from_band(values["band"],
+                                                               values["year"])
+            chunk = chunks[name]
+            chunk.append(table.get_row(values))
+            if len(chunk) >= CHUNK_SIZE:
+                yield table.table, table.columns, chunk
+                chunks[name] = []
+        for name in ["pigeons", "results", "breeding"]:
+            if chunks[name]:
+                yield TABLES[name].table, TABLES[name].columns, chunks[name]
+        if validator.missing_parents:
+            rows = []
+            for pindex, sex in validator.missing_parents:
+                band, year = common.get_band_from_pindex(pindex)
+                rows.append((pindex, band, year, sex, 0))
+            yield Tables.PIGEONS, ("pindex", "band", "year", "sex", "show"), rows
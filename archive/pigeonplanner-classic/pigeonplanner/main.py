@@ -30,6 +30,7 @@ import platform
 from optparse import OptionParser
 
 from pigeonplanner.core import const
+from pigeonplanner.core import logfile
 
 
 def get_operating_system():
@@ -161,12 +162,10 @@ class Startup(object):
         # Capture warnings and add them to the log, useful for GTK warnings.
         logging.captureWarnings(True)
 
-        if os.path.exists(const.LOGFILE):
-            if os.path.exists("%s.old" % const.LOGFILE):
-                os.remove("%s.old" % const.LOGFILE)
-            os.rename(const.LOGFILE, "%s.old" % const.LOGFILE)
         formatter = logging.Formatter(const.LOG_FORMAT)
-        handler = logging.FileHandler(const.LOGFILE, encoding="UTF-8")
+        handler = logfile.RotatingLogHandler(const.LOGFILE, encoding="UTF-8")
+        # Start each session with a new logfile
+        handler.rollover_if_used()
         handler.setFormatter(formatter)
         self.logger = logging.getLogger()
         self.logger.addHandler(handler)
@@ -207,12 +206,17 @@ class Startup(object):
 
     def setup_pigeons(self):
         """
-        Setup the pigeon parser object which will hold all the pigeons
+        Setup the pigeon parser object which will hold all the pigeons. They're
+        loaded from the snapshot of the last session if the database didn't
+        change since.
         """
 
+        from pigeonplanner import database
         from pigeonplanner.core import pigeonparser
 
-        pigeonparser.parser.build_pigeons()
+        fingerprint = database.session.get_fingerprint()
+        if not pigeonparser.parser.load_snapshot(const.PIGEONSNAPSHOT, fingerprint):
+            pigeonparser.parser.build_pigeons()
 
     def exception_hook(self, type_, value, tb):
         import traceback
@@ -40,6 +40,9 @@ MSG_ERROR_DATABASE = (_("The database migration has failed! Any further actions
                         "to fix this problem."),
                       None,
                       ERROR)
+MSG_DATABASE_LOCKED = (_("The database is in use, the changes couldn't be saved."),
+                       _("Please try again."),
+                       ERROR)
 
 MSG_EVENT_NOTIFY = (_("Notification for '%s'"),
                     _("Go to the calendar?"),
@@ -1,20 +1,62 @@
 # -*- coding: utf-8 -*-
 
 from math import radians
+from collections import OrderedDict
 from gettext import gettext as _
 
 import gtk
+import cairo
+import gobject
 
 
 PRINTER_DPI = 72.0
 
 MARGIN = 6
 
+# Memory in bytes the rendered pages may take up
+PAGE_CACHE_SIZE = 64 * 1024 * 1024
+
 (ZOOM_BEST_FIT,
  ZOOM_FIT_WIDTH,
  ZOOM_FREE,) = range(3)
 
 
+class PageCache(object):
+    """Least recently used cache of rendered page surfaces, keyed by page
+    number and zoom. The most recent surface is always kept, even if it's
+    larger than the allowed size.
+    """
+    def __init__(self, max_size=PAGE_CACHE_SIZE):
+        self._max_size = max_size
+        self._size = 0
+        self._surfaces = OrderedDict()
+
+    def __contains__(self, key):
+        return key in self._surfaces
+
+    def get(self, key):
+        surface = self._surfaces.pop(key, None)
+        if surface is not None:
+            self._surfaces[key] = surface
+        return surface
+
+    def add(self, key, surface):
+        if key in self._surfaces:
+            self._size -= self.__surface_size(self._surfaces.pop(key))
+        self._surfaces[key] = surface
+        self._size += self.__surface_size(surface)
+        while self._size > self._max_size and len(self._surfaces) > 1:
+            key, old = self._surfaces.popitem(last=False)
+            self._size -= self.__surface_size(old)
+
+    def clear(self):
+        self._surfaces.clear()
+        self._size = 0
+
+    def __surface_size(self, surface):
+        return surface.get_stride() * surface.get_height()
+
+
 class PrintPreview(gtk.Window):
     zoom_factors = {
         0.50: '50%',
@@ -53,6 +95,8 @@ class PrintPreview(gtk.Window):
 
         self.__build_toolbar()
         self._current_page = None
+        self._page_cache = PageCache()
+        self._prerender_id = None
 
     def __build_toolbar(self):
         toolbar = gtk.Toolbar()
@@ -202,8 +246,70 @@ class PrintPreview(gtk.Window):
         return width, height, vsb_w, hsb_h
         
     def __end_preview(self):
+        if self._prerender_id is not None:
+            gobject.source_remove(self._prerender_id)
+            self._prerender_id = None
+        self._page_cache.clear()
         self._operation.end_preview()
 
+    def __render_page(self, page_no):
+        """Render a page at the current zoom level to an image surface.
+        """
+        paper_w = int(self._paper_width * self._zoom)
+        paper_h = int(self._paper_height * self._zoom)
+        surface = cairo.ImageSurface(cairo.FORMAT_RGB24, max(paper_w, 1),
+                                     max(paper_h, 1))
+        cr = cairo.Context(surface)
+
+        # an empty white page
+        cr.set_source_rgb(1.0, 1.0, 1.0)
+        cr.paint()
+        cr.set_source_rgb(0, 0, 0)
+
+        if self._orientation == gtk.PAGE_ORIENTATION_LANDSCAPE:
+            cr.rotate(radians(90))
+            cr.translate(0, -paper_w)
+
+        #     Here we use dpi scaling instead of scaling the cairo context,
+        #     because it gives better result. In the latter case the distance
+        #     of glyphs was changing.
+        dpi = PRINTER_DPI * self._zoom
+        self._context.set_cairo_context(cr, dpi, dpi)
+        self._preview.render_page(page_no)
+        surface.flush()
+        return surface
+
+    def __get_page_surface(self, page_no):
+        key = (page_no, self._zoom)
+        surface = self._page_cache.get(key)
+        if surface is None:
+            surface = self.__render_page(page_no)
+            self._page_cache.add(key, surface)
+        return surface
+
+    def __get_pages_to_prerender(self):
+        pages = [self._current_page + 1, self._current_page - 1]
+        return [page_no for page_no in pages
+                if 0 <= page_no < self._page_no and
+                   (page_no, self._zoom) not in self._page_cache]
+
+    def __prerender_neighbours(self):
+        """Render the next and previous page when there's nothing else to do,
+        so they can be shown right away.
+        """
+        if self._prerender_id is None and self.__get_pages_to_prerender():
+            self._prerender_id = gobject.idle_add(self.__prerender_next,
+                                                  priority=gobject.PRIORITY_LOW)
+
+    def __prerender_next(self):
+        pages = self.__get_pages_to_prerender()
+        if pages:
+            self.__get_page_surface(pages[0])
+        if len(pages) > 1:
+            return True
+        self._prerender_id = None
+        return False
+
     # Signal handlers
     
     def on_drawingarea_expose_event(self, drawing_area, event):
@@ -232,34 +338,15 @@ class PrintPreview(gtk.Window):
             
         cr.translate(xtranslate, ytranslate)
         
-        # draw an empty white page
-        cr.set_source_rgb(1.0, 1.0, 1.0)
+        # draw the currently selected page, rendered only once per zoom level
+        cr.set_source_surface(self.__get_page_surface(self._current_page), 0, 0)
         cr.rectangle(0, 0, paper_w, paper_h)
         cr.fill_preserve()
         cr.set_source_rgb(0, 0, 0)
         cr.set_line_width(1)
         cr.stroke()
-        
-        if self._orientation == gtk.PAGE_ORIENTATION_LANDSCAPE:
-            ##cr.rotate(radians(-90))
-            ##cr.translate(-paper_h, 0)
-            cr.rotate(radians(90))
-            cr.translate(0, -paper_w)
-            
-        ##page_setup = self._context.get_page_setup()
-        ##cr.translate(page_setup.get_left_margin(gtk.UNIT_POINTS),
-                     ##page_setup.get_top_margin(gtk.UNIT_POINTS))
-        
-        ##cr.set_source_surface(self.get_page(0))
-        ##cr.paint()
-        
-        # draw the content of the currently selected page
-        #     Here we use dpi scaling instead of scaling the cairo context,
-        #     because it gives better result. In the latter case the distance
-        #     of glyphs was changing.
-        dpi = PRINTER_DPI * self._zoom
-        self._context.set_cairo_context(cr, dpi, dpi)
-        self._preview.render_page(self._current_page)
+
+        self.__prerender_neighbours()
     
     def on_swin_size_allocate(self, scrolledwindow, allocation):
         if self._zoom_mode == ZOOM_FIT_WIDTH:
@@ -342,8 +429,6 @@ class PrintPreview(gtk.Window):
         self._orientation = page_setup.get_orientation()
 
         # get the total number of pages
-        ##self._page_numbers = [0,]
-        ##self._page_surfaces = {}
         self._page_no = self._operation.get_property('n_pages')
         self._pages_label.set_text(_('of %d') % self._page_no)
 
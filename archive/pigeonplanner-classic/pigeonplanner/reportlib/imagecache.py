@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of Pigeon Planner.
+
+# Pigeon Planner is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Pigeon Planner is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Pigeon Planner.  If not, see <http://www.gnu.org/licenses/>
+
+"""
+Cache of the resized images drawn in reports
+"""
+
+
+import os
+from collections import OrderedDict
+
+import cairo
+
+import utils as ReportUtils
+
+
+# Memory in bytes the cached images may take up
+IMAGE_CACHE_SIZE = 32 * 1024 * 1024
+
+
+class ImageCache(object):
+    """
+    Keeps images resized for a report as cairo surfaces, so drawing the same
+    image again doesn't decode and resample the original file. Images are
+    keyed by path, modification time, size in pixels and crop, so a changed
+    file is loaded again.
+
+    Surfaces are kept in memory up to max_size bytes, least recently used
+    ones are dropped first.
+    """
+
+    def __init__(self, max_size=IMAGE_CACHE_SIZE):
+        self.max_size = max_size
+        self._size = 0
+        self._surfaces = OrderedDict()
+
+    def get_surface(self, filename, size, crop=None):
+        """
+        Get the image resized to fit in size
+
+        :param filename: path of the image file
+        :param size: [width, height] in pixels to fit the image in
+        :param crop: cropping coordinates ([start_x, start_y, end_x, end_y])
+        :returns: cairo.ImageSurface
+        """
+        key = self._make_key(filename, size, crop)
+        surface = self._surfaces.pop(key, None)
+        if surface is None:
+            surface = self._pixbuf_to_surface(self._load_pixbuf(key))
+            self._size += self._surface_size(surface)
+        self._surfaces[key] = surface
+        self._evict()
+        return surface
+
+    def clear(self):
+        self._surfaces.clear()
+        self._size = 0
+
+    def _make_key(self, filename, size, crop):
+        filename = os.path.abspath(filename)
+        try:
+            mtime = os.path.getmtime(filename)
+        except OSError:
+            # Let the image loader raise the error
+            mtime = None
+        width = max(int(round(size[0])), 1)
+        height = max(int(round(size[1])), 1)
+        if crop is not None:
+            crop = tuple(crop)
+        return (filename, mtime, width, height, crop)
+
+    def _load_pixbuf(self, key):
+        filename, mtime, width, height, crop = key
+        return ReportUtils.resize_to_buffer(filename, [width, height], crop)
+
+    def _pixbuf_to_surface(self, pixbuf):
+        import gtk
+        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32,
+                                     pixbuf.get_width(), pixbuf.get_height())
+        cr = gtk.gdk.CairoContext(cairo.Context(surface))
+        cr.set_source_pixbuf(pixbuf, 0, 0)
+        cr.paint()
+        surface.flush()
+        return surface
+
+    def _surface_size(self, surface):
+        return surface.get_stride() * surface.get_height()
+
+    def _evict(self):
+        # Always keep the last used image
+        while self._size > self.max_size and len(self._surfaces) > 1:
+            key, surface = self._surfaces.popitem(last=False)
+            self._size -= self._surface_size(surface)
+
+
+IMAGE_CACHE = ImageCache()
@@ -49,6 +49,7 @@ from .styles.tablestyle import TableCellStyle
 from .styles.fontstyle import FONT_SERIF, FONT_SANS_SERIF, FONT_MONOSPACE
 import utils as ReportUtils
 from .backend.cairobackend import CairoBackend
+from .imagecache import IMAGE_CACHE
 
 class PluginError(Exception): pass
 
@@ -1005,7 +1006,6 @@ class GtkDocPicture(GtkDocBaseElement):
             return (None, self), 0
 
     def draw(self, cr, layout, width, dpi_x, dpi_y):
-        import gtk
         img_width = self._width * dpi_x / 2.54
         img_height = self._height * dpi_y / 2.54
         
@@ -1017,11 +1017,11 @@ class GtkDocPicture(GtkDocBaseElement):
             l_margin = 0
         
         # load the image and get its extents
-        pixbuf = ReportUtils.resize_to_buffer(self._filename,
-                                              [img_width, img_height],
-                                              self._crop)
-        pixbuf_width = pixbuf.get_width()
-        pixbuf_height = pixbuf.get_height()
+        surface = IMAGE_CACHE.get_surface(self._filename,
+                                          [img_width, img_height],
+                                          self._crop)
+        pixbuf_width = surface.get_width()
+        pixbuf_height = surface.get_height()
         
         # calculate the scale to fit image into the set extents
         scale = min(img_width / pixbuf_width, img_height / pixbuf_height)
@@ -1030,8 +1030,7 @@ class GtkDocPicture(GtkDocBaseElement):
         cr.save()
         cr.translate(l_margin, 0)
         cr.scale(scale, scale)
-        gcr = gtk.gdk.CairoContext(cr)
-        gcr.set_source_pixbuf(pixbuf,
+        cr.set_source_surface(surface,
                               (img_width / scale - pixbuf_width) / 2,
                               (img_height / scale - pixbuf_height) / 2)
         cr.rectangle(0 , 0, img_width / scale, img_height / scale)
@@ -1069,18 +1068,17 @@ class GtkDocPictureDraw(GtkDocBaseElement):
         self._yalign = yalign
 
     def draw(self, cr, layout, width, dpi_x, dpi_y):
-        import gtk
         img_x = self._x * dpi_x / 2.54
         img_y = self._y * dpi_y / 2.54
         img_width = self._width * dpi_x / 2.54
         img_height = self._height * dpi_y / 2.54
         
         # load the image
-        pixbuf = ReportUtils.resize_to_buffer(self._filename,
-                                              [img_width, img_height],
-                                              self._crop)
-        pixbuf_width = pixbuf.get_width()
-        pixbuf_height = pixbuf.get_height()
+        surface = IMAGE_CACHE.get_surface(self._filename,
+                                          [img_width, img_height],
+                                          self._crop)
+        pixbuf_width = surface.get_width()
+        pixbuf_height = surface.get_height()
 
         # calculate coordinates based on alignment
         if self._xalign == 'right':
@@ -1099,9 +1097,8 @@ class GtkDocPictureDraw(GtkDocBaseElement):
         
         # draw the image
         cr.save()
-        gcr = gtk.gdk.CairoContext(cr)
-        gcr.set_source_pixbuf(pixbuf, x, y)
-        gcr.paint()
+        cr.set_source_surface(surface, x, y)
+        cr.paint()
         cr.restore()
 
         return img_height
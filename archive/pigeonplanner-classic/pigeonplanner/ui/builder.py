@@ -21,6 +21,7 @@ Interface for Gtkbuilder
 
 
 import os
+import xml.etree.ElementTree as ET
 
 import gtk
 
@@ -28,6 +29,33 @@ from pigeonplanner.ui import WidgetFactory
 from pigeonplanner.core import const
 
 
+_templates = {}
+
+def get_ui_template(uifile):
+    """
+    Get the UI description of a Glade file. The file is only read the first
+    time, comments and indentation are stripped so GtkBuilder has less to
+    parse on each following instance.
+
+    @param uifile: Filename of the Glade file
+    """
+
+    try:
+        return _templates[uifile]
+    except KeyError:
+        pass
+
+    root = ET.parse(os.path.join(const.GLADEDIR, uifile)).getroot()
+    for element in root.iter():
+        if len(element) and element.text and not element.text.strip():
+            element.text = None
+        if element.tail and not element.tail.strip():
+            element.tail = None
+    template = ET.tostring(root, encoding="utf-8")
+    _templates[uifile] = template
+    return template
+
+
 class GtkBuilder(WidgetFactory):
     def __init__(self, uifile, objects=None):
         """
@@ -41,11 +69,12 @@ class GtkBuilder(WidgetFactory):
 
         self._builder = gtk.Builder()
         self._builder.set_translation_domain(const.DOMAIN)
-        uipath = os.path.join(const.GLADEDIR, uifile)
+        template = get_ui_template(uifile)
         if objects is None:
-            self._builder.add_from_file(uipath)
+            self._builder.add_from_string(template)
         else:
-            self._builder.add_objects_from_file(uipath, objects)
+            self._builder.add_objects_from_string(template, objects)
+        # Signals are bound to this instance, the template is shared
         self._builder.connect_signals(self)
         self.set_builder_objects(self._builder.get_objects())
 
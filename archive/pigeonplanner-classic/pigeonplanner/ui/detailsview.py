@@ -26,7 +26,6 @@ import gobject
 from pigeonplanner import messages
 from pigeonplanner import thumbnail
 from pigeonplanner import database
-from pigeonplanner.ui import tools
 from pigeonplanner.ui import utils
 from pigeonplanner.ui import builder
 from pigeonplanner.ui import component
@@ -112,7 +111,8 @@ class PigeonImageWidget(gtk.EventBox):
         if self._view.pigeon is None:
             return
         parent = None if isinstance(self._parent, gtk.Dialog) else self._parent
-        tools.PhotoAlbum(parent, self._view.pigeon.get_pindex())
+        from pigeonplanner.ui.tools.photoalbum import PhotoAlbum
+        PhotoAlbum(parent, self._view.pigeon.get_pindex())
 
     def on_editable_button_press_event(self, widget, event):
         if event.button == 3:
@@ -179,9 +179,9 @@ class DetailsView(builder.GtkBuilder, gobject.GObject, component.Component):
         self.widgets.pigeonimage_edit = PigeonImageWidget(True, self, parent)
         self.widgets.viewportImageEdit.add(self.widgets.pigeonimage_edit)
 
-        self.widgets.combocolour.set_data(database.get_all_data(database.Tables.COLOURS), sort=False)
-        self.widgets.combostrain.set_data(database.get_all_data(database.Tables.STRAINS), sort=False)
-        self.widgets.comboloft.set_data(database.get_all_data(database.Tables.LOFTS), sort=False)
+        self.widgets.combocolour.set_table(database.Tables.COLOURS)
+        self.widgets.combostrain.set_table(database.Tables.STRAINS)
+        self.widgets.comboloft.set_table(database.Tables.LOFTS)
 
         self.widgets.combostatus.set_active(1)
         self.widgets.combostatus.emit("changed")
@@ -390,6 +390,10 @@ class DetailsView(builder.GtkBuilder, gobject.GObject, component.Component):
             statusdata = self._get_info_for_status(status, pindex)
             try:
                 pigeon = corepigeon.update_pigeon(self.pigeon, data, status, statusdata)
+            except database.DatabaseLockedError:
+                # Keep the dialog open so the changes can be saved again
+                ErrorDialog(messages.MSG_DATABASE_LOCKED, self.parent)
+                return True
             except errors.PigeonAlreadyExists:
                 ErrorDialog(messages.MSG_PIGEON_EXISTS, self.parent)
                 return False
@@ -408,6 +412,9 @@ class DetailsView(builder.GtkBuilder, gobject.GObject, component.Component):
             statusdata = self._get_info_for_status(status, pindex)
             try:
                 pigeon = corepigeon.add_pigeon(data, status, statusdata)
+            except database.DatabaseLockedError:
+                ErrorDialog(messages.MSG_DATABASE_LOCKED, self.parent)
+                return True
             except errors.PigeonAlreadyExists:
                 ErrorDialog(messages.MSG_PIGEON_EXISTS, self.parent)
                 return False
@@ -421,11 +428,6 @@ class DetailsView(builder.GtkBuilder, gobject.GObject, component.Component):
 
         self.set_details(pigeon)
         self.emit("edit-finished", pigeon, self._operation)
-        combodata = [(self.widgets.combocolour, data["colour"]),
-                     (self.widgets.combostrain, data["strain"]),
-                     (self.widgets.comboloft, data["loft"])]
-        for combo, value in combodata:
-            combo.add_item(value)
         logger.debug("Operation '%s' finished", self._operation)
 
         return False
@@ -195,11 +195,15 @@ class BackupDialog(gtk.Dialog):
     def restorebackup_clicked(self, widget):
         zipfile = self.fcButtonRestore.get_filename()
         if zipfile:
+            # The database files are replaced, they can't be in use
+            database.worker.shutdown()
+            database.session.close()
             if backup.restore_backup(zipfile):
                 msg = messages.MSG_RESTORE_SUCCES
                 InfoDialog(msg, self._parent)
                 gtk.main_quit()
             else:
+                database.session.open(database.session.dbfile)
                 msg = messages.MSG_RESTORE_FAILED
                 InfoDialog(msg, self._parent)
 
@@ -248,10 +252,11 @@ class PigeonListDialog(gtk.Dialog):
         self.buttonadd = self.add_button(gtk.STOCK_ADD, gtk.RESPONSE_APPLY)
         self.buttonadd.set_sensitive(False)
 
-        self._liststore = gtk.ListStore(object, str, str, str)
-        modelfilter = self._liststore.filter_new()
-        modelfilter.set_visible_func(self._visible_func)
-        self._treeview = gtk.TreeView(modelfilter)
+        self._liststore = gtk.ListStore(object, str, str, str, bool)
+        self._modelfilter = self._liststore.filter_new()
+        # Only show visible pigeons
+        self._modelfilter.set_visible_column(4)
+        self._treeview = gtk.TreeView(self._modelfilter)
         self._treeview.connect("button-press-event", self.on_treeview_press)
         columns = (_("Band no."), _("Year"), _("Name"))
         for index, column in enumerate(columns):
@@ -272,7 +277,7 @@ class PigeonListDialog(gtk.Dialog):
         self.vbox.pack_start(frame, True, True, 0)
 
         self.checkbutton = gtk.CheckButton(_("Show all pigeons"))
-        self.checkbutton.connect("toggled", lambda widget: modelfilter.refilter())
+        self.checkbutton.connect("toggled", self.on_checkbutton_toggled)
         self.vbox.pack_start(self.checkbutton, False, False, 0)
         self.show_all()
 
@@ -280,6 +285,11 @@ class PigeonListDialog(gtk.Dialog):
         model, rowiter = selection.get_selected()
         self.buttonadd.set_sensitive(not rowiter is None)
 
+    def on_checkbutton_toggled(self, widget):
+        # Show everything by bypassing the filter
+        model = self._liststore if widget.get_active() else self._modelfilter
+        self._treeview.set_model(model)
+
     def on_treeview_press(self, treeview, event):
         pthinfo = treeview.get_path_at_pos(int(event.x), int(event.y))
         if pthinfo is None: return
@@ -300,7 +310,7 @@ class PigeonListDialog(gtk.Dialog):
             if year is not None and int(year) < int(pigeon.year):
                 continue
             self._liststore.insert(0, [pigeon, pigeon.ring, pigeon.year,
-                                       pigeon.get_name()])
+                                       pigeon.get_name(), bool(pigeon.show)])
         self._liststore.set_sort_column_id(1, gtk.SORT_ASCENDING)
         self._liststore.set_sort_column_id(2, gtk.SORT_ASCENDING)
         self._treeview.get_selection().select_path(0)
@@ -310,10 +320,3 @@ class PigeonListDialog(gtk.Dialog):
         if not rowiter: return
         return model[rowiter][0]
 
-    def _visible_func(self, model, rowiter):
-        if self.checkbutton.get_active():
-            # Show everything
-            return True
-        # Only show visible pigeons
-        return bool(model.get_value(rowiter, 0).show)
-
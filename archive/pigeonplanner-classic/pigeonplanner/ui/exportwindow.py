@@ -22,7 +22,6 @@ logger = logging.getLogger(__name__)
 
 import gtk
 
-from pigeonplanner.core import pigeonparser
 from pigeonplanner.export import get_exporters
 from pigeonplanner.ui import builder
 from pigeonplanner.ui import component
@@ -30,6 +29,10 @@ from pigeonplanner.ui import filechooser
 from pigeonplanner.ui.messagedialog import ErrorDialog
 
 
+# Related data that can be exported along with the pigeons
+EXPORT_GROUPS = ["results", "breeding", "medication", "media", "status"]
+
+
 class ExportWindow(builder.GtkBuilder):
     def __init__(self, parent):
         builder.GtkBuilder.__init__(self, "ExportWindow.ui")
@@ -70,11 +73,13 @@ class ExportWindow(builder.GtkBuilder):
         elif self.widgets.radiovisible.get_active():
             pigeons = treeview.get_pigeons(True)
         else:
-            pigeons = pigeonparser.parser.pigeons.values()
+            pigeons = None
+        groups = [group for group in EXPORT_GROUPS
+                  if getattr(self.widgets, "check" + group).get_active()]
         exporter = self.__get_exporter()
         try:
-            exporter.run(filepath, pigeons)
-        except IOError as e:
+            exporter.run(filepath, pigeons, groups)
+        except (IOError, OSError) as e:
             logger.exception(e)
             ErrorDialog(
                 (_("The selected path is not writeable."), None, _("Error")),
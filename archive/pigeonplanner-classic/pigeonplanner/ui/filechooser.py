@@ -215,6 +215,30 @@ class ExportChooser(_FileChooserDialog):
         self.set_current_name(filename)
 
 
+class ImportChooser(_FileChooserDialog):
+
+    __gtype_name__ = "ImportChooser"
+
+    def __init__(self, parent, importers):
+        super(ImportChooser, self).__init__(parent, preview=False)
+        self.set_title(_("Select a file..."))
+        self._importers = importers
+        for importer in importers:
+            self.add_custom_filter(importer.filefilter)
+        self.add_button(gtk.STOCK_OPEN, gtk.RESPONSE_OK)
+
+    def get_importer(self):
+        filename = self.get_filename().lower()
+        for importer in self._importers:
+            if filename.endswith(importer.extension):
+                return importer
+        name = self.get_filter().get_name()
+        for importer in self._importers:
+            if importer.filefilter[0] == name:
+                return importer
+        return self._importers[0]
+
+
 #### Buttons
 class _FileChooserButton(gtk.FileChooserButton, _FileChooser):
     def __init__(self, folder=const.HOMEDIR,
@@ -18,7 +18,6 @@
 
 import os
 import sys
-import webbrowser
 from threading import Thread
 import logging
 logger = logging.getLogger()
@@ -79,10 +78,11 @@ def search_updates():
 
 def update_dialog():
     from pigeonplanner import messages
+    from pigeonplanner.core import common
     from pigeonplanner.ui.messagedialog import QuestionDialog
 
     if QuestionDialog(messages.MSG_UPDATE_NOW).run():
-        webbrowser.open(const.DOWNLOADURL)
+        common.open_url(const.DOWNLOADURL)
 
     return False
 
@@ -100,6 +100,8 @@ def run_ui(dbcode):
     setup_icons()
 
     from pigeonplanner import database
+    # Pass the results of the database worker to the main loop
+    database.worker.dispatch = gobject.idle_add
     if dbcode == database.DATABASE_TOO_NEW:
         from pigeonplanner import messages
         from pigeonplanner.ui.messagedialog import ErrorDialog
@@ -27,9 +27,10 @@ import gtk
 import gobject
 
 from pigeonplanner.core import const
+from pigeonplanner.core import logfile
+from pigeonplanner.core.logfile import SEVERITY
 
 
-SEVERITY = ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL", "TRACEBACK"]
 COLORS = {"DEBUG": "grey", "INFO": "green", "WARNING": "yellow",
           "ERROR": "red", "CRITICAL": "white", "TRACEBACK": "white"}
 
@@ -40,6 +41,7 @@ class LogDialog(gtk.Dialog):
         self.set_size_request(700,500)
         self.set_icon(self.render_icon(gtk.STOCK_FILE, gtk.ICON_SIZE_MENU))
 
+        self._logs = logfile.get_log_files()
         self.set_logfile()
 
         frame = gtk.Frame()
@@ -85,11 +87,10 @@ class LogDialog(gtk.Dialog):
         ##severity
         self.combo = gtk.combo_box_new_text()
         vbox.pack_start(self.combo, False, False, 0)
-        self.combo.connect("changed", self.reload_view)
-
         for s in SEVERITY:
             self.combo.append_text(s)
         self.combo.set_active(0)
+        self.combo.connect("changed", self.reload_view)
 
         ##logs
         self.combo_logs = gtk.combo_box_new_text()
@@ -97,10 +98,7 @@ class LogDialog(gtk.Dialog):
         self.combo_logs.connect("changed", self.set_logfile)
         self.combo_logs.connect("changed", self.reload_view)
 
-        logs = [const.LOGFILE]
-        if os.path.exists("%s.old" % const.LOGFILE):
-            logs.append("%s.old" % const.LOGFILE)
-        for log in logs:
+        for log in self._logs:
             self.combo_logs.append_text(os.path.basename(log))
         self.combo_logs.set_active(0)
 
@@ -112,42 +110,41 @@ class LogDialog(gtk.Dialog):
         self.connect("response", self.close)
         self.show_all()
 
-        gobject.timeout_add(1000, self.update)
+        self._timeout_id = gobject.timeout_add(1000, self.update)
         self.run()
 
     def set_logfile(self, widget=None):
         if widget is not None:
-            logfile = os.path.join(const.PREFDIR, widget.get_active_text())
+            logpath = self._logs[widget.get_active()]
         else:
-            logfile = const.LOGFILE
-        self.file = open(logfile, "r")
-        self.back_buffer = gtk.TextBuffer()
-        self.back_buffer.set_text(self.file.read())
-
-    def insert_color(self, bffr, line):
-        for s in SEVERITY[self.combo.get_active():]:
-            if s in line:
-                bffr.insert_with_tags(bffr.get_end_iter(), "%s\n" %line,
-                                      bffr.get_tag_table().lookup(s))
-                break
-
-    def reload_view(self, textview):
+            logpath = const.LOGFILE
+        self.index = logfile.LogIndex(logpath)
+        self.index.update()
+
+    def insert_lines(self, start=0):
         bffr = self.textview.get_buffer()
-        bffr.set_text("")
-        start, end = self.back_buffer.get_bounds()
-        for line in self.back_buffer.get_text(start, end).split("\n"):
-            self.insert_color(bffr, line)
+        table = bffr.get_tag_table()
+        severity = self.combo.get_active()
+        for line_severity, text in self.index.iter_blocks(severity, start):
+            bffr.insert_with_tags(bffr.get_end_iter(),
+                                  text.decode("utf-8", "replace"),
+                                  table.lookup(SEVERITY[line_severity]))
+
+    def reload_view(self, widget=None):
+        self.textview.get_buffer().set_text("")
+        self.insert_lines()
 
     def update(self):
-        try:
-            bffr = self.textview.get_buffer()
-            for line in self.file.readlines():
-                self.back_buffer.insert(self.back_buffer.get_end_iter(), line)
-                self.insert_color(bffr, line.strip())
-        except:
-            pass
-        else:
+        if self.index.compressed:
+            # Archives don't change
             return True
+        start = self.index.update()
+        if start is None:
+            # The logfile was rotated
+            self.reload_view()
+        else:
+            self.insert_lines(start)
+        return True
 
     def changed(self, vadjust):
         if not hasattr(vadjust, "need_scroll") or vadjust.need_scroll:
@@ -159,6 +156,6 @@ class LogDialog(gtk.Dialog):
                                   vadjust.upper) < vadjust.step_increment
 
     def close(self, widget=None, other=None):
-        self.file.close()
+        gobject.source_remove(self._timeout_id)
         self.destroy()
 
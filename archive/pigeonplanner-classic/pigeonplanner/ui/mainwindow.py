@@ -23,41 +23,34 @@ Main window class
 import os
 import os.path
 import time
-import webbrowser
 import logging
 logger = logging.getLogger(__name__)
 
 import gtk
+import gobject
 
 from pigeonplanner import messages
 from pigeonplanner import database
 from pigeonplanner.ui import tabs
-from pigeonplanner.ui import tools
 from pigeonplanner.ui import utils
 from pigeonplanner.ui import builder
 from pigeonplanner.ui import dialogs
 from pigeonplanner.ui import pedigree
-from pigeonplanner.ui import logdialog
 from pigeonplanner.ui import component
 from pigeonplanner.ui import detailsview
-from pigeonplanner.ui import exportwindow
-from pigeonplanner.ui import optionsdialog
-from pigeonplanner.ui import pedigreewindow
 from pigeonplanner.ui.widgets import treeview
+from pigeonplanner.ui.widgets import searchentry
 from pigeonplanner.ui.messagedialog import ErrorDialog, InfoDialog, QuestionDialog
 from pigeonplanner.core import enums
 from pigeonplanner.core import const
 from pigeonplanner.core import common
 from pigeonplanner.core import checks
 from pigeonplanner.core import errors
-from pigeonplanner.core import update
 from pigeonplanner.core import backup
 from pigeonplanner.core import config
+from pigeonplanner.core import reportdata
 from pigeonplanner.core import pigeon as corepigeon
 from pigeonplanner.core import pigeonparser
-from pigeonplanner.reportlib import report
-from pigeonplanner.reports import get_pedigree
-from pigeonplanner.reports.pigeons import PigeonsReport, PigeonsReportOptions
 
 try:
     from gtkosx_application import Application
@@ -80,6 +73,7 @@ class MainWindow(gtk.Window, builder.GtkBuilder, component.Component):
          <separator/>
          <menuitem action="Log"/>
          <separator/>
+         <menuitem action="Import"/>
          <menuitem action="Export"/>
          <menu action="PrintMenu">
             <menuitem action="PrintPigeons"/>
@@ -162,6 +156,14 @@ class MainWindow(gtk.Window, builder.GtkBuilder, component.Component):
         self.widgets.selection = self.widgets.treeview.get_selection()
         self.widgets.selection.connect("changed", self.on_selection_changed)
 
+        self.widgets.searchentry = searchentry.PigeonSearchEntry()
+        self.widgets.searchentry.connect("pigeon-activated", self.on_searchentry_pigeon_activated)
+        self.widgets.vbox1.pack_start(self.widgets.searchentry, False, False)
+        self.widgets.vbox1.reorder_child(self.widgets.searchentry, 0)
+        # Build the search index in the background once the window is shown
+        gobject.idle_add(pigeonparser.parser.index.build_step,
+                         priority=gobject.PRIORITY_LOW)
+
         self.pedigree = pedigree.DrawPedigree()
         self.detailsview = detailsview.DetailsView(self, True)
         self.widgets.aligndetails.add(self.detailsview.get_root_widget())
@@ -210,11 +212,14 @@ class MainWindow(gtk.Window, builder.GtkBuilder, component.Component):
             gtkosx.ready()
 
     def quit_program(self, widget=None, event=None, bckp=True):
+        database.worker.shutdown()
         try:
             database.session.optimize_database()
         except Exception as exc:
             logger.error("Database optimizing failed: %s", exc)
         database.session.close()
+        pigeonparser.parser.save_snapshot(const.PIGEONSNAPSHOT,
+                                          database.session.get_fingerprint())
 
         x, y = self.get_position()
         w, h = self.get_size()
@@ -231,7 +236,7 @@ class MainWindow(gtk.Window, builder.GtkBuilder, component.Component):
                 else:
                     InfoDialog(messages.MSG_BACKUP_FAILED, self)
                 config.set("backup.last", time.time())
-        config.save()
+        config.flush()
         gtk.main_quit()
 
     ####################
@@ -280,17 +285,53 @@ class MainWindow(gtk.Window, builder.GtkBuilder, component.Component):
         self.widgets.statusbar.pop(-1)
 
     def menuexport_activate(self, widget):
+        from pigeonplanner.ui import exportwindow
         exportwindow.ExportWindow(self)
 
+    @utils.catch_database_locked
+    def menuimport_activate(self, widget):
+        logger.debug(common.get_function_name())
+        from pigeonplanner.importer import get_importers
+        from pigeonplanner.ui import filechooser
+
+        dialog = filechooser.ImportChooser(self, get_importers())
+        response = dialog.run()
+        if response != gtk.RESPONSE_OK:
+            dialog.destroy()
+            return
+        filepath = dialog.get_filename()
+        importer = dialog.get_importer()
+        dialog.destroy()
+
+        try:
+            counts, pigeons = importer.run(filepath)
+        except errors.InvalidImportError as exc:
+            ErrorDialog((_("The file contains invalid data."), str(exc), _("Error")), self)
+            return
+        except (IOError, OSError, database.InvalidValueError) as exc:
+            logger.exception(exc)
+            ErrorDialog((_("The file could not be imported."), str(exc), _("Error")), self)
+            return
+        show_all = config.get("interface.show-all-pigeons")
+        self.widgets.treeview.add_pigeons([pigeon for pigeon in pigeons
+                                           if show_all or pigeon.get_visible()], False)
+        msg = _("%s pigeons have been imported.") % counts.get(database.Tables.PIGEONS, 0)
+        InfoDialog((msg, None, _("Import")), self)
+
     def menuprintpigeons_activate(self, widget):
         logger.debug(common.get_function_name())
+        from pigeonplanner.ui.tools.addressbook import check_user_info
+        from pigeonplanner.reportlib import report
+        from pigeonplanner.reports.pigeons import PigeonsReport, PigeonsReportOptions
 
         userinfo = common.get_own_address()
 
-        if not tools.check_user_info(self, userinfo["name"]):
+        if not check_user_info(self, userinfo["name"]):
             return
 
-        pigeons = self.widgets.treeview.get_pigeons(True)
+        pigeons = reportdata.PigeonsData(self.widgets.treeview.get_filter(),
+                                         config.get("interface.show-all-pigeons"),
+                                         self.widgets.treeview.get_sort())
         psize = common.get_pagesize_from_opts()
         reportopts = PigeonsReportOptions(psize)
         report(PigeonsReport, reportopts, pigeons, userinfo)
@@ -299,6 +340,8 @@ class MainWindow(gtk.Window, builder.GtkBuilder, component.Component):
         logger.debug(common.get_function_name())
         pigeon = self.widgets.treeview.get_selected_pigeon()
         if pigeon is None or isinstance(pigeon, list): return
+        from pigeonplanner.reportlib import report
+        from pigeonplanner.reports import get_pedigree
         userinfo = common.get_own_address()
 
         PedigreeReport, PedigreeReportOptions = get_pedigree()
@@ -308,6 +351,8 @@ class MainWindow(gtk.Window, builder.GtkBuilder, component.Component):
 
     def menuprintblank_activate(self, widget):
         logger.debug(common.get_function_name())
+        from pigeonplanner.reportlib import report
+        from pigeonplanner.reports import get_pedigree
         userinfo = common.get_own_address()
 
         PedigreeReport, PedigreeReportOptions = get_pedigree()
@@ -337,10 +382,12 @@ class MainWindow(gtk.Window, builder.GtkBuilder, component.Component):
 
     def menualbum_activate(self, widget):
         logger.debug(common.get_function_name())
-        tools.PhotoAlbum(self)
+        from pigeonplanner.ui.tools.photoalbum import PhotoAlbum
+        PhotoAlbum(self)
 
     def menulog_activate(self, widget):
         logger.debug(common.get_function_name())
+        from pigeonplanner.ui import logdialog
         logdialog.LogDialog()
 
     def menuadd_activate(self, widget):
@@ -363,6 +410,7 @@ class MainWindow(gtk.Window, builder.GtkBuilder, component.Component):
         dialog = detailsview.DetailsDialog(pigeon, self, enums.Action.edit)
         dialog.details.connect("edit-finished", self.on_edit_finished)
 
+    @utils.catch_database_locked
     def menuremove_activate(self, widget):
         model, paths = self.widgets.selection.get_selected_rows()
 
@@ -394,8 +442,8 @@ class MainWindow(gtk.Window, builder.GtkBuilder, component.Component):
             if self.widgets.chkKeep.get_active():
                 logger.debug("Remove: Hiding the pigeon(s)")
                 for pigeon in pigeons:
-                    pigeon.show = 0
                     database.update_pigeon(pigeon.get_pindex(), {"show": 0})
+                    pigeonparser.parser.update_pigeon(pigeon.get_pindex())
             else:
                 remove_results = not self.widgets.chkResults.get_active()
                 for pigeon in pigeons:
@@ -423,6 +471,7 @@ class MainWindow(gtk.Window, builder.GtkBuilder, component.Component):
         if pigeon is None:
             # Disable pedigree shortcut when no pigeon is selected
             return
+        from pigeonplanner.ui import pedigreewindow
         pedigreewindow.PedigreeWindow(self, self.pedigree, pigeon)
 
     def menuaddresult_activate(self, widget):
@@ -440,6 +489,7 @@ class MainWindow(gtk.Window, builder.GtkBuilder, component.Component):
 
     def menupref_activate(self, widget):
         logger.debug(common.get_function_name())
+        from pigeonplanner.ui import optionsdialog
         dialog = optionsdialog.OptionsDialog(self)
         dialog.connect("interface-changed", self.on_interface_changed)
 
@@ -465,38 +515,44 @@ class MainWindow(gtk.Window, builder.GtkBuilder, component.Component):
 
     def menuvelocity_activate(self, widget):
         logger.debug(common.get_function_name())
-        tools.VelocityCalculator(self)
+        from pigeonplanner.ui.tools.velocitycalculator import VelocityCalculator
+        VelocityCalculator(self)
 
     def menudistance_activate(self, widget):
         logger.debug(common.get_function_name())
-        tools.DistanceCalculator(self)
+        from pigeonplanner.ui.tools.distancecalculator import DistanceCalculator
+        DistanceCalculator(self)
 
     def menurace_activate(self, widget):
         logger.debug(common.get_function_name())
-        tools.RacepointManager(self)
+        from pigeonplanner.ui.tools.racepointmanager import RacepointManager
+        RacepointManager(self)
 
     def menuaddresses_activate(self, widget):
         logger.debug(common.get_function_name())
-        tools.AddressBook(self)
+        from pigeonplanner.ui.tools.addressbook import AddressBook
+        AddressBook(self)
 
     def menudata_activate(self, widget):
         logger.info(common.get_function_name())
-        tools.DataManager(self)
+        from pigeonplanner.ui.tools.datamanager import DataManager
+        DataManager(self)
 
     def menuhelp_activate(self, widget):
         logger.debug(common.get_function_name())
-        webbrowser.open(const.DOCURLMAIN)
+        common.open_url(const.DOCURLMAIN)
 
     def menuhome_activate(self, widget):
         logger.debug(common.get_function_name())
-        webbrowser.open(const.WEBSITE)
+        common.open_url(const.WEBSITE)
 
     def menuforum_activate(self, widget):
         logger.debug(common.get_function_name())
-        webbrowser.open(const.FORUMURL)
+        common.open_url(const.FORUMURL)
 
     def menuupdate_activate(self, widget):
         logger.debug(common.get_function_name())
+        from pigeonplanner.core import update
         try:
             new, msg = update.update()
         except update.UpdateError as exc:
@@ -506,7 +562,7 @@ class MainWindow(gtk.Window, builder.GtkBuilder, component.Component):
         title = _("Search for updates...")
         if new:
             if QuestionDialog((msg, _("Go to the website?"), title), self).run():
-                webbrowser.open(const.DOWNLOADURL)
+                common.open_url(const.DOWNLOADURL)
         else:
             InfoDialog((msg, None, title), self)
 
@@ -519,6 +575,7 @@ class MainWindow(gtk.Window, builder.GtkBuilder, component.Component):
         dialogs.AboutDialog(self)
 
     # range callbacks
+    @utils.catch_database_locked
     def on_rangeadd_clicked(self, widget):
         rangefrom = self.widgets.entryRangeFrom.get_text()
         rangeto = self.widgets.entryRangeTo.get_text()
@@ -536,17 +593,17 @@ class MainWindow(gtk.Window, builder.GtkBuilder, component.Component):
             return
 
         logger.debug("Adding a range of pigeons")
-        value = int(rangefrom)
-        while value <= int(rangeto):
+        existing = database.get_all_pindexes()
+        rows = []
+        for value in xrange(int(rangefrom), int(rangeto)+1):
             band = str(value)
             pindex = common.get_pindex_from_band(band, rangeyear)
-            logger.debug("Range: adding '%s'", pindex)
-            if database.pigeon_exists(pindex):
-                value += 1
+            if pindex in existing:
                 continue
-            pigeon = pigeonparser.parser.add_empty_pigeon(pindex, rangesex)
-            self.widgets.treeview.add_pigeon(pigeon)
-            value += 1
+            rows.append(pigeonparser.get_empty_pigeon_data(pindex, rangesex))
+        logger.debug("Range: adding %s pigeons", len(rows))
+        pigeons = pigeonparser.parser.add_pigeons(rows)
+        self.widgets.treeview.add_pigeons(pigeons)
 
         self.widgets.rangedialog.hide()
 
@@ -555,18 +612,11 @@ class MainWindow(gtk.Window, builder.GtkBuilder, component.Component):
 
     # Main treeview callbacks
     def on_treeview_pigeons_changed(self, treeview):
-        pigeons = self.widgets.treeview.get_pigeons(filtered=True)
-        total = len(pigeons)
-        cocks = 0
-        hens = 0
-        ybirds = 0
-        for pigeon in pigeons:
-            if pigeon.sex == enums.Sex.cock:
-                cocks += 1
-            elif pigeon.sex == enums.Sex.hen:
-                hens += 1
-            elif pigeon.sex == enums.Sex.unknown:
-                ybirds += 1
+        counter = treeview.get_counter()
+        total = counter.get_total()
+        cocks = counter.get_sex_count(enums.Sex.cock)
+        hens = counter.get_sex_count(enums.Sex.hen)
+        ybirds = counter.get_sex_count(enums.Sex.unknown)
 
         self.widgets.labelStatTotal.set_markup("<b>%i</b>" %total)
         self.widgets.labelStatCocks.set_markup("<b>%i</b>" %cocks)
@@ -574,6 +624,11 @@ class MainWindow(gtk.Window, builder.GtkBuilder, component.Component):
         self.widgets.labelStatYoung.set_markup("<b>%i</b>" %ybirds)
         self.widgets.statusbar.set_total(total)
 
+    def on_searchentry_pigeon_activated(self, entry, pindex):
+        if not self.widgets.treeview.select_pigeon(None, pindex):
+            self.widgets.statusbar.display_message(
+                        _("The pigeon is hidden by the active filter"))
+
     def on_treeview_press(self, treeview, event):
         pthinfo = treeview.get_path_at_pos(int(event.x), int(event.y))
         if pthinfo is None: return
@@ -137,7 +137,8 @@ class OptionsDialog(builder.GtkBuilder, gobject.GObject):
         self.widgets.optionsdialog.destroy()
 
     def on_buttonok_clicked(self, widget):
-        restart = self.widgets.combolangs.get_active_text() != config.get("options.language")
+        language = self.widgets.combolangs.get_active_text()
+        restart = language is not None and language != config.get("options.language")
 
         if self.widgets.radioSexText.get_active():
             sexcoltype = 1
@@ -23,7 +23,7 @@ import os
 
 import gtk
 
-from pigeonplanner.ui import tools
+from pigeonplanner.ui.tools.addressbook import check_user_info
 from pigeonplanner.ui.filechooser import PdfSaver
 from pigeonplanner.ui.messagedialog import InfoDialog, ErrorDialog
 from pigeonplanner.core import common
@@ -68,8 +68,7 @@ class PedigreeWindow(gtk.Window):
         ring, year = pigeon.get_band()
         self.pdfname = "%s_%s_%s.pdf" % (_("Pedigree"), year, ring)
         self._build_ui()
-        pedigree.draw_pedigree(self._get_pedigree_table(), pigeon, True,
-                               self.on_pedigree_draw)
+        pedigree.draw_pedigree(self.canvas, pigeon, True, self.on_pedigree_draw)
 
         name = pigeon.get_name()
         if name:
@@ -104,26 +103,29 @@ class PedigreeWindow(gtk.Window):
         toolbar = uimanager.get_widget("/Toolbar")
         vbox.pack_start(toolbar, False, False)
 
-        self.table = table = gtk.Table(20, 7)
+        self.canvas = self.pedigree.create_canvas(True)
+        # The buttons are next to the pigeon and its parents
+        table = gtk.Table(2, 3)
+        table.attach(self.canvas, 1, 2, 0, 2, 0, 0)
 
         image = gtk.image_new_from_stock(gtk.STOCK_GO_BACK, gtk.ICON_SIZE_BUTTON)
         self.buttonprev = gtk.Button()
         self.buttonprev.add(image)
         self.buttonprev.set_relief(gtk.RELIEF_NONE)
         self.buttonprev.connect("clicked", self.on_navbutton_clicked, PREVIOUS)
-        table.attach(self.buttonprev, 0, 1, 7, 8, 0, 0)
+        table.attach(self.buttonprev, 0, 1, 0, 2, 0, 0)
         image = gtk.image_new_from_stock(gtk.STOCK_GO_FORWARD, gtk.ICON_SIZE_BUTTON)
         self.buttonnextsire = gtk.Button()
         self.buttonnextsire.add(image)
         self.buttonnextsire.set_relief(gtk.RELIEF_NONE)
         self.buttonnextsire.connect("clicked", self.on_navbutton_clicked, NEXT_SIRE)
-        table.attach(self.buttonnextsire, 8, 9, 3, 4, 0, 0)
+        table.attach(self.buttonnextsire, 2, 3, 0, 1, 0, 0)
         image = gtk.image_new_from_stock(gtk.STOCK_GO_FORWARD, gtk.ICON_SIZE_BUTTON)
         self.buttonnextdam = gtk.Button()
         self.buttonnextdam.add(image)
         self.buttonnextdam.set_relief(gtk.RELIEF_NONE)
         self.buttonnextdam.connect("clicked", self.on_navbutton_clicked, NEXT_DAM)
-        table.attach(self.buttonnextdam, 8, 9, 11, 12, 0, 0)
+        table.attach(self.buttonnextdam, 2, 3, 1, 2, 0, 0)
 
         alignment = gtk.Alignment(.5, .5)
         alignment.set_padding(4, 4, 8, 8)
@@ -132,9 +134,6 @@ class PedigreeWindow(gtk.Window):
         vbox.pack_start(alignment)
         self.add(vbox)
 
-    def _get_pedigree_table(self):
-        return self.table
-
     def on_close_dialog(self, widget, event=None):
         self.destroy()
         self.pedigree.draw_cb = None
@@ -149,7 +148,7 @@ class PedigreeWindow(gtk.Window):
             pigeon = sire if nav == NEXT_SIRE else dam
 
         self._current_pigeon = pigeon
-        self.pedigree.draw_pedigree(self._get_pedigree_table(), pigeon, True)
+        self.pedigree.draw_pedigree(self.canvas, pigeon, True)
 
     def on_pedigree_draw(self):
         can_prev = self._current_pigeon.pindex != self.pigeon.pindex
@@ -184,7 +183,7 @@ class PedigreeWindow(gtk.Window):
 
     def do_operation(self, print_action, save_path=None):
         userinfo = common.get_own_address()
-        if not tools.check_user_info(self, userinfo["name"]):
+        if not check_user_info(self, userinfo["name"]):
             return
 
         # Show a message to the user if the original image is not found and
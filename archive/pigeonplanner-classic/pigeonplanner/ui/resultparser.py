@@ -27,6 +27,7 @@ except ImportError:
     yapsy_available = False
 
 from pigeonplanner import database
+from pigeonplanner.ui import utils
 from pigeonplanner.ui import builder
 from pigeonplanner.ui import filechooser
 from pigeonplanner.ui.messagedialog import WarningDialog, ErrorDialog
@@ -115,6 +116,7 @@ class ResultParser(builder.GtkBuilder):
     def on_cancelbutton_clicked(self, widget):
         self.close_window()
 
+    @utils.catch_database_locked
     def on_addbutton_clicked(self, widget):
         point = self.widgets.racepointentry.get_text()
         out = self.widgets.pigeonsentry.get_text()
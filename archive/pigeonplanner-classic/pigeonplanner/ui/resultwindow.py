@@ -27,7 +27,7 @@ import gtk
 
 from pigeonplanner import database
 from pigeonplanner import messages
-from pigeonplanner.ui import tools
+from pigeonplanner.ui.tools.addressbook import check_user_info
 from pigeonplanner.ui import utils
 from pigeonplanner.ui import builder
 from pigeonplanner.ui.filechooser import PdfSaver, ExportChooser
@@ -35,6 +35,7 @@ from pigeonplanner.ui.messagedialog import ErrorDialog
 from pigeonplanner.core import common
 from pigeonplanner.core import config
 from pigeonplanner.core import errors
+from pigeonplanner.core import reportdata
 from pigeonplanner.reportlib import (report, ReportError, PRINT_ACTION_DIALOG,
                                      PRINT_ACTION_PREVIEW, PRINT_ACTION_EXPORT)
 from pigeonplanner.reports.results import ResultsReport, ResultsReportOptions
@@ -53,6 +54,7 @@ class BaseView(object):
     def __init__(self, root):
         self._root = root
         self.pigeon = None
+        self._future = None
 
         self.column2name = {
             self.LS_COL_DATE: "date",
@@ -125,6 +127,33 @@ class BaseView(object):
         raise NotImplementedError
 
     def fill_treeview(self):
+        """
+        Load the results on the database worker, the view is filled when
+        they're ready
+        """
+
+        self.cancel()
+        self.clear()
+        self._future = database.worker.submit(self.load_results)
+        self._future.connect(self._on_results_loaded)
+
+    def cancel(self):
+        """
+        Stop loading the results
+        """
+
+        if self._future is not None:
+            self._future.cancel()
+            self._future = None
+
+    def load_results(self):
+        """
+        Get the results from the database, called in the worker thread
+        """
+
+        raise NotImplementedError
+
+    def show_results(self, results):
         raise NotImplementedError
 
     def clear(self):
@@ -142,9 +171,24 @@ class BaseView(object):
     def update_filter(self):
         raise NotImplementedError
 
-    def get_report_data(self):
+    def get_sort(self):
+        """
+        Get the sort column as a tuple of its name and True if it's sorted
+        descending, or None if the results aren't sorted
+        """
+
         raise NotImplementedError
 
+    def _get_sort(self, model):
+        sort_column_id, order = model.get_sort_column_id()
+        if sort_column_id is None:
+            return None
+        return self.column2name[sort_column_id], order == gtk.SORT_DESCENDING
+
+    def _on_results_loaded(self, results):
+        self._future = None
+        self.show_results(results)
+
 
 class ClassicView(BaseView):
     ID = 0
@@ -243,14 +287,16 @@ class ClassicView(BaseView):
         for key, value in columnsdic.items():
             self.treeview.get_column(key).set_visible(value)
 
-    def fill_treeview(self):
+    def load_results(self):
+        return database.get_all_results()
+
+    def show_results(self, results):
         self.treeview.freeze_child_notify()
         self.treeview.set_model(None)
         self.liststore.set_default_sort_func(lambda *args: -1) 
         self.liststore.set_sort_column_id(-1, gtk.SORT_ASCENDING)
 
-        self.clear()
-        for result in database.get_all_results():
+        for result in results:
             placestr, coef, coefstr = common.format_place_coef(result["place"], result["out"])
             speed = common.format_speed(result["speed"])
             band, year = common.get_band_from_pindex(result["pindex"])
@@ -283,22 +329,8 @@ class ClassicView(BaseView):
         # Not used in this view
         pass
 
-    def get_report_data(self, flatten=False):
-        data = []
-        for row in self.sortmodel:
-            temp = {}
-            for col in (self.LS_COL_BAND, self.LS_COL_YEAR, self.LS_COL_DATE,
-                        self.LS_COL_RACEPOINT, self.LS_COL_PLACED, self.LS_COL_OUT,
-                        self.LS_COL_COEF, self.LS_COL_SPEED, self.LS_COL_SECTOR,
-                        self.LS_COL_TYPE, self.LS_COL_CATEGORY, self.LS_COL_WIND,
-                        self.LS_COL_WINDSPEED, self.LS_COL_WEATHER, self.LS_COL_TEMPERATURE,
-                        self.LS_COL_COMMENT, self.LS_COL_PLACEDINT, self.LS_COL_COEFFLOAT, 
-                        self.LS_COL_SPEEDFLOAT):
-                name = self.column2name[col]
-                temp[name] = self.sortmodel.get_value(row.iter, col)
-            temp["ring"] = "%s / %s" % (temp["band"], temp["year"][2:])
-            data.append(temp)
-        return data
+    def get_sort(self):
+        return self._get_sort(self.sortmodel)
 
     def _visible_func(self, model, treeiter):
         for item in self._filter:
@@ -434,11 +466,10 @@ class SplittedView(BaseView):
         for key, value in columnsdic.items():
             self.race_tv.get_column(key).set_visible(value)
 
-    def fill_treeview(self):
-        self.clear()
-        counter = 0
+    def load_results(self):
+        races = []
         for race in database.get_all_races():
-            self.results_cache[counter] = {"results": [], "filtered": []}
+            results = []
             resultstmp = database.get_results_for_data({"date": race["date"], "point": race["point"]})
             for result in resultstmp:
                 result = dict(result)
@@ -453,13 +484,16 @@ class SplittedView(BaseView):
                 result["coefstr"] = coefstr
                 result["placestr"] = placestr
 
-                self.results_cache[counter]["results"].append(result)
-                self.results_cache[counter]["filtered"].append(result)
+                results.append(result)
+            races.append((race, results))
+        return races
 
+    def show_results(self, races):
+        for counter, (race, results) in enumerate(races):
+            self.results_cache[counter] = {"results": results, "filtered": list(results)}
             self.race_ls.append([counter, race["date"], race["point"], race["type"],
                                           race["wind"], race["windspeed"],
                                           race["weather"], race["temperature"]])
-            counter += 1
 
     def clear(self):
         self.liststore.clear()
@@ -481,6 +515,10 @@ class SplittedView(BaseView):
         self._filter_races = races
         self._filter_results = results
 
+    def get_sort(self):
+        # The results of a race are kept in order of their place
+        return self._get_sort(self.race_sort)
+
     def update_filter(self):
         if not self._filter_results.has_filters():
             for result in self.results_cache.values():
@@ -501,33 +539,6 @@ class SplittedView(BaseView):
                     filtered.append(result)
             self.results_cache[race_key]["filtered"] = filtered
 
-    def get_report_data(self, flatten=False):
-        # data = [{"race": {}, "results": [{}]}]
-        # data_flat = [{}]
-        data = []
-        for row in self.race_sort:
-            temp = {"race": {}, "results": []}
-            # Get the wanted columns for the race
-            for col in (self.LS_COL_DATE, self.LS_COL_RACEPOINT, self.LS_COL_TYPE,
-                        self.LS_COL_WIND, self.LS_COL_WEATHER, self.LS_COL_TEMPERATURE):
-                name = self.column2name[col]
-                temp["race"][name] = self.race_sort.get_value(row.iter, col)
-            # Get the filtered results for the race
-            race_key = self.race_sort.get_value(row.iter, self.LS_COL_KEY)
-            temp["results"] = self.results_cache[race_key]["filtered"][:]
-            data.append(temp)
-
-        if flatten:
-            tempdata = []
-            for item in data:
-                for result in item["results"]:
-                    temp = result.copy()
-                    temp.update(item["race"])
-                    tempdata.append(temp)
-            data = tempdata
-
-        return data
-
     def on_race_sel_changed(self, selection):
         model, rowiter = selection.get_selected()
         if rowiter is None:
@@ -589,18 +600,19 @@ class ResultWindow(builder.GtkBuilder):
         self.widgets.resultview.set_filter(self._filter_races, self._filter_results)
         self.widgets.resultview.fill_treeview()
 
-        self.widgets.combopoint.set_data(database.get_all_data(database.Tables.RACEPOINTS), sort=False, active=None)
-        self.widgets.combosector.set_data(database.get_all_data(database.Tables.SECTORS), sort=False, active=None)
-        self.widgets.combotype.set_data(database.get_all_data(database.Tables.TYPES), sort=False, active=None)
-        self.widgets.combocategory.set_data(database.get_all_data(database.Tables.CATEGORIES), sort=False, active=None)
-        self.widgets.comboweather.set_data(database.get_all_data(database.Tables.WEATHER), sort=False, active=None)
-        self.widgets.combowind.set_data(database.get_all_data(database.Tables.WIND), sort=False, active=None)
+        self.widgets.combopoint.set_table(database.Tables.RACEPOINTS, active=None)
+        self.widgets.combosector.set_table(database.Tables.SECTORS, active=None)
+        self.widgets.combotype.set_table(database.Tables.TYPES, active=None)
+        self.widgets.combocategory.set_table(database.Tables.CATEGORIES, active=None)
+        self.widgets.comboweather.set_table(database.Tables.WEATHER, active=None)
+        self.widgets.combowind.set_table(database.Tables.WIND, active=None)
 
         self.widgets.resultwindow.set_transient_for(parent)
         self.widgets.resultwindow.show()
 
     # Callbacks
     def on_close_window(self, widget, event=None):
+        self.widgets.resultview.cancel()
         self.widgets.resultwindow.destroy()
 
     def on_close_filter(self, widget, event=None):
@@ -711,7 +723,7 @@ class ResultWindow(builder.GtkBuilder):
         response = chooser.run()
         if response == gtk.RESPONSE_OK:
             save_path = chooser.get_filename()
-            data = self.widgets.resultview.get_report_data(flatten=True)
+            data = self._get_report_data(grouped=False)
             columns = ["band", "year", "date", "point", "place", "out", "coef", "speed",
                        "sector", "type", "category", "wind", "windspeed", "weather",
                        "temperature", "comment"]
@@ -753,12 +765,26 @@ class ResultWindow(builder.GtkBuilder):
         self.widgets.resultview.update_filter()
         self.widgets.resultview.refresh()
 
+    def _get_report_data(self, grouped):
+        """
+        Get the results that match the filters, they're read from the
+        database while the report or export is written.
+
+        @param grouped: Group the results per race
+        """
+
+        view = self.widgets.resultview
+        items = [utils.TreeviewFilter.FilterItem(view.column2name[item.name], item.value,
+                                                 item.operator, item.type)
+                 for item in list(self._filter_races) + list(self._filter_results)]
+        return reportdata.ResultsData(items, grouped, view.get_sort())
+
     def _do_operation(self, print_action, save_path=None):
         userinfo = common.get_own_address()
-        if not tools.check_user_info(self.widgets.resultwindow, userinfo["name"]):
+        if not check_user_info(self.widgets.resultwindow, userinfo["name"]):
             return
 
-        data = self.widgets.resultview.get_report_data()
+        data = self._get_report_data(config.get("interface.results-mode") == 1)
 
         psize = common.get_pagesize_from_opts()
         opts = ResultsReportOptions(psize, None, print_action, save_path,
@@ -97,6 +97,7 @@ class BreedingTab(builder.GtkBuilder, basetab.BaseTab):
                                 model[rowiter][COL_PINDEX])
         self.widgets.editdialog.show()
 
+    @utils.catch_database_locked
     def on_buttonremove_clicked(self, widget):
         model, rowiter = self.widgets.selection.get_selected()
         path = self.widgets.treestore.get_path(rowiter)
@@ -131,6 +132,7 @@ class BreedingTab(builder.GtkBuilder, basetab.BaseTab):
     def on_buttoncancel_clicked(self, widget):
         self.widgets.editdialog.hide()
 
+    @utils.catch_database_locked
     def on_buttonsave_clicked(self, widget):
         # Get and check bands
         try:
@@ -168,10 +170,9 @@ class BreedingTab(builder.GtkBuilder, basetab.BaseTab):
                 "comment": textbuffer.get_text(*textbuffer.get_bounds())}
 
         # Add the child pigeons if needed
-        self._add_child_pigeon(pindex1, sire, dam,
-                               self.widgets.listcheckedit1.get_active())
-        self._add_child_pigeon(pindex2, sire, dam,
-                               self.widgets.listcheckedit2.get_active())
+        self._add_child_pigeons([(pindex1, self.widgets.listcheckedit1.get_active()),
+                                 (pindex2, self.widgets.listcheckedit2.get_active())],
+                                sire, dam)
 
         # Update when editing record
         if self._mode == enums.Action.edit:
@@ -265,33 +266,36 @@ class BreedingTab(builder.GtkBuilder, basetab.BaseTab):
             # This pigeon was removed from the database
             return "%s / %s" % common.get_band_from_pindex(pindex)
 
-    def _add_child_pigeon(self, pindex, sire, dam, active):
-        pigeon = None
-        try:
-            pigeon = pigeonparser.parser.add_empty_pigeon(pindex, enums.Sex.unknown,
-                                                          active, sire, dam)
-        except ValueError:
-            # Empty bandnumber
-            return
-        except database.InvalidValueError:
-            # Pigeon does exist, update parents
+    def _add_child_pigeons(self, children, sire, dam):
+        pigeons = []
+        rows = []
+        seen = set()
+        for pindex, active in children:
+            if not pindex or pindex in seen:
+                continue
+            seen.add(pindex)
             pigeon = pigeonparser.parser.get_pigeon(pindex)
+            if pigeon is None:
+                rows.append(pigeonparser.get_empty_pigeon_data(pindex, enums.Sex.unknown,
+                                                               active, sire, dam))
+                continue
 
+            # Pigeon does exist, update parents
             s, sy = common.get_band_from_pindex(sire)
             d, dy = common.get_band_from_pindex(dam)
-            pigeon.sire = s
-            pigeon.yearsire = sy
-            pigeon.dam = d
-            pigeon.yeardam = dy
             database.update_pigeon(pigeon.get_pindex(),
                                    {"sire": s, "yearsire": sy, "dam": d, "yeardam": dy})
             if active:
                 # Pigeon isn't visible, but user checked the "add to list" option
-                pigeon.show = 1
                 database.update_pigeon(pigeon.get_pindex(), {"show": 1})
-
-        if pigeon.get_visible() and not self.maintreeview.has_pigeon(pigeon):
-            self.maintreeview.add_pigeon(pigeon, False)
+            pigeonparser.parser.update_pigeon(pigeon.get_pindex())
+            pigeons.append(pigeon)
+        pigeons.extend(pigeonparser.parser.add_pigeons(rows))
+
+        self.maintreeview.add_pigeons([pigeon for pigeon in pigeons
+                                       if pigeon.get_visible() and
+                                          not self.maintreeview.has_pigeon(pigeon)],
+                                      False)
 
     def _add_parent_record(self, pindex):
         rowiter = self.widgets.treestore.append(None,
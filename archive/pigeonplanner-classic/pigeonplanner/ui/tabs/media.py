@@ -65,6 +65,7 @@ class MediaTab(builder.GtkBuilder, basetab.BaseTab):
         model, rowiter = self.widgets.selection.get_selected()
         common.open_file(model.get_value(rowiter, 2))
 
+    @utils.catch_database_locked
     def on_buttonadd_clicked(self, widget):
         chooser = filechooser.MediaChooser(self._parent)
         response = chooser.run()
@@ -77,6 +78,7 @@ class MediaTab(builder.GtkBuilder, basetab.BaseTab):
             self.set_pigeon(self.pigeon)
         chooser.destroy()
 
+    @utils.catch_database_locked
     def on_buttonremove_clicked(self, widget):
         if not QuestionDialog(messages.MSG_REMOVE_MEDIA, self._parent).run():
             return
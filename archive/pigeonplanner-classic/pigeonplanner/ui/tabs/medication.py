@@ -28,6 +28,7 @@ from pigeonplanner.ui.messagedialog import ErrorDialog
 from pigeonplanner.core import enums
 from pigeonplanner.core import common
 from pigeonplanner.core import errors
+from pigeonplanner.core import medication
 from pigeonplanner.core import pigeonparser
 
 
@@ -64,16 +65,14 @@ class MedicationTab(builder.GtkBuilder, basetab.BaseTab):
         self._mode = enums.Action.add
         self._clear_dialog_widgets()
         self._fill_select_treeview()
-        comboboxes.fill_combobox(self.widgets.comboloft,
-                                 database.get_all_data(database.Tables.LOFTS))
+        comboboxes.set_data_model(self.widgets.comboloft, database.Tables.LOFTS)
         self.widgets.dialog.show()
         self.widgets.entrydate2.grab_focus()
 
     def on_buttonedit_clicked(self, widget):
         self._mode = enums.Action.edit
         self._fill_select_treeview()
-        comboboxes.fill_combobox(self.widgets.comboloft,
-                                 database.get_all_data(database.Tables.LOFTS))
+        comboboxes.set_data_model(self.widgets.comboloft, database.Tables.LOFTS)
         med = database.get_medication_for_id(self._get_selected_medid())
         self.widgets.entrydate2.set_text(med["date"])
         self.widgets.entrydescription2.set_text(med["description"])
@@ -82,14 +81,16 @@ class MedicationTab(builder.GtkBuilder, basetab.BaseTab):
         self.widgets.entrydosage2.set_text(med["dosage"])
         self.widgets.entrycomment2.set_text(med["comment"])
         self.widgets.checkvaccination2.set_active(med["vaccination"])
+        pigeons = medication.get_pigeons(med["medid"])
         for row in self.widgets.liststoreselect:
             if not row[0]: continue
-            if row[2] in database.get_pigeons_for_medid(med["medid"]):
+            if row[2] in pigeons:
                 row[1] = True
 
         self.widgets.dialog.show()
         self.widgets.entrydate2.grab_focus()
 
+    @utils.catch_database_locked
     def on_buttonremove_clicked(self, widget):
         model, rowiter = self.widgets.selection.get_selected()
         path = self.widgets.liststore.get_path(rowiter)
@@ -113,35 +114,26 @@ class MedicationTab(builder.GtkBuilder, basetab.BaseTab):
         self.widgets.liststore.remove(rowiter)
         self.widgets.selection.select_path(path)
 
+    @utils.catch_database_locked
     def on_buttonsave_clicked(self, widget):
         try:
             data = self._get_entry_data()
         except errors.InvalidInputError as msg:
             ErrorDialog(msg.value, self._parent)
             return
-        pigeons = [row[2] for row in self.widgets.liststoreselect if row[1]]
+        pigeons = set(row[2] for row in self.widgets.liststoreselect if row[1])
         if self._mode == enums.Action.add:
-            data["medid"] = data["date"] + common.get_random_number(10)
-            for pindex in pigeons:
-                data["pindex"] = pindex
-                database.add_medication(data)
-                # Only fill med treeview on current pigeon
-                if not pindex == self.pindex: continue
+            medid = medication.add_medication(data, pigeons)
+            # Only fill med treeview on current pigeon
+            if self.pindex in pigeons:
                 rowiter = self.widgets.liststore.insert(0,
-                                        [data["medid"], data["date"], data["description"]])
+                                        [medid, data["date"], data["description"]])
                 self.widgets.selection.select_iter(rowiter)
                 path = self.widgets.liststore.get_path(rowiter)
                 self.widgets.treeview.scroll_to_cell(path)
         else:
             medid = self._get_selected_medid()
-            pigeons_current = database.get_pigeons_for_medid(medid)
-            for pindex in [pindex for pindex in pigeons if pindex not in pigeons_current]:
-                tmpdata = {"medid": medid, "pindex": pindex}
-                tmpdata.update(data)
-                database.add_medication(tmpdata)
-            for pindex in [p for p in pigeons_current if p not in pigeons]:
-                database.remove_medication({"medid": medid, "pindex": pindex})
-            database.update_medication(medid, data)
+            medication.update_medication(medid, data, pigeons)
             model, rowiter = self.widgets.selection.get_selected()
             self.widgets.liststore.set(rowiter, 1, data["date"], 2, data["description"])
             self.widgets.selection.emit("changed")
@@ -28,10 +28,10 @@ class PedigreeTab(WidgetFactory, basetab.BaseTab):
         basetab.BaseTab.__init__(self, "PedigreeTab", _("Pedigree"), "icon_pedigree.png")
         self.pedigree = pedigree
 
-        tablesire = gtk.Table(7, 5)
+        canvassire = self.pedigree.create_canvas()
         alignsire = gtk.Alignment(.5, .5, 1, 1)
         alignsire.set_padding(4, 4, 4, 4)
-        alignsire.add(tablesire)
+        alignsire.add(canvassire)
         framesire = gtk.Frame(_("<b>Pedigree sire</b>"))
         framesire.get_label_widget().set_use_markup(True)
         framesire.set_shadow_type(gtk.SHADOW_IN)
@@ -40,10 +40,10 @@ class PedigreeTab(WidgetFactory, basetab.BaseTab):
         alignsiretop.set_padding(2, 2, 2, 2)
         alignsiretop.add(framesire)
 
-        tabledam = gtk.Table(7, 5)
+        canvasdam = self.pedigree.create_canvas()
         aligndam = gtk.Alignment(.5, .5, 1, 1)
         aligndam.set_padding(4, 4, 4, 4)
-        aligndam.add(tabledam)
+        aligndam.add(canvasdam)
         framedam = gtk.Frame(_("<b>Pedigree dam</b>"))
         framedam.get_label_widget().set_use_markup(True)
         framedam.set_shadow_type(gtk.SHADOW_IN)
@@ -57,13 +57,13 @@ class PedigreeTab(WidgetFactory, basetab.BaseTab):
         self.widgets._root.pack_start(aligndamtop, True, True, 0)
         self.widgets._root.show_all()
 
-        self._tables = [tablesire, tabledam]
+        self._canvases = [canvassire, canvasdam]
         # Start immediately with an empty pedigree
         self.clear_pigeon()
 
     # Public methods
     def set_pigeon(self, pigeon=None):
-        self.pedigree.draw_pedigree(self._tables, pigeon)
+        self.pedigree.draw_pedigree(self._canvases, pigeon)
 
     def clear_pigeon(self):
         self.set_pigeon()
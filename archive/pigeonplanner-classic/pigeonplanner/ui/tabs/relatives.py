@@ -125,24 +125,27 @@ class RelativesTab(WidgetFactory, basetab.BaseTab, HiddenPigeonsMixin):
             pindex_dam = pigeon.get_dam_pindex()
             sex = pigeon.get_sex()
             seximg = utils.get_sex_image(sex)
+            style = self._get_hidden_style(pigeon)
             # Offspring
             if pindex_sire == pindex_selected or pindex_dam == pindex_selected:
-                self._liststoreoff.insert(0, [pigeon, ring, year, sex, seximg])
+                self._liststoreoff.insert(0, [pigeon, ring, year, sex, seximg] + style)
             # Half relatives
             if pindex_sire_sel and pindex_sire_sel == pindex_sire and not\
                (pindex_sire_sel == pindex_sire and pindex_dam_sel == pindex_dam):
                 self._liststorehalf.insert(0, [pigeon, ring, year,
-                                               pigeon.get_sire_string(True), sex, seximg])
+                                               pigeon.get_sire_string(True), sex, seximg]
+                                              + style)
             if pindex_dam_sel and pindex_dam_sel == pindex_dam and not\
                (pindex_sire_sel == pindex_sire and pindex_dam_sel == pindex_dam):
                 self._liststorehalf.insert(0, [pigeon, ring, year,
-                                               pigeon.get_dam_string(True), sex, seximg])
+                                               pigeon.get_dam_string(True), sex, seximg]
+                                              + style)
             # Direct relatives
             # We need both sire and dam to retrieve these
             if not pindex_sire_sel or not pindex_dam_sel: continue
             if pindex_sire_sel == pindex_sire and pindex_dam_sel == pindex_dam\
                and not pindex == pindex_selected:
-                self._liststoredirect.insert(0, [pigeon, ring, year, sex, seximg])
+                self._liststoredirect.insert(0, [pigeon, ring, year, sex, seximg] + style)
 
         self._liststoredirect.set_sort_column_id(1, gtk.SORT_ASCENDING)
         self._liststoredirect.set_sort_column_id(2, gtk.SORT_ASCENDING)
@@ -159,31 +162,27 @@ class RelativesTab(WidgetFactory, basetab.BaseTab, HiddenPigeonsMixin):
     # Internal methods
     def _build_treeview(self, treeview, extended=False):
         pb_id = 4
-        store = [object, str, str, str, gtk.gdk.Pixbuf]
+        store = [object, str, str, str, gtk.gdk.Pixbuf] + self.hidden_style_columns
         columns = [_("Band no."), _("Year")]
         if extended:
             pb_id = 5
             store.insert(1, str)
             columns.append(_("Common parent"))
         liststore = gtk.ListStore(*store)
-        modelfilter = liststore.filter_new()
-        modelfilter.set_visible_func(self._visible_func)
-        treeview.set_model(modelfilter)
         treeview.connect("button-press-event", self.on_treeview_press)
         for index, column in enumerate(columns):
             textrenderer = gtk.CellRendererText()
             tvcolumn = gtk.TreeViewColumn(column, textrenderer, text=index+1)
             tvcolumn.set_sort_column_id(index+1)
             tvcolumn.set_resizable(True)
-            tvcolumn.set_cell_data_func(textrenderer, self._cell_func)
             treeview.append_column(tvcolumn)
         pbrenderer = gtk.CellRendererPixbuf()
         pbrenderer.set_property("xalign", 0.0)
         tvcolumn = gtk.TreeViewColumn(_("Sex"), pbrenderer, pixbuf=pb_id)
         tvcolumn.set_sort_column_id(pb_id-1)
         tvcolumn.set_resizable(True)
-        tvcolumn.set_cell_data_func(pbrenderer, self._cell_func)
         treeview.append_column(tvcolumn)
+        self._setup_hidden_style(treeview, liststore)
 
         return liststore
 
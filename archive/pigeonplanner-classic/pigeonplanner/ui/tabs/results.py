@@ -23,8 +23,6 @@ from pigeonplanner import database
 from pigeonplanner.ui import utils
 from pigeonplanner.ui import builder
 from pigeonplanner.ui import component
-from pigeonplanner.ui import resultwindow
-from pigeonplanner.ui import resultparser
 from pigeonplanner.ui.tabs import basetab
 from pigeonplanner.ui.messagedialog import ErrorDialog, QuestionDialog, InfoDialog
 from pigeonplanner.core import enums
@@ -546,12 +544,12 @@ class ResultsTab(builder.GtkBuilder, basetab.BaseTab):
         mainsel = self.widgets.resultview.maintree.get_selection()
         mainsel.connect("changed", self.on_selection_changed)
 
-        self.widgets.comboracepoint.set_data(database.get_all_data(database.Tables.RACEPOINTS), sort=False)
-        self.widgets.combosector.set_data(database.get_all_data(database.Tables.SECTORS), sort=False)
-        self.widgets.combotype.set_data(database.get_all_data(database.Tables.TYPES), sort=False)
-        self.widgets.combocategory.set_data(database.get_all_data(database.Tables.CATEGORIES), sort=False)
-        self.widgets.comboweather.set_data(database.get_all_data(database.Tables.WEATHER), sort=False)
-        self.widgets.combowind.set_data(database.get_all_data(database.Tables.WIND), sort=False)
+        self.widgets.comboracepoint.set_table(database.Tables.RACEPOINTS)
+        self.widgets.combosector.set_table(database.Tables.SECTORS)
+        self.widgets.combotype.set_table(database.Tables.TYPES)
+        self.widgets.combocategory.set_table(database.Tables.CATEGORIES)
+        self.widgets.comboweather.set_table(database.Tables.WEATHER)
+        self.widgets.combowind.set_table(database.Tables.WIND)
 
         self.widgets.dialog.set_transient_for(self._parent)
 
@@ -571,9 +569,11 @@ class ResultsTab(builder.GtkBuilder, basetab.BaseTab):
             utils.popup_menu(event, entries)
 
     def on_buttonall_clicked(self, widget):
+        from pigeonplanner.ui import resultwindow
         resultwindow.ResultWindow(self._parent)
 
     def on_buttonimport_clicked(self, widget):
+        from pigeonplanner.ui import resultparser
         resultparser.ResultParser(self._parent, pigeonparser.parser.pigeons.keys())
 
     def on_buttonadd_clicked(self, widget):
@@ -589,6 +589,7 @@ class ResultsTab(builder.GtkBuilder, basetab.BaseTab):
         self._mode = enums.Action.edit
         self._set_dialog(self._mode, result)
 
+    @utils.catch_database_locked
     def on_buttonremove_clicked(self, widget):
         if not QuestionDialog(messages.MSG_REMOVE_RESULT, self._parent).run():
             return
@@ -598,6 +599,7 @@ class ResultsTab(builder.GtkBuilder, basetab.BaseTab):
     def on_buttonclose_clicked(self, widget):
         self.widgets.dialog.hide()
 
+    @utils.catch_database_locked
     def on_buttonsave_clicked(self, widget):
         data = self._get_data()
         if data is None: return
@@ -620,15 +622,15 @@ class ResultsTab(builder.GtkBuilder, basetab.BaseTab):
                                        data["temperature"])
         self.widgets.resultview.refresh()
 
-        data = [(self.widgets.comboracepoint, data["point"], database.Tables.RACEPOINTS),
-                (self.widgets.combosector, data["sector"], database.Tables.SECTORS),
-                (self.widgets.combotype, data["type"], database.Tables.TYPES),
-                (self.widgets.combocategory, data["category"], database.Tables.CATEGORIES),
-                (self.widgets.comboweather, data["weather"], database.Tables.WEATHER),
-                (self.widgets.combowind, data["wind"], database.Tables.WIND)]
-        for combo, value, table in data:
+        # The comboboxes follow the data tables
+        data = [(data["point"], database.Tables.RACEPOINTS),
+                (data["sector"], database.Tables.SECTORS),
+                (data["type"], database.Tables.TYPES),
+                (data["category"], database.Tables.CATEGORIES),
+                (data["weather"], database.Tables.WEATHER),
+                (data["wind"], database.Tables.WIND)]
+        for value, table in data:
             database.add_data(table, value)
-            combo.add_item(value)
 
     def on_selection_changed(self, selection):
         model, rowiter = selection.get_selected()
@@ -649,6 +651,7 @@ class ResultsTab(builder.GtkBuilder, basetab.BaseTab):
     def on_comboracepoint_changed(self, widget):
         self._autofill_race()
 
+    @utils.catch_database_locked
     def on_addtopedigree_clicked(self, widget):
         result = self.widgets.resultview.get_selected()
         text = "%se %s %s %s." % (result["placed"], result["point"],
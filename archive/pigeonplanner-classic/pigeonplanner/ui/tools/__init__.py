@@ -15,11 +15,8 @@
 # You should have received a copy of the GNU General Public License
 # along with Pigeon Planner.  If not, see <http://www.gnu.org/licenses/>
 
-
-from pigeonplanner.ui.tools.addressbook import AddressBook, check_user_info
-from pigeonplanner.ui.tools.velocitycalculator import VelocityCalculator
-from pigeonplanner.ui.tools.distancecalculator import DistanceCalculator
-from pigeonplanner.ui.tools.photoalbum import PhotoAlbum
-from pigeonplanner.ui.tools.datamanager import DataManager
-from pigeonplanner.ui.tools.racepointmanager import RacepointManager
+"""
+The tools are only needed once the user opens them, import them from their
+own module when needed instead of loading all of them at startup.
+"""
 
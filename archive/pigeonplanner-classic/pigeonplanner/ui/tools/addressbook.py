@@ -26,6 +26,7 @@ from pigeonplanner.ui.widgets import latlongentry
 from pigeonplanner.ui.messagedialog import QuestionDialog
 from pigeonplanner.core import enums
 from pigeonplanner.core import errors
+from pigeonplanner.core import distance
 
 
 def check_user_info(parent, name):
@@ -76,6 +77,7 @@ class AddressBook(builder.GtkBuilder):
         self._mode = enums.Action.edit
         self._set_widgets(True)
 
+    @utils.catch_database_locked
     def on_buttonremove_clicked(self, widget):
         model, rowiter = self.widgets.selection.get_selected()
         path = self.widgets.liststore.get_path(rowiter)
@@ -89,6 +91,7 @@ class AddressBook(builder.GtkBuilder):
         self.widgets.liststore.remove(rowiter)
         self.widgets.selection.select_path(path)
 
+    @utils.catch_database_locked
     def on_buttonsave_clicked(self, widget):
         try:
             data = self._get_entry_data()
@@ -97,12 +100,14 @@ class AddressBook(builder.GtkBuilder):
         self._set_widgets(False)
         if self._mode == enums.Action.add:
             rowid = database.add_address(data)
+            distance.update_distances(addresses=[rowid])
             rowiter = self.widgets.liststore.insert(0, [rowid, data["name"]])
             self.widgets.selection.select_iter(rowiter)
             path = self.widgets.liststore.get_path(rowiter)
             self.widgets.treeview.scroll_to_cell(path)
         else:
             database.update_address(self._get_address_key(), data)
+            distance.update_distances(addresses=[self._get_address_key()])
             model, rowiter = self.widgets.selection.get_selected()
             self.widgets.liststore.set_value(rowiter, 1, data["name"])
             self.widgets.selection.emit("changed")
@@ -20,6 +20,7 @@ import gtk
 
 from pigeonplanner import database
 from pigeonplanner import messages
+from pigeonplanner.ui import utils
 from pigeonplanner.ui import builder
 from pigeonplanner.ui.widgets import comboboxes
 from pigeonplanner.ui.messagedialog import QuestionDialog
@@ -56,16 +57,17 @@ class DataManager(builder.GtkBuilder):
     def on_buttonhelp_clicked(self, widget):
         common.open_help(10)
 
+    @utils.catch_database_locked
     def on_buttonremove_clicked(self, widget):
         dataset = unicode(self.widgets.comboset.get_active_text())
         item = self.widgets.comboitem.get_active_text()
         if QuestionDialog(messages.MSG_REMOVE_ITEM,
                           self.widgets.window, (item, dataset)).run():
+            # The item is removed from the combobox with the data table
             database.remove_data(self.tables[dataset], item)
-            index = self.widgets.comboitem.get_active()
-            self.widgets.comboitem.remove_text(index)
             self.widgets.comboitem.set_active(0)
 
+    @utils.catch_database_locked
     def on_buttonadd_clicked(self, widget):
         dataset = unicode(self.widgets.comboset.get_active_text())
         item = self.widgets.entryitem.get_text()
@@ -106,6 +108,7 @@ class DataManager(builder.GtkBuilder):
         from pigeonplanner.ui.detailsview import DetailsDialog
         DetailsDialog(pigeon, self.widgets.window)
 
+    @utils.catch_database_locked
     def on_buttondelete_clicked(self, widget):
         for row_num in range(len(self.widgets.liststore)-1, -1, -1):
             row = self.widgets.liststore[row_num]
@@ -134,8 +137,7 @@ class DataManager(builder.GtkBuilder):
 
     # Private methods
     def _fill_item_combobox(self, dataset):
-        data = database.get_all_data(self.tables[dataset])
-        comboboxes.fill_combobox(self.widgets.comboitem, data)
+        comboboxes.set_data_model(self.widgets.comboitem, self.tables[dataset])
         value = self.widgets.comboitem.get_active_text() is not None
         self.widgets.buttonremove.set_sensitive(value)
 
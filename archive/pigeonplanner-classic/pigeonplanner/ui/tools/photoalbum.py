@@ -28,10 +28,13 @@ logger = logging.getLogger(__name__)
 from pigeonplanner import database
 from pigeonplanner.ui import utils
 from pigeonplanner.ui import builder
+from pigeonplanner.core import framecache
 from pigeonplanner.core import pigeonparser
 
 
 MARGIN = 6
+# Number of decoded images to keep, the shown one and its neighbours
+FRAME_CACHE_SIZE = 4
 
 (ZOOM_BEST_FIT,
  ZOOM_FIT_WIDTH,
@@ -80,8 +83,14 @@ class PhotoAlbum(builder.GtkBuilder):
         self.fill_iconview()
 
         self.pixbuf = None
+        self.filename = None
+        self.image_size = None
         self.interp = gtk.gdk.INTERP_BILINEAR
         self.max = (1600, 1200)
+        self.frames = framecache.FrameCache(decode_image, FRAME_CACHE_SIZE,
+                                            gobject.idle_add)
+        self._image_sizes = {}
+        self._scaled = None
         self.picture_no = len(self.widgets.iconview.get_model())
         self.current_picture = 0
         self.zoom = 1.0
@@ -173,14 +182,95 @@ class PhotoAlbum(builder.GtkBuilder):
         if self.current_picture != picture_no:
             self.widgets.iconview.select_path((picture_no,))
 
+    def get_filename(self, picture_no):
+        model = self.widgets.iconview.get_model()
+        pindex = model[picture_no][1]
+        return pigeonparser.parser.pigeons[pindex].get_image()
+
+    def get_image_sizes(self, filename):
+        """
+        Get the original size of an image and the size it's shown at with a
+        zoom of 100%. Only the header of the file is read.
+
+        @param filename: The path of the image
+        @return: Tuple of both sizes or None if the image can't be read
+        """
+
+        try:
+            return self._image_sizes[filename]
+        except KeyError:
+            pass
+        info = gtk.gdk.pixbuf_get_file_info(filename)
+        if info is None:
+            sizes = None
+        else:
+            original = info[1], info[2]
+            width, height = original
+            max_w, max_h = self.max
+            if (width < max_w and height < max_h):
+                sizes = original, original
+            else:
+                sizes = original, self.scale_to_fit(original, self.max)
+        self._image_sizes[filename] = sizes
+        return sizes
+
+    def get_frame_key(self, filename, zoom):
+        """
+        Get the key of the frame to show an image at a zoom level. Images are
+        decoded at the size they're shown at, but never larger than the
+        original, so the full resolution is only decoded past 100%.
+        """
+
+        (original_w, original_h), (width, height) = self.get_image_sizes(filename)
+        width = max(1, min(int(width * zoom), original_w))
+        height = max(1, min(int(height * zoom), original_h))
+        return filename, width, height
+
+    def prefetch_frames(self, key):
+        """
+        Decode the frame for the current zoom if it's not there yet and the
+        frames of the next and previous image, in that order.
+        """
+
+        keys = [key]
+        if self.picture_no > 1:
+            # The slideshow starts over after the last image
+            next = (self.current_picture + 1) % self.picture_no
+            for picture_no in (next, self.current_picture - 1):
+                if picture_no < 0 or picture_no == self.current_picture:
+                    continue
+                filename = self.get_filename(picture_no)
+                sizes = filename and self.get_image_sizes(filename)
+                if not sizes:
+                    continue
+                zoom = self.zoom
+                if self.zoom_mode == ZOOM_BEST_FIT:
+                    zoom = self.zoom_best_fit(sizes[1])
+                keys.append(self.get_frame_key(filename, zoom))
+        self.frames.prefetch(keys, self.on_frame_decoded)
+
+    def on_frame_decoded(self, key, frame):
+        if self.image_size is None:
+            return
+        if key == self.get_frame_key(self.filename, self.zoom):
+            self.pixbuf = frame
+            self.widgets.drawingarea.queue_draw()
+
     def set_zoom(self, zoom):
-        if not self.pixbuf:
+        if not self.image_size:
             return
 
         self.zoom = zoom
 
-        screen_width = int(self.pixbuf.get_width() * self.zoom + 2 * MARGIN)
-        screen_height = int(self.pixbuf.get_height() * self.zoom + 2 * MARGIN)
+        # Keep showing the current frame until the new one is decoded
+        key = self.get_frame_key(self.filename, self.zoom)
+        frame = self.frames.get(key)
+        if frame is not None:
+            self.pixbuf = frame
+        self.prefetch_frames(key)
+
+        screen_width = int(self.image_size[0] * self.zoom + 2 * MARGIN)
+        screen_height = int(self.image_size[1] * self.zoom + 2 * MARGIN)
         if screen_width < 1:
             screen_width = 1
         if screen_height < 1:
@@ -209,20 +299,23 @@ class PhotoAlbum(builder.GtkBuilder):
         else:
             return self.zoom
 
-    def zoom_best_fit(self):
-        if not self.pixbuf:
+    def zoom_best_fit(self, image_size=None):
+        image_size = image_size or self.image_size
+        if not image_size:
             return
 
         width, height, vsb_w, hsb_h = self.get_view_size()
-        zoom = min(width / float(self.pixbuf.get_width()), height /
-                                 float(self.pixbuf.get_height()))
+        zoom = min(width / float(image_size[0]), height /
+                                 float(image_size[1]))
 
         return zoom
 
     def on_window_delete(self, widget, event):
+        self.frames.close()
         return False
 
     def on_close_clicked(self, widget):
+        self.frames.close()
         self.widgets.photoalbum.destroy()
 
     def on_first_clicked(self, widget):
@@ -290,8 +383,8 @@ class PhotoAlbum(builder.GtkBuilder):
         if not self.pixbuf:
             return
 
-        picture_w = int(self.pixbuf.get_width() * self.zoom)
-        picture_h = int(self.pixbuf.get_height() * self.zoom)
+        picture_w = int(self.image_size[0] * self.zoom)
+        picture_h = int(self.image_size[1] * self.zoom)
 
         width, height, vsb_w, hsb_h = self.get_view_size()
         if picture_h > height:
@@ -308,10 +401,22 @@ class PhotoAlbum(builder.GtkBuilder):
             ytranslate += (height - picture_h) / 2
 
         self.context.translate(xtranslate, ytranslate)
-        self.context.set_source_pixbuf(self.pixbuf.scale_simple(picture_w,
-                                       picture_h, self.interp), 0, 0)
+        self.context.set_source_pixbuf(self.get_scaled_pixbuf(picture_w, picture_h), 0, 0)
         self.context.paint()
 
+    def get_scaled_pixbuf(self, width, height):
+        """
+        Get the frame at the size it's drawn at. Frames are mostly decoded at
+        that size already, others are scaled once and not on every expose.
+        """
+
+        if (self.pixbuf.get_width(), self.pixbuf.get_height()) == (width, height):
+            return self.pixbuf
+        if self._scaled is None or self._scaled[:3] != (self.pixbuf, width, height):
+            scaled = self.pixbuf.scale_simple(max(1, width), max(1, height), self.interp)
+            self._scaled = (self.pixbuf, width, height, scaled)
+        return self._scaled[3]
+
     def on_drawingarea_press(self, widget, event):
         if event.button == 2:
             self.widgets.zoom_fit_button.set_active(True)
@@ -345,8 +450,8 @@ class PhotoAlbum(builder.GtkBuilder):
         pindex = model[path][1]
         image = pigeonparser.parser.pigeons[pindex].get_image()
 
-        self.set_pixbuf(image)
         self.current_picture = path[0]
+        self.set_pixbuf(image)
 
         utils.set_multiple_sensitive(
             {self.widgets.first_button: self.current_picture,
@@ -359,20 +464,25 @@ class PhotoAlbum(builder.GtkBuilder):
              self.widgets.slide_button: True})
 
     def set_pixbuf(self, filename):
-        if not filename:
+        self.filename = filename
+        sizes = filename and self.get_image_sizes(filename)
+        if not sizes:
+            if filename:
+                logger.error("Could not read image: %s" % filename)
             self.pixbuf = None
+            self.image_size = None
             self.widgets.drawingarea.queue_draw()
             return
 
-        pixbuf = gtk.gdk.pixbuf_new_from_file(filename)
-        width, height = pixbuf.get_width(), pixbuf.get_height()
-        max_w, max_h = self.max
-        if (width < max_w and height < max_h):
-            self.pixbuf = pixbuf
-        else:
-            width, height = self.scale_to_fit((width, height), self.max)
-            self.pixbuf = pixbuf.scale_simple(width, height, self.interp)
-        self.widgets.drawingarea.queue_draw()
+        self.image_size = sizes[1]
+        if self.zoom_mode == ZOOM_BEST_FIT:
+            self.zoom = self.zoom_best_fit()
+        try:
+            self.pixbuf = self.frames.load(self.get_frame_key(filename, self.zoom))
+        except gobject.GError as exc:
+            logger.error("Could not load image %s: %s" % (filename, exc))
+            self.pixbuf = None
+        self.set_zoom(self.zoom)
 
     def scale_to_fit(self, image, frame):
         image_width, image_height = image
@@ -400,3 +510,10 @@ class PhotoAlbum(builder.GtkBuilder):
              self.widgets.zoom_fit_button,
              self.widgets.slide_button], False)
 
+
+def decode_image(filename, width, height):
+    """
+    Decode an image at the given size, keeping its aspect ratio
+    """
+
+    return gtk.gdk.pixbuf_new_from_file_at_scale(filename, width, height, True)
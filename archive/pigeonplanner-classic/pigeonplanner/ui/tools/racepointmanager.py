@@ -20,12 +20,14 @@ import gtk
 import gobject
 
 from pigeonplanner import database
+from pigeonplanner.ui import utils
 from pigeonplanner.ui import builder
 from pigeonplanner.ui import locationchooser
 from pigeonplanner.ui.widgets import comboboxes
 from pigeonplanner.ui.widgets import latlongentry
 from pigeonplanner.core import common
 from pigeonplanner.core import errors
+from pigeonplanner.core import distance
 from .datamanager import DataManager
 from .distancecalculator import DistanceCalculator
 
@@ -86,6 +88,7 @@ class RacepointManager(builder.GtkBuilder):
             self.widgets.combodistance.set_active(calculator.get_unit())
         calculator.widgets.window.destroy()
 
+    @utils.catch_database_locked
     def on_buttonsave_clicked(self, widget):
         try:
             latitude = self.widgets.entrylatitude.get_text()
@@ -93,10 +96,12 @@ class RacepointManager(builder.GtkBuilder):
         except errors.InvalidInputError:
             return
 
-        database.update_racepoint(self.widgets.combopoint.get_active_text(),
+        racepoint = self.widgets.combopoint.get_active_text()
+        database.update_racepoint(racepoint,
                                   {"xco": latitude, "yco": longitude,
                                    "distance": self.widgets.spindistance.get_value(),
                                    "unit": self.widgets.combodistance.get_active()})
+        distance.update_distances(racepoints=[racepoint])
         def clear_image():
             self.widgets.image.clear()
             return False
@@ -104,8 +109,7 @@ class RacepointManager(builder.GtkBuilder):
         gobject.timeout_add(3000, clear_image)
 
     def _fill_racepoints_combo(self):
-        data = database.get_all_data(database.Tables.RACEPOINTS)
-        comboboxes.fill_combobox(self.widgets.combopoint, data)
+        comboboxes.set_data_model(self.widgets.combopoint, database.Tables.RACEPOINTS)
         value = self.widgets.combopoint.get_active_text() is not None
         self.widgets.entrylatitude.set_sensitive(value)
         self.widgets.entrylongitude.set_sensitive(value)
@@ -18,19 +18,33 @@
 
 import os
 import operator
+import functools
 
 import gtk
 
+from pigeonplanner import messages
+from pigeonplanner import database
 from pigeonplanner.core import const
 from pigeonplanner.core import common
 from pigeonplanner.core import config
+from pigeonplanner.ui.messagedialog import ErrorDialog
 
 
+# Loaded once, the same pixbuf is shown in every row
+_pixbufs = {}
+
+def _get_pixbuf(filename):
+    try:
+        return _pixbufs[filename]
+    except KeyError:
+        pixbuf = _pixbufs[filename] = gtk.gdk.pixbuf_new_from_file(filename)
+        return pixbuf
+
 def get_sex_image(sex):
-    return gtk.gdk.pixbuf_new_from_file(common.SEX_IMGS[sex])
+    return _get_pixbuf(common.SEX_IMGS[sex])
 
 def get_status_image(status):
-    return gtk.gdk.pixbuf_new_from_file(common.STATUS_IMGS[status])
+    return _get_pixbuf(common.STATUS_IMGS[status])
 
 def create_stock_button(icons):
     """
@@ -97,22 +111,76 @@ def popup_menu(event, entries):
         menu.append(item)
     menu.popup(None, None, None, event.button, event.time)
 
+def catch_database_locked(func):
+    """
+    Decorator for the callbacks that save changes to the database. The user
+    is told when the changes couldn't be saved because the database is in use.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        except database.DatabaseLockedError:
+            ErrorDialog(messages.MSG_DATABASE_LOCKED)
+    return wrapper
+
 
 class HiddenPigeonsMixin(object):
-    def _visible_func(self, model, rowiter):
-        show = model.get_value(rowiter, 0).show
-        if not show:
-            return not config.get("interface.missing-pigeon-hide")
-        return True
-
-    def _cell_func(self, column, cell, model, rowiter):
-        show = model.get_value(rowiter, 0).show
-
-        color = "white"
-        if config.get("interface.missing-pigeon-color"):
-            if not show:
-                color = config.get("interface.missing-pigeon-color-value")
-        cell.set_property("cell-background", color)
+    """
+    Mark the pigeons that are hidden from the main list in other pigeon lists.
+
+    The background colour and visibility of a row are stored in the last two
+    columns of the model, see hidden_style_columns, with the pigeon object in
+    the first column. They're calculated when a row is added and only updated
+    when the related settings change, so drawing and filtering the list
+    doesn't call back into Python.
+    """
+
+    hidden_style_columns = [str, bool]
+
+    def _setup_hidden_style(self, treeview, liststore):
+        """
+        Set a filtered liststore on the treeview and colour all of its
+        columns. Call this after the columns are added.
+
+        @param treeview: The treeview to show the liststore in
+        @param liststore: A liststore ending with the hidden_style_columns
+        """
+
+        if not hasattr(self, "_hidden_liststores"):
+            self._hidden_liststores = []
+            self._hidden_config = config.snapshot(
+                                hide="interface.missing-pigeon-hide",
+                                color="interface.missing-pigeon-color",
+                                color_value="interface.missing-pigeon-color-value")
+            self._hidden_config.connect(self._on_hidden_config_changed)
+        self._hidden_liststores.append(liststore)
+
+        ncolumns = liststore.get_n_columns()
+        modelfilter = liststore.filter_new()
+        modelfilter.set_visible_column(ncolumns-1)
+        treeview.set_model(modelfilter)
+        for column in treeview.get_columns():
+            for renderer in column.get_cell_renderers():
+                column.add_attribute(renderer, "cell-background", ncolumns-2)
+
+    def _get_hidden_style(self, pigeon):
+        """
+        Get the values of the style columns for this pigeon
+        """
+
+        if pigeon.show:
+            return [None, True]
+        color = self._hidden_config.color_value if self._hidden_config.color else None
+        return [color, not self._hidden_config.hide]
+
+    def _on_hidden_config_changed(self):
+        for liststore in self._hidden_liststores:
+            ncolumns = liststore.get_n_columns()
+            for row in liststore:
+                color, visible = self._get_hidden_style(row[0])
+                liststore.set(row.iter, ncolumns-2, color, ncolumns-1, visible)
 
 
 class TreeviewFilter(object):
@@ -18,15 +18,76 @@
 # along with Pigeon Planner.  If not, see <http://www.gnu.org/licenses/>
 
 
+import difflib
 import operator
 
 import gtk
 
+from pigeonplanner import database
 from pigeonplanner.ui import utils
 from pigeonplanner.core import common
 from pigeonplanner.core import config
 
 
+# One model per data table, shared by all comboboxes and completions
+_data_stores = {}
+_data_items = {}
+
+
+def get_data_store(table):
+    """
+    Get the shared model with the items of a data table. It's filled once
+    and kept up to date when items are added or removed.
+
+    @param table: One of the data tables
+    """
+
+    try:
+        return _data_stores[table]
+    except KeyError:
+        pass
+    store = gtk.ListStore(str)
+    items = database.get_all_data(table)
+    for item in items:
+        store.append([item])
+    _data_stores[table] = store
+    _data_items[table] = items
+    return store
+
+def _on_data_changed(table):
+    store = _data_stores.get(table)
+    if store is None:
+        return
+    # Only insert and remove the changed rows, the comboboxes keep their
+    # active item
+    old = _data_items[table]
+    new = database.get_all_data(table)
+    matcher = difflib.SequenceMatcher(None, old, new, autojunk=False)
+    for tag, i1, i2, j1, j2 in reversed(matcher.get_opcodes()):
+        if tag == "equal":
+            continue
+        for index in range(i2 - 1, i1 - 1, -1):
+            del store[index]
+        for index, item in enumerate(new[j1:j2], i1):
+            store.insert(index, [item])
+    _data_items[table] = new
+
+database.connect_data_changed(_on_data_changed)
+
+def set_data_model(combobox, table, active=0):
+    """
+    Show the items of a data table in a combobox
+
+    @param combobox: The combobox, its model has one text column
+    @param table: One of the data tables
+    @param active: index of the active value
+    """
+
+    combobox.set_model(get_data_store(table))
+    if active is not None:
+        combobox.set_active(active)
+
+
 def set_entry_completion(widget):
     """
     Set entrycompletion on given widget
@@ -69,8 +130,8 @@ class SexCombobox(gtk.ComboBox):
         store = gtk.ListStore(int, str, gtk.gdk.Pixbuf)
         gtk.ComboBox.__init__(self, store)
 
-        for key, value in common.get_sexdic().items():
-            store.insert(key, [key, value, utils.get_sex_image(key)])
+        for key, value in enumerate(common.get_sex_labels()):
+            store.append([key, value, utils.get_sex_image(key)])
 
         pb = gtk.CellRendererPixbuf()
         self.pack_start(pb, expand=False)
@@ -94,8 +155,8 @@ class StatusCombobox(gtk.ComboBox):
         store = gtk.ListStore(int, str, gtk.gdk.Pixbuf)
         gtk.ComboBox.__init__(self, store)
 
-        for key, value in common.get_statusdic().items():
-            store.insert(key, [key, value, utils.get_status_image(key)])
+        for key, value in enumerate(common.get_status_labels()):
+            store.append([key, value, utils.get_status_image(key)])
 
         pb = gtk.CellRendererPixbuf()
         self.pack_start(pb, expand=False)
@@ -148,14 +209,16 @@ class DataComboboxEntry(gtk.ComboBoxEntry):
     def set_data(self, data, sort=True, active=0):
         fill_combobox(self, data, active, sort)
 
-    def add_item(self, item):
-        if not item: return
+    def set_table(self, table, active=0):
+        """
+        Show the items of a data table, they're updated when the table changes
+
+        @param table: One of the data tables
+        @param active: index of the active value
+        """
 
-        for treerow in self.store:
-            if item in treerow:
-                return
-        self.store.append([item])
-        self.store.set_sort_column_id(0, gtk.SORT_ASCENDING)
+        set_data_model(self, table, active)
+        self.child.get_completion().set_model(self.get_model())
 
 
 class DistanceCombobox(gtk.ComboBox):
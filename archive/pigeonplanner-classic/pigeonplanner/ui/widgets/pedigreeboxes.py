@@ -21,442 +21,409 @@
 Pedigree widgets
 """
 
+import bisect
+
 import gtk
+import gobject
 
 from pigeonplanner import thumbnail
+from pigeonplanner.core import const
 from pigeonplanner.core import enums
 from pigeonplanner.core import common
 
 
-class PedigreeBox(gtk.DrawingArea):
-    def __init__(self, pigeon=None, child=None, detailed=False):
-        gtk.DrawingArea.__init__(self)
-
-        if not detailed:
-            self.set_property("can-focus", True)
-        self.set_has_tooltip(True)
-        self.add_events(gtk.gdk.BUTTON_PRESS_MASK)
-        self.add_events(gtk.gdk.ENTER_NOTIFY_MASK)
-        self.add_events(gtk.gdk.LEAVE_NOTIFY_MASK)
-        self.connect("expose-event", self.expose)
-        self.connect("realize", self.realize)
-        self.connect("enter-notify-event", self.on_enter_event)
-        self.connect("leave-notify-event", self.on_leave_event)
-        self.connect("state-changed", self.state_changed)
-        self.connect("query-tooltip", self.on_query_tooltip)
+#TODO: Cairo-drawn boxes mess up window drawing on Mac OS X
+cairo_available = not const.OSX
+
+BOX_WIDTH = 155
+EXTRA_WIDTH = 220
+BOX_HEIGHT = 25
+# Horizontal space between the generations where the lines are drawn
+GAP = 24
+# Vertical space between the boxes of the last generation
+SPACING = 8
+# Offset of the shadow, it's part of the size of a box
+SHADOW = 3
+
+# Background and border colours
+SEX_COLOURS = {
+    enums.Sex.cock: ((185, 207, 231), (32, 74, 135)),
+    enums.Sex.hen: ((255, 205, 241), (135, 32, 106)),
+    enums.Sex.unknown: ((200, 200, 200), (100, 100, 100)),
+}
+EMPTY_COLOURS = ((211, 215, 207), (0, 0, 0))
+EXTRA_COLOURS = ((240, 230, 140), (0, 0, 0))
+INSENSITIVE_TEXT = (106, 106, 106)
+
+
+def _get_generation(index):
+    return (index + 1).bit_length() - 1
+
+def _contains(rect, x, y):
+    return rect.x <= x < rect.x + rect.width and rect.y <= y < rect.y + rect.height
+
+def _intersects(rect, area):
+    return (rect.x < area.x + area.width and area.x < rect.x + rect.width and
+            rect.y < area.y + area.height and area.y < rect.y + rect.height)
+
+
+class PedigreeBox(object):
+    """
+    A pigeon in the pedigree canvas. The boxes of a detailed pedigree show
+    the extra lines of the pigeon below the band.
+    """
+
+    def __init__(self, index, pigeon=None, child=None, sex=enums.Sex.cock,
+                 detailed=False, lines=0):
+        """
+        @param index: Position in the pedigree, 0 being the pigeon itself and
+                      index*2+1 and index*2+2 its sire and dam
+        @param pigeon: The pigeon or None for an empty box
+        @param child: The pigeon of which this one is a parent
+        @param sex: The sex of the pigeon that belongs in this box
+        @param detailed: Empty boxes can be edited
+        @param lines: The number of extra lines to show
+        """
+
+        self.index = index
         self.pigeon = pigeon
         self.child = child
-        self.sex = None
+        self.sex = sex
         self.editable = False
-        self.highlight = False
-
         self.text = ""
-        if self.pigeon:
+        self.extra = None
+        self.layout = None
+        self.extralayout = None
+        self.rect = None
+        self.extrarect = None
+
+        if pigeon is not None:
             self.editable = True
-            self.text = self.pigeon.get_band_string(True)
-            if self.pigeon.get_sex() == enums.Sex.cock:
-                self.bgcolor = (185/256.0, 207/256.0, 231/256.0)
-                self.bordercolor = (32/256.0, 74/256.0, 135/256.0)
-            elif self.pigeon.get_sex() == enums.Sex.hen:
-                self.bgcolor = (255/256.0, 205/256.0, 241/256.0)
-                self.bordercolor = (135/256.0, 32/256.0, 106/256.0)
-            else:
-                self.bgcolor = (200/256.0, 200/256.0, 200/256.0)
-                self.bordercolor = (100/256.0, 100/256.0, 100/256.0)
+            self.text = common.escape_text(pigeon.get_band_string(True))
+            self.colours = SEX_COLOURS.get(pigeon.get_sex(), SEX_COLOURS[enums.Sex.unknown])
         else:
-            self.bgcolor = (211/256.0, 215/256.0, 207/256.0)
-            self.bordercolor = (0, 0, 0)
+            self.colours = EMPTY_COLOURS
             if detailed and child is not None:
                 self.editable = True
                 tform = "<span style=\"italic\" foreground=\"#6a6a6a\">%s</span>"
                 self.text = tform % common.escape_text(_("<edit>"))
+        if lines:
+            self.extra = ""
+            if pigeon is not None:
+                self.extra = common.escape_text("\n".join(pigeon.get_extra()[:lines]))
+        self.lines = lines
+
+    def __repr__(self):
+        return "<PedigreeBox %s %r>" % (self.index, self.pigeon)
 
     def get_sex(self):
         return self.sex
 
-    def set_sex(self, value):
-        self.sex = value
 
-    def set_highlight(self, value):
-        self.highlight = value
-        self.queue_draw()
+class PedigreeCanvas(gtk.DrawingArea):
+    """
+    Draws all boxes of a pedigree and the lines between them. The layout is
+    done once when the boxes are set, the text layouts are kept and only the
+    exposed boxes are drawn again.
+    """
+
+    __gtype_name__ = "PedigreeCanvas"
+    __gsignals__ = {"box-clicked": (gobject.SIGNAL_RUN_LAST, None, (object, object))}
+
+    def __init__(self, detailed=False):
+        gtk.DrawingArea.__init__(self)
+
+        self.detailed = detailed
+        self.boxes = []
+        self._lines = []
+        # Tuples of (left, right, box tops, boxes) per generation
+        self._columns = []
+        self._hover = None
 
-    def on_enter_event(self, widget, event):
-        if self.editable:
-            self.set_highlight(True)
+        self.set_has_tooltip(True)
+        self.add_events(gtk.gdk.BUTTON_PRESS_MASK |
+                        gtk.gdk.POINTER_MOTION_MASK |
+                        gtk.gdk.LEAVE_NOTIFY_MASK)
+        self.connect("expose-event", self.on_expose)
+        self.connect("button-press-event", self.on_button_press)
+        self.connect("motion-notify-event", self.on_motion_notify)
+        self.connect("leave-notify-event", self.on_leave_notify)
+        self.connect("query-tooltip", self.on_query_tooltip)
+        self.connect("state-changed", self.on_state_changed)
+        self.connect("style-set", self.on_layout_changed)
+        self.connect("direction-changed", self.on_layout_changed)
 
-    def on_leave_event(self, widget, event):
-        self.set_highlight(False)
+    def set_boxes(self, boxes):
+        """
+        Show the boxes of a pedigree
 
-    def state_changed(self, widget, prev_state):
-        if widget.state == gtk.STATE_INSENSITIVE:
-            self.text = "<span foreground=\"#6a6a6a\">%s</span>" % self.text
-            self.bgcolor = (211/256.0, 215/256.0, 207/256.0)
+        @param boxes: List of PedigreeBox objects ordered by index
+        """
+
+        self.boxes = boxes
+        self._hover = None
+        self._layout()
         self.queue_draw()
 
+    def get_box_at(self, x, y):
+        """
+        Get the box at the given position or None
+        """
+
+        for left, right, tops, boxes in self._columns:
+            if left <= x < right:
+                index = bisect.bisect_right(tops, y) - 1
+                if index >= 0 and _contains(boxes[index].rect, x, y):
+                    return boxes[index]
+                break
+        return None
+
+    # Callbacks
+    def on_expose(self, widget, event):
+        if cairo_available:
+            self._draw_cairo(event.area)
+        else:
+            self._draw_gdk(event.area)
+        return True
+
+    def on_button_press(self, widget, event):
+        box = self.get_box_at(event.x, event.y)
+        if box is not None:
+            self.emit("box-clicked", box, event)
+        return True
+
+    def on_motion_notify(self, widget, event):
+        box = self.get_box_at(event.x, event.y)
+        if box is not None and not box.editable:
+            box = None
+        self._set_hover(box)
+
+    def on_leave_notify(self, widget, event):
+        self._set_hover(None)
+
     def on_query_tooltip(self, widget, x, y, keyboard, tooltip):
-        if self.pigeon is None:
+        box = self.get_box_at(x, y)
+        if box is None or box.pigeon is None:
             return False
-        path = self.pigeon.get_image()
+        path = box.pigeon.get_image()
         # Path can be None or "", ignore both
         if path:
             tooltip.set_icon(thumbnail.get_image(path))
+            tooltip.set_tip_area(box.rect)
             return True
         return False
 
-    def realize(self, widget):
-        # Class needs a context
-        self.context = self.window.cairo_create()
-        self.textlayout = self.context.create_layout()
-        self.textlayout.set_font_description(self.get_style().font_desc)
-        self.textlayout.set_markup(self.text)
-        size = self.textlayout.get_pixel_size()
-        xmin = size[0] + 12
-        ymin = size[1] + 11
-        self.set_size_request(max(xmin, 155), max(ymin, 25))
-
-    def expose(self, widget, event):
-        alloc = self.get_allocation()
-        context = self.window.cairo_create()
-
-        self.textlayout = self.context.create_layout()
-        self.textlayout.set_font_description(self.get_style().font_desc)
-        self.textlayout.set_markup(self.text)
-
-        context.move_to(0, 5)
-        context.curve_to(0, 2, 2, 0, 5, 0)
-        context.line_to(alloc.width-8, 0)
-        context.curve_to(alloc.width-5, 0, alloc.width-3, 2,
-                              alloc.width-3, 5)
-        context.line_to(alloc.width-3, alloc.height-8)
-        context.curve_to(alloc.width-3, alloc.height-5, alloc.width-5,
-                              alloc.height-3, alloc.width-8, alloc.height-3)
-        context.line_to(5, alloc.height-3)
-        context.curve_to(2, alloc.height-3, 0, alloc.height-5, 0,
-                              alloc.height-8)
-        context.close_path()
-        path = context.copy_path()
-
-        context.save()
-        context.translate(3, 3)
-        context.new_path()
-        context.append_path(path)
-        context.set_source_rgba(self.bordercolor[0], self.bordercolor[1],
-                                self.bordercolor[2], 0.4)
-        context.fill_preserve()
-        context.set_line_width(0)
-        context.stroke()
-        context.restore()
+    def on_state_changed(self, widget, prev_state):
+        self.queue_draw()
 
-        context.append_path(path)
+    def on_layout_changed(self, widget, prev):
+        if self.boxes:
+            self._layout()
+            self.queue_draw()
+
+    # Internal methods
+    def _set_hover(self, box):
+        if box is self._hover:
+            return
+        for changed in (self._hover, box):
+            if changed is not None:
+                rect = changed.rect
+                self.queue_draw_area(rect.x, rect.y, rect.width, rect.height)
+        self._hover = box
+
+    def _create_layout(self, markup):
+        layout = self.create_pango_layout("")
+        layout.set_markup(markup)
+        return layout
+
+    def _layout(self):
+        generations = _get_generation(len(self.boxes) - 1) + 1
+        columns = [[] for generation in range(generations)]
+        box_height = BOX_HEIGHT
+        for box in self.boxes:
+            box.layout = self._create_layout(box.text)
+            box_height = max(box_height, box.layout.get_pixel_size()[1] + 11)
+            if box.extra is not None:
+                box.extralayout = self._create_layout(box.extra)
+            columns[_get_generation(box.index)].append(box)
+
+        widths = []
+        extra_heights = []
+        line_height = self.create_pango_layout("X").get_pixel_size()[1]
+        for column in columns:
+            width = BOX_WIDTH
+            lines = 0
+            for box in column:
+                width = max(width, box.layout.get_pixel_size()[0] + 12)
+                if box.extralayout is not None:
+                    width = max(width, EXTRA_WIDTH, box.extralayout.get_pixel_size()[0] + 12)
+                    lines = max(lines, box.lines)
+            widths.append(width)
+            extra_heights.append(max(BOX_HEIGHT, lines * line_height + 8) if lines else 0)
+
+        # The boxes of the last generation are stacked, each parent is
+        # centered next to its children
+        leaf_height = box_height + extra_heights[-1] + SPACING
+        height = leaf_height * 2 ** (generations - 1)
+        lefts = [sum(widths[:generation]) + GAP * generation
+                 for generation in range(generations)]
+        total_width = lefts[-1] + widths[-1]
+        rtl = self.get_direction() == gtk.TEXT_DIR_RTL
+
+        def rectangle(x, y, w, h):
+            if rtl:
+                x = total_width - x - w
+            return gtk.gdk.Rectangle(x, y, w, h)
+
+        self._columns = []
+        for generation, column in enumerate(columns):
+            left, width = lefts[generation], widths[generation]
+            span = height / 2 ** generation
+            for position, box in enumerate(column):
+                top = position * span
+                if not self.detailed:
+                    y = top + (span - box_height) / 2
+                elif generation == generations - 1:
+                    y = top + SPACING / 2
+                else:
+                    y = top + span / 2 - box_height
+                box.rect = rectangle(left, y, width, box_height)
+                if box.extralayout is not None:
+                    box.extrarect = rectangle(left, y + box_height,
+                                              width, extra_heights[generation])
+            x = rectangle(left, 0, width, 0).x
+            self._columns.append((x, x + width, [box.rect.y for box in column], column))
+
+        # Each line goes from the middle of a box to the middle of a parent
+        self._lines = []
+        for box in self.boxes:
+            parents = self.boxes[box.index * 2 + 1:box.index * 2 + 3]
+            if not parents:
+                continue
+            x1 = lefts[_get_generation(box.index)] + widths[_get_generation(box.index)] - SHADOW
+            x2 = x1 + (GAP + SHADOW) / 2
+            y1 = self._get_middle(box)
+            segments = [(x1, y1, x2, y1)]
+            for parent in parents:
+                y2 = self._get_middle(parent)
+                segments.append((x2, y1, x2, y2))
+                segments.append((x2, y2, lefts[_get_generation(parent.index)], y2))
+            for xa, ya, xb, yb in segments:
+                if rtl:
+                    xa, xb = total_width - xa, total_width - xb
+                self._lines.append((xa, ya, xb, yb))
+
+        self.set_size_request(total_width, height)
+
+    def _get_middle(self, box):
+        return box.rect.y + (box.rect.height - SHADOW) / 2
+
+    def _get_text_colour(self):
+        if self.state == gtk.STATE_INSENSITIVE:
+            return INSENSITIVE_TEXT
+        return (0, 0, 0)
+
+    def _iter_exposed(self, area):
+        for box in self.boxes:
+            if _intersects(box.rect, area):
+                yield box, box.rect, box.layout, box.colours, box is self._hover
+            if box.extrarect is not None and _intersects(box.extrarect, area):
+                colours = EXTRA_COLOURS if box.pigeon is not None else EMPTY_COLOURS
+                yield box, box.extrarect, box.extralayout, colours, False
+
+    def _draw_cairo(self, area):
+        context = self.window.cairo_create()
+        context.rectangle(area.x, area.y, area.width, area.height)
         context.clip()
 
-        context.append_path(path)
-        context.set_source_rgb(*self.bgcolor)
-        context.fill_preserve()
-        context.stroke()
-
-        context.move_to(5, 4)
         context.set_source_rgb(0, 0, 0)
-        context.show_layout(self.textlayout)
-
-        width = 5 if self.highlight else 2
-        context.set_line_width(width)
-        context.append_path(path)
-        context.set_source_rgb(*self.bordercolor)
+        context.set_line_width(2)
+        for x1, y1, x2, y2 in self._lines:
+            context.move_to(x1, y1)
+            context.line_to(x2, y2)
         context.stroke()
 
-
-class ExtraBox(gtk.DrawingArea):
-    def __init__(self, pigeon, lines):
-        gtk.DrawingArea.__init__(self)
-        self.connect("expose-event", self.expose)
-        self.connect("realize", self.realize)
-
-        self.text = ""
-        if pigeon is not None:
-            extra = pigeon.get_extra()
-            self.text = common.escape_text("\n".join(extra[:lines]))
-            self.bgcolor = (240/256.0, 230/256.0, 140/256.0)
-            self.bordercolor = (0, 0, 0)
-        else:
-            self.bgcolor = (211/256.0, 215/256.0, 207/256.0)
-            self.bordercolor = (0, 0, 0)
-
-    def realize(self, widget):
-        self.context = self.window.cairo_create()
-        self.textlayout = self.context.create_layout()
-        self.textlayout.set_font_description(self.get_style().font_desc)
-        self.textlayout.set_markup(self.text)
-        size = self.textlayout.get_pixel_size()
-        xmin = size[0] + 12
-        ymin = size[1] + 8
-        self.set_size_request(max(xmin, 220), max(ymin, 25))
-        
-    def expose(self, widget, event):
-        alloc = self.get_allocation()
-        context = self.window.cairo_create()
-
-        self.textlayout = context.create_layout()
-        self.textlayout.set_font_description(self.get_style().font_desc)
-        self.textlayout.set_markup(self.text)
-
+        textcolour = [value / 256.0 for value in self._get_text_colour()]
+        insensitive = self.state == gtk.STATE_INSENSITIVE
+        for box, rect, layout, colours, highlight in self._iter_exposed(area):
+            bgcolour, bordercolour = colours
+            if insensitive:
+                bgcolour = EMPTY_COLOURS[0]
+            context.save()
+            context.translate(rect.x, rect.y)
+            self._draw_box_cairo(context, rect.width, rect.height, layout,
+                                 [value / 256.0 for value in bgcolour],
+                                 [value / 256.0 for value in bordercolour],
+                                 textcolour, 5 if highlight else 2)
+            context.restore()
+
+    def _draw_box_cairo(self, context, width, height, layout, bgcolour,
+                        bordercolour, textcolour, linewidth):
         context.move_to(0, 5)
         context.curve_to(0, 2, 2, 0, 5, 0)
-        context.line_to(alloc.width-8, 0)
-        context.curve_to(alloc.width-5, 0, alloc.width-3, 2,
-                         alloc.width-3, 5)
-        context.line_to(alloc.width-3, alloc.height-8)
-        context.curve_to(alloc.width-3, alloc.height-5, alloc.width-5,
-                         alloc.height-3, alloc.width-8, alloc.height-3)
-        context.line_to(5, alloc.height-3)
-        context.curve_to(2, alloc.height-3, 0, alloc.height-5, 0,
-                            alloc.height-8)
+        context.line_to(width-8, 0)
+        context.curve_to(width-5, 0, width-3, 2, width-3, 5)
+        context.line_to(width-3, height-8)
+        context.curve_to(width-3, height-5, width-5, height-3, width-8, height-3)
+        context.line_to(5, height-3)
+        context.curve_to(2, height-3, 0, height-5, 0, height-8)
         context.close_path()
         path = context.copy_path()
 
         context.save()
-        context.translate(3, 3)
+        context.translate(SHADOW, SHADOW)
         context.new_path()
         context.append_path(path)
-        context.set_source_rgba(self.bordercolor[0], self.bordercolor[1],
-                                self.bordercolor[2], 0.4)
-        context.fill_preserve()
-        context.set_line_width(0)
-        context.stroke()
+        context.set_source_rgba(bordercolour[0], bordercolour[1], bordercolour[2], 0.4)
+        context.fill()
         context.restore()
 
+        context.save()
         context.append_path(path)
         context.clip()
 
         context.append_path(path)
-        context.set_source_rgb(*self.bgcolor)
-        context.fill_preserve()
-        context.stroke()
+        context.set_source_rgb(*bgcolour)
+        context.fill()
 
         context.move_to(5, 4)
-        context.set_source_rgb(0, 0, 0)
-        context.show_layout(self.textlayout)
+        context.set_source_rgb(*textcolour)
+        context.show_layout(layout)
 
-        context.set_line_width(2)
+        context.set_line_width(linewidth)
         context.append_path(path)
-        context.set_source_rgb(*self.bordercolor)
+        context.set_source_rgb(*bordercolour)
         context.stroke()
+        context.restore()
 
-
-class PedigreeBox_gdk(gtk.DrawingArea):
-    def __init__(self, pigeon, child, detailed):
-        gtk.DrawingArea.__init__(self)
-
-        if not detailed:
-            self.set_property("can-focus", True)
-        self.add_events(gtk.gdk.BUTTON_PRESS_MASK)
-        self.add_events(gtk.gdk.ENTER_NOTIFY_MASK)
-        self.add_events(gtk.gdk.LEAVE_NOTIFY_MASK)
-        self.connect("expose_event", self.expose)
-        self.connect("realize", self.realize)
-        self.connect("enter-notify-event", self.on_enter_event)
-        self.connect("leave-notify-event", self.on_leave_event)
-        self.connect("state_changed", self.state_changed)
-        self.pigeon = pigeon
-        self.child = child
-        self.sex = None
-        self.editable = False
-        self.highlight = False
-
-        text = ""
-        if self.pigeon:
-            self.editable = True
-            text = self.pigeon.get_band_string(True)
-        else:
-            if detailed and child is not None:
-                self.editable = True
-                tform = "<span style=\"italic\" foreground=\"#6a6a6a\">%s</span>"
-                text = tform % common.escape_text(_("<edit>"))
-
-        self.textlayout = self.create_pango_layout("")
-        self.textlayout.set_markup(text)
-        s = self.textlayout.get_pixel_size()
-        xmin = s[0] + 12
-        ymin = s[1] + 11
-        y = 34 if detailed else 25
-        self.set_size_request(max(xmin, 150), max(ymin, y))
-
-    def get_sex(self):
-        return self.sex
-
-    def set_sex(self, value):
-        self.sex = value
-
-    def set_highlight(self, value):
-        width = 3 if value else 1
-        self.border_gc.line_width = width
-        self.queue_draw()
-
-    def on_enter_event(self, widget, event):
-        if self.editable:
-            self.set_highlight(True)
-
-    def on_leave_event(self, widget, event):
-        self.set_highlight(False)
-
-    def state_changed(self, widget, prev_state):
-        #TODO
-        pass
-    
-    def realize(self, widget):
-        self.bg_gc = self.window.new_gc()
-        self.text_gc = self.window.new_gc()
-        self.border_gc = self.window.new_gc()
-        self.border_gc.line_style = gtk.gdk.LINE_SOLID
-        self.border_gc.line_width = 1
-        self.shadow_gc = self.window.new_gc()
-        self.shadow_gc.line_style = gtk.gdk.LINE_SOLID
-        self.shadow_gc.line_width = 4
-        if self.pigeon:
-            if self.pigeon.get_sex() == enums.Sex.cock:
-                self.bg_gc.set_foreground(
-                        self.get_colormap().alloc_color("#b9cfe7"))
-                self.border_gc.set_foreground(
-                        self.get_colormap().alloc_color("#204a87"))
+    def _draw_gdk(self, area):
+        colormap = self.get_colormap()
+        def get_gc(colour, width=1):
+            gc = self.window.new_gc()
+            gc.set_clip_rectangle(area)
+            gc.set_foreground(colormap.alloc_color(*[value * 257 for value in colour]))
+            gc.line_width = width
+            return gc
+
+        line_gc = get_gc((0, 0, 0), 2)
+        for x1, y1, x2, y2 in self._lines:
+            self.window.draw_line(line_gc, x1, y1, x2, y2)
+
+        shadow_gc = get_gc((153, 153, 153), SHADOW + 1)
+        text_gc = get_gc(self._get_text_colour())
+        insensitive = self.state == gtk.STATE_INSENSITIVE
+        for box, rect, layout, colours, highlight in self._iter_exposed(area):
+            bgcolour, bordercolour = colours
+            if insensitive:
+                bgcolour = EMPTY_COLOURS[0]
+            x, y, width, height = rect.x, rect.y, rect.width, rect.height
+            self.window.draw_line(shadow_gc, x+SHADOW, y+height-1, x+width, y+height-1)
+            self.window.draw_line(shadow_gc, x+width-1, y+SHADOW, x+width-1, y+height)
+            self.window.draw_rectangle(get_gc(bgcolour), True, x+1, y+1, width-5, height-5)
+            self.window.draw_layout(text_gc, x+5, y+4, layout)
+            if highlight:
+                self.window.draw_rectangle(get_gc(bordercolour, 3), False,
+                                           x+1, y+1, width-6, height-6)
             else:
-                self.bg_gc.set_foreground(
-                        self.get_colormap().alloc_color("#ffcdf1"))
-                self.border_gc.set_foreground(
-                        self.get_colormap().alloc_color("#87206a"))
-        else:
-            self.bg_gc.set_foreground(
-                        self.get_colormap().alloc_color("#eeeeee"))
-            self.border_gc.set_foreground(
-                        self.get_colormap().alloc_color("#777777"))
-        self.shadow_gc.set_foreground(
-                        self.get_colormap().alloc_color("#999999"))
-
-    def expose(self, widget, event):
-        alloc = self.get_allocation()
-
-        self.window.draw_line(self.shadow_gc, 3, alloc.height-1,
-                              alloc.width, alloc.height-1)
-        self.window.draw_line(self.shadow_gc, alloc.width-1, 3,
-                              alloc.width-1, alloc.height)
-
-        self.window.draw_rectangle(self.bg_gc, True, 1, 1,
-                                   alloc.width-5, alloc.height-5)
-
-        if self.pigeon or self.editable:
-            self.window.draw_layout(self.text_gc, 5, 4, self.textlayout)
-
-        if self.border_gc.line_width > 1:
-            self.window.draw_rectangle(self.border_gc, False, 1, 1,
-                                       alloc.width-6, alloc.height-6)
-        else:
-            self.window.draw_rectangle(self.border_gc, False, 0, 0,
-                                       alloc.width-4, alloc.height-4)
-
-
-class ExtraBox_gdk(gtk.DrawingArea):
-    def __init__(self, pigeon, lines):
-        gtk.DrawingArea.__init__(self)
-        self.connect("expose_event", self.expose)
-        self.connect("realize", self.realize)
-
-        self.text = ""
-        if pigeon is not None:
-            extra = pigeon.get_extra()
-            self.text = common.escape_text("\n".join(extra[:lines]))
-        self.textlayout = self.create_pango_layout(self.text)
-        s = self.textlayout.get_pixel_size()
-        xmin = s[0] + 12
-        ymin = s[1] + 11
-        self.set_size_request(max(xmin, 220), max(ymin, 25))
-
-    def realize(self, widget):
-        self.bg_gc = self.window.new_gc()
-        self.text_gc = self.window.new_gc()
-        self.border_gc = self.window.new_gc()
-        self.border_gc.line_style = gtk.gdk.LINE_SOLID
-        self.border_gc.line_width = 1
-        self.shadow_gc = self.window.new_gc()
-        self.shadow_gc.line_style = gtk.gdk.LINE_SOLID
-        self.shadow_gc.line_width = 4
-        if self.text != "":
-            self.bg_gc.set_foreground(
-                            self.get_colormap().alloc_color("#f0e68c"))
-            self.border_gc.set_foreground(
-                            self.get_colormap().alloc_color("#777777"))
-        else:
-            self.bg_gc.set_foreground(
-                            self.get_colormap().alloc_color("#eeeeee"))
-            self.border_gc.set_foreground(
-                            self.get_colormap().alloc_color("#777777"))
-        self.shadow_gc.set_foreground(
-                            self.get_colormap().alloc_color("#999999"))
-
-    def expose(self, widget, event):
-        alloc = self.get_allocation()
-
-        self.window.draw_line(self.shadow_gc, 3, alloc.height-1,
-                              alloc.width, alloc.height-1)
-        self.window.draw_line(self.shadow_gc, alloc.width-1, 3,
-                              alloc.width-1, alloc.height)
-
-        self.window.draw_rectangle(self.bg_gc, True, 1, 1, alloc.width-5,
-                                   alloc.height-5)
-
-        if self.text:
-            self.window.draw_layout(self.text_gc, 5, 4, self.textlayout)
-
-        if self.border_gc.line_width > 1:
-            self.window.draw_rectangle(self.border_gc, False, 1, 1,
-                                       alloc.width-6, alloc.height-6)
-        else:
-            self.window.draw_rectangle(self.border_gc, False, 0, 0,
-                                       alloc.width-4, alloc.height-4)
-
-
-class PedigreeCross(gtk.DrawingArea):
-    def __init__(self):
-        gtk.DrawingArea.__init__(self)
-        self.set_size_request(12, -1)
-        self.connect("expose-event", self.expose)
-
-    def expose(self, area, event):
-        gc = area.window.new_gc()
-        alloc = area.get_allocation()
-        gc.line_style = gtk.gdk.LINE_SOLID
-        gc.line_width = 2
-        if gtk.widget_get_default_direction() == gtk.TEXT_DIR_RTL:
-            area.window.draw_line(gc, alloc.width/2, alloc.height/2,
-                                  alloc.width, alloc.height/2)
-        else:
-            area.window.draw_line(gc, 0, alloc.height/2, alloc.width/2,
-                                  alloc.height/2)
-        area.window.draw_line(gc, alloc.width/2, 0, alloc.width/2,
-                              alloc.height)
-
-
-class PedigreeLine(gtk.DrawingArea):
-    def __init__(self):
-        gtk.DrawingArea.__init__(self)
-        self.set_size_request(12, -1)
-        self.connect("expose-event", self.expose)
-
-    def expose(self, area, event):
-        gc = area.window.new_gc()
-        alloc = area.get_allocation()
-        idx = area.get_data("idx")
-        gc.line_style = gtk.gdk.LINE_SOLID
-        gc.line_width = 2
-        x1 = 0 if gtk.widget_get_default_direction() == gtk.TEXT_DIR_RTL else alloc.width
-        if idx % 2 == 0:
-            area.window.draw_line(gc, x1, alloc.height/2, alloc.width/2,
-                                  alloc.height/2)
-            area.window.draw_line(gc, alloc.width/2, 0, alloc.width/2,
-                                  alloc.height/2)
-        else:
-            area.window.draw_line(gc, x1, alloc.height/2, alloc.width/2,
-                                  alloc.height/2)
-            area.window.draw_line(gc, alloc.width/2, alloc.height,
-                                  alloc.width/2, alloc.height/2)
-
-
+                self.window.draw_rectangle(get_gc(bordercolour), False,
+                                           x, y, width-4, height-4)
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of Pigeon Planner.
+
+# Pigeon Planner is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Pigeon Planner is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Pigeon Planner.  If not, see <http://www.gnu.org/licenses/>
+
+
+import gtk
+import gobject
+
+from pigeonplanner.core import common
+from pigeonplanner.core import config
+from pigeonplanner.core import pigeonparser
+
+
+class PigeonSearchEntry(gtk.Entry):
+    __gtype_name__ = "PigeonSearchEntry"
+    __gsignals__ = {"pigeon-activated": (gobject.SIGNAL_RUN_LAST, None, (str,))}
+
+    def __init__(self, max_results=25):
+        gtk.Entry.__init__(self)
+
+        self._max_results = max_results
+        self._liststore = gtk.ListStore(str, str)
+
+        completion = gtk.EntryCompletion()
+        completion.set_model(self._liststore)
+        # The results are already matched and ranked by the search index
+        completion.set_match_func(lambda *args: True)
+        completion.set_minimum_key_length(1)
+        renderer = gtk.CellRendererText()
+        completion.pack_start(renderer)
+        completion.add_attribute(renderer, "markup", 1)
+        completion.connect("match-selected", self.on_match_selected)
+        self.set_completion(completion)
+
+        self.set_icon_from_stock(gtk.ENTRY_ICON_PRIMARY, gtk.STOCK_FIND)
+        self.set_icon_tooltip_text(gtk.ENTRY_ICON_PRIMARY,
+                                   _("Search by band, name, colour, strain or loft"))
+        self.connect("changed", self.on_changed)
+        self.connect("activate", self.on_activate)
+        self.connect("icon-press", self.on_icon_press)
+        self.show()
+
+    def on_changed(self, widget):
+        text = self.get_text()
+        icon = gtk.STOCK_CLEAR if text else None
+        self.set_icon_from_stock(gtk.ENTRY_ICON_SECONDARY, icon)
+
+        self._liststore.clear()
+        show_all = config.get("interface.show-all-pigeons")
+        for pigeon in pigeonparser.parser.search(text, self._max_results):
+            if not show_all and not pigeon.get_visible():
+                continue
+            label = "<b>%s</b>" % common.escape_text(pigeon.get_band_string())
+            details = [value for value in (pigeon.get_name(), pigeon.get_colour(),
+                                           pigeon.get_strain(), pigeon.get_loft())
+                       if value]
+            if details:
+                label += "  %s" % common.escape_text(", ".join(details))
+            self._liststore.append([pigeon.get_pindex(), label])
+        self.get_completion().complete()
+
+    def on_activate(self, widget):
+        if len(self._liststore) > 0:
+            self.emit("pigeon-activated", self._liststore[0][0])
+
+    def on_match_selected(self, completion, model, rowiter):
+        self.emit("pigeon-activated", model.get_value(rowiter, 0))
+        # Keep the search text in the entry
+        return True
+
+    def on_icon_press(self, widget, icon_pos, event):
+        if icon_pos == gtk.ENTRY_ICON_SECONDARY:
+            self.set_text("")
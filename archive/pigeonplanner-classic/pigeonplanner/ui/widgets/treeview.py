@@ -24,6 +24,7 @@ from pigeonplanner.ui import utils
 from pigeonplanner.ui import builder
 from pigeonplanner.ui import component
 from pigeonplanner.core import config
+from pigeonplanner.core import counters
 from pigeonplanner.core import pigeonparser
 
 
@@ -34,9 +35,9 @@ class FilterDialog(builder.GtkBuilder):
 
         self.filter = utils.TreeviewFilter()
 
-        self.widgets.combocolour.set_data(database.get_all_data(database.Tables.COLOURS), sort=False, active=None)
-        self.widgets.combostrain.set_data(database.get_all_data(database.Tables.STRAINS), sort=False, active=None)
-        self.widgets.comboloft.set_data(database.get_all_data(database.Tables.LOFTS), sort=False, active=None)
+        self.widgets.combocolour.set_table(database.Tables.COLOURS, active=None)
+        self.widgets.combostrain.set_table(database.Tables.STRAINS, active=None)
+        self.widgets.comboloft.set_table(database.Tables.LOFTS, active=None)
 
     def show(self, parent):
         self.widgets.filterdialog.set_transient_for(parent)
@@ -72,9 +73,8 @@ class FilterDialog(builder.GtkBuilder):
             getattr(self.widgets, "check"+check).set_active(False)
 
         self.filter.clear()
-        self.treeview._modelfilter.refilter()
         component.get("Statusbar").set_filter(False)
-        self.treeview.emit("pigeons-changed")
+        self.treeview.refilter()
 
     def on_search_clicked(self, widget):
         self.filter.clear()
@@ -100,9 +100,16 @@ class FilterDialog(builder.GtkBuilder):
         loft = self.widgets.comboloft.child.get_text()
         self.filter.add("loft", loft)
 
-        self.treeview._modelfilter.refilter()
         component.get("Statusbar").set_filter(self.filter.has_filters())
-        self.treeview.emit("pigeons-changed")
+        self.treeview.refilter()
+
+
+# Batches of at least this many pigeons are added with the view detached
+DETACH_THRESHOLD = 50
+
+# The names the reports order the pigeons on for the sort column ids
+SORT_COLUMN_NAMES = {2: "band", 3: "year", 4: "name", 5: "colour", 6: "sex",
+                     7: "loft", 8: "strain", 9: "active"}
 
 
 class MainTreeView(gtk.TreeView, component.Component):
@@ -116,12 +123,12 @@ class MainTreeView(gtk.TreeView, component.Component):
 
         component.get("Statusbar").set_filter(False)
         self._liststore = self._build_treeview()
-        self._modelfilter = self._liststore.filter_new()
-        self._modelfilter.set_visible_func(self._visible_func)
-        self._modelsort = gtk.TreeModelSort(self._modelfilter)
-        self._modelsort.set_sort_func(3, self._sort_func)
-        self._modelsort.set_sort_column_id(3, gtk.SORT_ASCENDING)
-        self.set_model(self._modelsort)
+        # ListStore iters persist, keep them around for fast lookups
+        self._rowiters = {}
+        # Pindexes of the rows that are hidden by the filter
+        self._hidden = set()
+        self._counter = counters.PigeonCounter()
+        self._build_models(3, gtk.SORT_ASCENDING)
         self.set_rules_hint(True)
         self._selection = self.get_selection()
         self._selection.set_mode(gtk.SELECTION_MULTIPLE)
@@ -147,20 +154,9 @@ class MainTreeView(gtk.TreeView, component.Component):
         return self._modelfilter.convert_path_to_child_path(filterpath)
 
     def add_row(self, row, select=True):
-        rowiter = self._liststore.insert(0, row)
+        rowiter = self._insert_row(row)
         if select:
-            try:
-                topiter = self.get_top_iter(rowiter)
-            except RuntimeError:
-                # This happens when a pigeon is added which falls outside the current
-                # active filter. It means the pigeon shouldn't be shown and thus there
-                # is no iter for the row.
-                pass
-            else:
-                path = self._liststore.get_path(rowiter)
-                self._selection.unselect_all()
-                self._selection.select_iter(topiter)
-                self.scroll_to_cell(self.get_top_path(path))
+            self._select_row(rowiter)
         self.emit("pigeons-changed")
 
     def update_row(self, data, rowiter=None, path=None):
@@ -168,56 +164,123 @@ class MainTreeView(gtk.TreeView, component.Component):
             raise ValueError("A path or iter is required!")
         if rowiter is None:
             rowiter = self._liststore.get_iter(path)
+        old_pindex = self._liststore.get_value(rowiter, 1)
         self._liststore.set(rowiter, *data)
+        pindex = self._liststore.get_value(rowiter, 1)
+        if pindex != old_pindex:
+            del self._rowiters[old_pindex]
+            self._rowiters[pindex] = rowiter
+        self._hidden.discard(old_pindex)
+        pigeon, visible = self._liststore.get(rowiter, 0, 11)
+        if not visible:
+            self._hidden.add(pindex)
+        self._counter.update(pigeon, visible, old_pindex)
         self.emit("pigeons-changed")
 
     def remove_row(self, path):
         sortiter = self._modelsort.get_iter(path)
         rowiter = self.get_child_iter(sortiter)
+        pindex = self._liststore.get_value(rowiter, 1)
+        del self._rowiters[pindex]
+        self._hidden.discard(pindex)
+        self._counter.remove(pindex)
         self._liststore.remove(rowiter)
         self.emit("pigeons-changed")
 
     def get_n_rows(self):
         return len(self._liststore)
 
+    def get_counter(self):
+        """
+        Get the PigeonCounter with the number of pigeons in the list
+        and the number of pigeons shown by the active filter
+        """
+
+        return self._counter
+
+    def refilter(self):
+        """
+        Show the pigeons that match the filter. They're looked up in the
+        filter index and only the rows that are shown or hidden by the new
+        filter are updated.
+        """
+
+        pigeonfilter = self._filterdialog.filter
+        if pigeonfilter.has_filters():
+            matches = pigeonparser.parser.filter_index.query(pigeonfilter)
+            hidden = set(self._rowiters).difference(matches)
+        else:
+            hidden = set()
+        for pindex in hidden.symmetric_difference(self._hidden):
+            rowiter = self._rowiters[pindex]
+            visible = pindex not in hidden
+            self._liststore.set_value(rowiter, 11, visible)
+            self._counter.update(self._liststore.get_value(rowiter, 0), visible)
+        self._hidden = hidden
+        self.emit("pigeons-changed")
+
     def fill_treeview(self, path=0):
         self._liststore.clear()
+        self._rowiters = {}
+        self._hidden = set()
+        self._counter.clear()
         for pindex, pigeon in pigeonparser.parser.pigeons.items():
             if not config.get("interface.show-all-pigeons") and not pigeon.get_visible():
                 continue
-            ring, year = pigeon.get_band()
-            self._liststore.insert(0, [pigeon, pindex, ring, year,
-                                       pigeon.get_name(), pigeon.get_colour(),
-                                       pigeon.get_sex_string(),
-                                       pigeon.get_loft(), pigeon.get_strain(),
-                                       pigeon.get_status(),
-                                       utils.get_sex_image(pigeon.sex)])
+            self._insert_row(self._get_pigeon_row(pigeon))
         self._selection.select_path(path)
         self.emit("pigeons-changed")
 
     def add_pigeon(self, pigeon, select=True):
-        ring, year = pigeon.get_band()
-        row = [pigeon, pigeon.get_pindex(), ring, year, pigeon.get_name(),
-               pigeon.get_colour(), pigeon.get_sex_string(),
-               pigeon.get_loft(), pigeon.get_strain(),
-               pigeon.get_status(),
-               utils.get_sex_image(pigeon.sex)]
-        self.add_row(row, select)
+        self.add_row(self._get_pigeon_row(pigeon), select)
+
+    def add_pigeons(self, pigeons, select=True):
+        """
+        Add several pigeons and emit pigeons-changed once. For larger batches
+        the view is detached from the models, which are rebuilt afterwards,
+        so the rows are filtered and sorted only once.
+
+        @param pigeons: List of pigeon objects
+        @param select: Select the last added pigeon
+        """
+
+        if not pigeons:
+            return
+        detach = len(pigeons) >= DETACH_THRESHOLD
+        if detach:
+            model, paths = self._selection.get_selected_rows()
+            selected = [model[path][1] for path in paths]
+            sort_column_id, order = self._modelsort.get_sort_column_id()
+            self.set_model(None)
+            self._modelsort = self._modelfilter = None
+        for pigeon in pigeons:
+            rowiter = self._insert_row(self._get_pigeon_row(pigeon))
+        if detach:
+            self._build_models(sort_column_id, order)
+            for pindex in selected:
+                try:
+                    self._selection.select_iter(self.get_top_iter(self._rowiters[pindex]))
+                except RuntimeError:
+                    pass
+        if select:
+            self._select_row(rowiter)
+        self.emit("pigeons-changed")
 
     def update_pigeon(self, pigeon, rowiter=None, path=None):
         band, year = pigeon.get_band()
         data = (0, pigeon, 1, pigeon.get_pindex(), 2, band, 3, year,
                 4, pigeon.get_name(), 5, pigeon.get_colour(),
                 6, pigeon.get_sex_string(), 7, pigeon.get_loft(),
-                8, pigeon.get_strain(), 9, _(pigeon.get_status()),
-                10, utils.get_sex_image(pigeon.sex))
+                8, pigeon.get_strain(), 9, pigeon.get_status(),
+                10, utils.get_sex_image(pigeon.sex),
+                11, self._pigeon_visible(pigeon))
         self.update_row(data, rowiter=rowiter, path=path)
 
     def has_pigeon(self, pigeon):
-        for row in self._liststore:
-            if self._liststore.get_value(row.iter, 0) == pigeon:
-                return True
-        return False
+        rowiter = self._rowiters.get(pigeon.get_pindex())
+        if rowiter is None:
+            return False
+        return self._liststore.get_value(rowiter, 0) == pigeon
 
     def select_pigeon(self, widget, pindex):
         """
@@ -227,14 +290,16 @@ class MainTreeView(gtk.TreeView, component.Component):
         @param pindex: The index of the pigeon to search
         """
 
-        for row in self._modelsort:
-            if self._modelsort.get_value(row.iter, 1) == pindex:
-                self._selection.unselect_all()
-                self._selection.select_iter(row.iter)
-                self.scroll_to_cell(row.path)
-                self.grab_focus()
-                return True
-        return False
+        try:
+            topiter = self.get_top_iter(self._rowiters[pindex])
+        except (KeyError, RuntimeError):
+            # Not in the list or hidden by the active filter
+            return False
+        self._selection.unselect_all()
+        self._selection.select_iter(topiter)
+        self.scroll_to_cell(self._modelsort.get_path(topiter))
+        self.grab_focus()
+        return True
 
     def select_all_pigeons(self):
         self._selection.select_all()
@@ -243,6 +308,24 @@ class MainTreeView(gtk.TreeView, component.Component):
         model = self._modelsort if filtered else self._liststore
         return [row[0] for row in model]
 
+    def get_filter(self):
+        """
+        Get the TreeviewFilter with the active filter items
+        """
+
+        return self._filterdialog.filter
+
+    def get_sort(self):
+        """
+        Get the sort column as a tuple of its name and True if it's sorted
+        descending, or None if the pigeons aren't sorted
+        """
+
+        sort_column_id, order = self._modelsort.get_sort_column_id()
+        if sort_column_id is None:
+            return None
+        return SORT_COLUMN_NAMES[sort_column_id], order == gtk.SORT_DESCENDING
+
     def get_selected_pigeon(self):
         model, paths = self._selection.get_selected_rows()
         if len(paths) == 1:
@@ -276,8 +359,49 @@ class MainTreeView(gtk.TreeView, component.Component):
         self._filterdialog.show(parent)
 
     # Internal methods
+    def _build_models(self, sort_column_id, order):
+        self._modelfilter = self._liststore.filter_new()
+        self._modelfilter.set_visible_column(11)
+        self._modelsort = gtk.TreeModelSort(self._modelfilter)
+        self._modelsort.set_sort_func(3, self._sort_func)
+        if sort_column_id is not None:
+            self._modelsort.set_sort_column_id(sort_column_id, order)
+        self.set_model(self._modelsort)
+
+    def _get_pigeon_row(self, pigeon):
+        ring, year = pigeon.get_band()
+        return [pigeon, pigeon.get_pindex(), ring, year, pigeon.get_name(),
+                pigeon.get_colour(), pigeon.get_sex_string(),
+                pigeon.get_loft(), pigeon.get_strain(),
+                pigeon.get_status(),
+                utils.get_sex_image(pigeon.sex),
+                self._pigeon_visible(pigeon)]
+
+    def _insert_row(self, row):
+        rowiter = self._liststore.insert(0, row)
+        self._rowiters[row[1]] = rowiter
+        if not row[11]:
+            self._hidden.add(row[1])
+        self._counter.add(row[0], row[11])
+        return rowiter
+
+    def _select_row(self, rowiter):
+        try:
+            topiter = self.get_top_iter(rowiter)
+        except RuntimeError:
+            # This happens when a pigeon is added which falls outside the current
+            # active filter. It means the pigeon shouldn't be shown and thus there
+            # is no iter for the row.
+            return
+        path = self._liststore.get_path(rowiter)
+        self._selection.unselect_all()
+        self._selection.select_iter(topiter)
+        self.scroll_to_cell(self.get_top_path(path))
+
     def _build_treeview(self):
-        liststore = gtk.ListStore(object, str, str, str, str, str, str, str, str, str, gtk.gdk.Pixbuf)
+        # The last column tells if the row is shown by the filter
+        liststore = gtk.ListStore(object, str, str, str, str, str, str, str, str, str,
+                                  gtk.gdk.Pixbuf, bool)
         columns = [_("Band no."), _("Year"), _("Name"), _("Colour"), _("Sex"),
                    _("Loft"), _("Strain"), _("Status")]
         for index, column in enumerate(columns):
@@ -294,8 +418,7 @@ class MainTreeView(gtk.TreeView, component.Component):
             self.append_column(tvcolumn)
         return liststore
 
-    def _visible_func(self, model, treeiter):
-        pigeon = model[treeiter][0]
+    def _pigeon_visible(self, pigeon):
         for item in self._filterdialog.filter:
             pvalue = getattr(pigeon, item.name)
             if not item.operator(item.type(pvalue), item.type(item.value)):
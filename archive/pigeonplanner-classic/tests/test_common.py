@@ -16,9 +16,20 @@
 # along with Pigeon Planner.  If not, see <http://www.gnu.org/licenses/>
 
 
+import os
+import shutil
+import tempfile
+import __builtin__
+
 import nose.tools as nt
 
+from pigeonplanner.core import enums
 from pigeonplanner.core import common
+from pigeonplanner.core import config
+
+
+TMPDIR = None
+CONFIGFILE = None
 
 
 def test_func_name():
@@ -41,6 +52,42 @@ def test_pindex_conersions():
     value = common.get_band_from_pindex("87-CUST-22222014")
     nt.assert_tuple_equal(value, ("87-CUST-2222", "2014"))
 
+def test_labels():
+    nt.assert_equal(common.get_sex(enums.Sex.hen), "Hen")
+    nt.assert_equal(common.get_status(enums.Status.loaned), "On loan")
+    nt.assert_equal(len(common.get_sex_labels()), len(common.get_sexdic()))
+    nt.assert_equal(len(common.get_status_labels()), len(common.get_statusdic()))
+    for status, label in common.get_statusdic().items():
+        nt.assert_equal(common.get_status(status), label)
+
+    # Rebuilt with the new translations after the language changed
+    translate = __builtin__._
+    language = config.get("options.language")
+    __builtin__._ = lambda text: text.upper()
+    try:
+        nt.assert_equal(common.get_sex(enums.Sex.hen), "Hen")
+        config.set("options.language", "nl")
+        nt.assert_equal(common.get_sex(enums.Sex.hen), "HEN")
+        nt.assert_equal(common.get_status(enums.Status.dead), "DEAD")
+    finally:
+        __builtin__._ = translate
+        config.set("options.language", language)
+    nt.assert_equal(common.get_sex(enums.Sex.hen), "Hen")
+
+def use_tmp_config():
+    # Write the changed settings to a temporary file instead of the user's
+    global TMPDIR, CONFIGFILE
+    TMPDIR = tempfile.mkdtemp()
+    CONFIGFILE = config.CONFIG.filename
+    config.CONFIG.filename = os.path.join(TMPDIR, "pigeonplanner.json")
+
+def restore_config():
+    config.CONFIG.flush()
+    config.CONFIG.filename = CONFIGFILE
+    shutil.rmtree(TMPDIR)
+test_labels.setup = use_tmp_config
+test_labels.teardown = restore_config
+
 def test_coefficient():
     value = common.calculate_coefficient(1, 100)
     nt.assert_equal(value, 1.0)
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of Pigeon Planner.
+
+# Pigeon Planner is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Pigeon Planner is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Pigeon Planner.  If not, see <http://www.gnu.org/licenses/>
+
+
+import os
+import json
+import stat
+import time
+import shutil
+import tempfile
+
+import nose.tools as nt
+
+from pigeonplanner.core import config
+
+
+TMPDIR = None
+
+
+def make_config(flush_delay=60):
+    cfg = config.Config(os.path.join(TMPDIR, "pigeonplanner.json"), flush_delay)
+    cfg.register("options.language", "Default")
+    cfg.register("options.coef-multiplier", 100)
+    cfg.register("interface.arrows", False)
+    cfg.register("backup.last", 0.0)
+    return cfg
+
+def read_config(cfg):
+    with open(cfg.filename) as cfgfile:
+        return json.load(cfgfile)
+
+def make_tmpdir():
+    global TMPDIR
+    TMPDIR = tempfile.mkdtemp()
+
+def remove_tmpdir():
+    shutil.rmtree(TMPDIR)
+
+
+def test_get_set():
+    cfg = make_config()
+    nt.assert_equal(cfg.get("options.coef-multiplier"), 100)
+    cfg.set("options.coef-multiplier", 10)
+    nt.assert_equal(cfg.get("options.coef-multiplier"), 10)
+    nt.assert_equal(cfg.settings["options"]["coef-multiplier"], 10)
+    # Values are converted to the type of the default
+    cfg.set("interface.arrows", 1)
+    nt.assert_is(cfg.get("interface.arrows"), True)
+    cfg.set("backup.last", 5)
+    nt.assert_is_instance(cfg.get("backup.last"), float)
+    nt.assert_raises(TypeError, cfg.set, "options.coef-multiplier", "ten")
+    # An empty widget doesn't change the setting
+    cfg.set("options.language", None)
+    nt.assert_equal(cfg.get("options.language"), "Default")
+    cfg.reset("options")
+    nt.assert_equal(cfg.get("options.coef-multiplier"), 100)
+    nt.assert_true(cfg.get("interface.arrows"))
+    cfg.flush()
+test_get_set.setup = make_tmpdir
+test_get_set.teardown = remove_tmpdir
+
+def test_snapshot():
+    cfg = make_config()
+    snap = cfg.snapshot(arrows="interface.arrows", coef="options.coef-multiplier")
+    nt.assert_false(snap.arrows)
+    changes = []
+    snap.connect(lambda: changes.append(snap.arrows))
+    cfg.set("interface.arrows", True)
+    nt.assert_true(snap.arrows)
+    cfg.set("options.language", "nl")
+    nt.assert_equal(changes, [True])
+    cfg.reset()
+    nt.assert_false(snap.arrows)
+    nt.assert_equal(snap.coef, 100)
+    cfg.flush()
+test_snapshot.setup = make_tmpdir
+test_snapshot.teardown = remove_tmpdir
+
+def test_save_load():
+    cfg = make_config()
+    cfg.set("options.language", "nl")
+    cfg.set("options.coef-multiplier", 10)
+    nt.assert_false(os.path.exists(cfg.filename))
+    cfg.flush()
+    nt.assert_equal(read_config(cfg)["options"]["coef-multiplier"], 10)
+    # No temporary files are left behind
+    nt.assert_equal(os.listdir(TMPDIR), ["pigeonplanner.json"])
+
+    data = read_config(cfg)
+    data["interface"]["arrows"] = "yes"
+    data["options"]["unknown"] = 1
+    with open(cfg.filename, "w") as cfgfile:
+        json.dump(data, cfgfile)
+    cfg = make_config()
+    cfg.load()
+    nt.assert_equal(cfg.get("options.language"), "nl")
+    nt.assert_equal(cfg.get("options.coef-multiplier"), 10)
+    # Values with the wrong type are skipped
+    nt.assert_false(cfg.get("interface.arrows"))
+    nt.assert_equal(cfg.get("options.unknown"), 1)
+
+    # A broken file doesn't stop the config from loading
+    with open(cfg.filename, "w") as cfgfile:
+        cfgfile.write("{")
+    cfg = make_config()
+    cfg.load()
+    nt.assert_equal(cfg.get("options.coef-multiplier"), 100)
+test_save_load.setup = make_tmpdir
+test_save_load.teardown = remove_tmpdir
+
+def test_write_behind():
+    cfg = make_config(flush_delay=0.1)
+    for value in range(10):
+        cfg.set("options.coef-multiplier", value)
+    nt.assert_false(os.path.exists(cfg.filename))
+    for attempt in range(50):
+        if os.path.exists(cfg.filename):
+            break
+        time.sleep(0.05)
+    nt.assert_equal(read_config(cfg)["options"]["coef-multiplier"], 9)
+test_write_behind.setup = make_tmpdir
+test_write_behind.teardown = remove_tmpdir
+
+def test_file_mode():
+    cfg = make_config()
+    cfg.save()
+    os.chmod(cfg.filename, 0644)
+    cfg.set("options.coef-multiplier", 20)
+    cfg.flush()
+    # Replacing the file keeps its permissions
+    nt.assert_equal(stat.S_IMODE(os.stat(cfg.filename).st_mode), 0644)
+test_file_mode.setup = make_tmpdir
+test_file_mode.teardown = remove_tmpdir
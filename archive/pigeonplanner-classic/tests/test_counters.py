@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of Pigeon Planner.
+
+# Pigeon Planner is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Pigeon Planner is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Pigeon Planner.  If not, see <http://www.gnu.org/licenses/>
+
+
+import nose.tools as nt
+from . import utils
+
+from pigeonplanner.core import enums
+from pigeonplanner.core import counters
+
+
+def test_counter():
+    counter = counters.PigeonCounter()
+    cock = utils.make_pigeon("BE-1", "2014")
+    hen = utils.make_pigeon("BE-2", "2014", sex=enums.Sex.hen, active=enums.Status.sold)
+    young = utils.make_pigeon("BE-3", "2015", sex=enums.Sex.unknown)
+    counter.add(cock)
+    counter.add(hen)
+    counter.add(young, visible=False)
+    nt.assert_equal(counter.get_total(), 2)
+    nt.assert_equal(counter.get_total(filtered=False), 3)
+    nt.assert_equal(counter.get_sex_count(enums.Sex.unknown), 0)
+    nt.assert_equal(counter.get_sex_count(enums.Sex.unknown, filtered=False), 1)
+    nt.assert_equal(counter.get_status_count(enums.Status.active), 1)
+    nt.assert_equal(counter.get_status_count(enums.Status.sold), 1)
+
+    # Changed sex, status and band
+    hen.pindex, hen.ring = "BE-42014", "BE-4"
+    hen.sex, hen.active = enums.Sex.cock, enums.Status.active
+    counter.update(hen, old_pindex="BE-22014")
+    nt.assert_equal(counter.get_sex_count(enums.Sex.cock), 2)
+    nt.assert_equal(counter.get_sex_count(enums.Sex.hen), 0)
+    nt.assert_equal(counter.get_status_count(enums.Status.sold), 0)
+    nt.assert_equal(counter.get_total(), 2)
+
+    counter.remove("BE-42014")
+    counter.remove("BE-42014")
+    nt.assert_equal(counter.get_total(), 1)
+    counter.update(young, visible=True)
+    nt.assert_equal(counter.get_total(), 2)
+    nt.assert_equal(counter.get_total(filtered=False), 2)
+    counter.clear()
+    nt.assert_equal(counter.get_total(filtered=False), 0)
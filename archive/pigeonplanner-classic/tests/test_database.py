@@ -16,13 +16,18 @@
 # along with Pigeon Planner.  If not, see <http://www.gnu.org/licenses/>
 
 
+import os
+import time
 import sqlite3
+import threading
 
 import nose.tools as nt
 from . import utils
 
 from pigeonplanner import database
+from pigeonplanner.database.schemas import schema_5
 from pigeonplanner.core import const
+from pigeonplanner.core import pigeonparser
 
 
 def test_connection():
@@ -73,3 +78,218 @@ def test_database_helper_methods():
 test_database_helper_methods.setup = utils.open_test_db
 test_database_helper_methods.teardown = utils.close_test_db
 
+
+def test_band_change():
+    for pindex, sire in (("BE-12014", ""), ("BE-22015", "BE-12014")):
+        database.add_pigeon(pigeonparser.get_empty_pigeon_data(pindex, 0, sire=sire))
+    database.add_result({"pindex": "BE-12014", "date": "2014-05-01", "point": "Tours",
+                         "place": 1, "out": 100})
+    database.add_breeding({"sire": "BE-12014", "dam": "BE-32014", "date": "2015-03-01",
+                           "pindex1": "BE-22015"})
+    database.add_medication({"medid": "med1", "pindex": "BE-12014", "date": "2014-05-01"})
+    database.add_media({"pindex": "BE-12014", "type": "image", "path": "/tmp/image.png"})
+    database.add_status(database.Tables.SOLD, {"pindex": "BE-12014", "person": "Jan"})
+
+    # Correcting the band is a single update
+    database.update_pigeon("BE-12014", {"pindex": "BE-42014", "band": "BE-4"})
+    nt.assert_equal(database.get_pigeon_data("BE-22015")["sire"], "BE-4")
+    nt.assert_equal(len(database.get_results_for_data({"pindex": "BE-42014"})), 1)
+    nt.assert_equal(database.get_breeding_for_pigeon("BE-42014", True)[0]["dam"], "BE-32014")
+    nt.assert_equal(database.get_pigeons_for_medid("med1"), ["BE-42014"])
+    nt.assert_equal(len(database.get_media_for_pigeon("BE-42014")), 1)
+    nt.assert_equal(database.get_status(database.Tables.SOLD, "BE-42014")["person"], "Jan")
+
+    # The results are kept with the pindex when a pigeon is removed
+    database.remove_pigeon("BE-42014")
+    nt.assert_equal(database.get_media_for_pigeon("BE-42014"), [])
+    nt.assert_true(database.get_status(database.Tables.SOLD, "BE-42014") is None)
+    nt.assert_false(database.pigeon_has_medication("BE-42014"))
+    nt.assert_equal(database.get_results_for_data({"pindex": "BE-42014"}), [])
+    result, = database.get_results_for_data({"point": "Tours"})
+    nt.assert_equal((result["pindex"], result["pigeon"]), ("BE-42014", None))
+    with nt.assert_raises(sqlite3.IntegrityError):
+        database.add_media({"pindex": "BE-42014", "type": "image", "path": "/tmp/image.png"})
+    # They belong to a pigeon that's added with the same pindex
+    key = database.add_pigeon(pigeonparser.get_empty_pigeon_data("BE-42014", 0))
+    result, = database.get_results_for_data({"pindex": "BE-42014"})
+    nt.assert_equal(result["pigeon"], key)
+test_band_change.setup = utils.open_test_db
+test_band_change.teardown = utils.close_test_db
+
+def test_foreign_key_migration():
+    connection = sqlite3.connect(utils.DBFILE)
+    for table in schema_5.Schema.get_table_names():
+        connection.execute("CREATE TABLE %s (%s)" % (table, schema_5.Schema.get_columns_sql(table)))
+    connection.execute("INSERT INTO Pigeons(pindex, band, year, sex) VALUES('BE-12014', 'BE-1', '2014', 0)")
+    connection.execute("INSERT INTO Races(date, point) VALUES('2014-05-01', 'Tours')")
+    for pindex in ("BE-12014", "BE-22014"):
+        connection.execute("INSERT INTO Media(pindex, type, path) VALUES(?, 'image', '/tmp/image.png')",
+                           (pindex,))
+        connection.execute("INSERT INTO Sold(pindex, person) VALUES(?, 'Jan')", (pindex,))
+        connection.execute("INSERT INTO Results(race, pindex, place, out) VALUES(1, ?, 1, 10)",
+                           (pindex,))
+    connection.execute("PRAGMA user_version=5")
+    connection.commit()
+    connection.close()
+
+    database.session.open(utils.DBFILE)
+    nt.assert_true(database.session.check_schema())
+    key = database.get_pigeon_data("BE-12014")["Pigeonskey"]
+    # The rows refer to the key of the pigeon
+    nt.assert_not_in("pindex", database.session.get_column_names(database.Tables.MEDIA))
+    nt.assert_equal(database.get_status(database.Tables.SOLD, "BE-12014")["pigeon"], key)
+    # The media of the pigeon that was removed before is left out, the result is kept
+    nt.assert_equal(len(database.get_media_for_pigeon("BE-12014")), 1)
+    nt.assert_equal(database.get_media_for_pigeon("BE-22014"), [])
+    nt.assert_equal([(result["pindex"], result["pigeon"]) for result in
+                     database.get_results_for_data({"point": "Tours"})],
+                    [("BE-12014", key), ("BE-22014", None)])
+    database.update_pigeon("BE-12014", {"pindex": "BE-32014", "band": "BE-3"})
+    nt.assert_equal(len(database.get_media_for_pigeon("BE-32014")), 1)
+    nt.assert_equal(database.get_results_for_data({"pindex": "BE-32014"})[0]["pindex"],
+                    "BE-32014")
+test_foreign_key_migration.teardown = utils.close_test_db
+
+# The tables test_data_cache is notified of
+data_changed = []
+
+def test_data_cache():
+    database.connect_data_changed(data_changed.append)
+    database.add_data(database.Tables.COLOURS, "Blue")
+    nt.assert_equal(database.get_all_data(database.Tables.COLOURS), ["Blue"])
+    # The items are read once
+    database.session.cursor.execute("INSERT INTO Colours(colour) VALUES('Red')")
+    nt.assert_equal(database.get_all_data(database.Tables.COLOURS), ["Blue"])
+    database.add_data(database.Tables.COLOURS, "Chequer")
+    nt.assert_equal(database.get_all_data(database.Tables.COLOURS), ["Blue", "Chequer", "Red"])
+    # Existing items don't change anything
+    database.add_data(database.Tables.COLOURS, "Blue")
+    database.remove_data(database.Tables.STRAINS, "Janssen")
+    database.add_racepoint({"racepoint": "Tours"})
+    database.remove_data(database.Tables.COLOURS, "Red")
+    nt.assert_equal(database.get_all_data(database.Tables.COLOURS), ["Blue", "Chequer"])
+    nt.assert_equal(data_changed, [database.Tables.COLOURS, database.Tables.COLOURS,
+                                   database.Tables.RACEPOINTS, database.Tables.COLOURS])
+test_data_cache.setup = utils.open_test_db
+
+def teardown_data_cache():
+    database.disconnect_data_changed(data_changed.append)
+    del data_changed[:]
+    utils.close_test_db()
+test_data_cache.teardown = teardown_data_cache
+
+def test_pigeon_snapshot():
+    snapshot = utils.DBFILE + ".snapshot"
+    for pindex, sire in (("BE-12014", ""), ("BE-22015", "BE-12014")):
+        database.add_pigeon(pigeonparser.get_empty_pigeon_data(pindex, 0, sire=sire))
+    parser = pigeonparser.PigeonParser()
+    parser.build_pigeons()
+    fingerprint = database.session.get_fingerprint()
+    nt.assert_equal(fingerprint, database.session.get_fingerprint())
+    try:
+        parser.save_snapshot(snapshot, fingerprint)
+
+        loaded = pigeonparser.PigeonParser()
+        nt.assert_true(loaded.load_snapshot(snapshot, fingerprint))
+        nt.assert_equal(sorted(loaded.pigeons), ["BE-12014", "BE-22015"])
+        for pindex, pigeon in parser.pigeons.items():
+            nt.assert_equal(loaded.pigeons[pindex].__dict__, pigeon.__dict__)
+        nt.assert_equal(loaded.search("BE-2")[0].get_sire(), ("BE-1", "2014"))
+
+        # Any write to the database makes the snapshot outdated
+        database.update_pigeon("BE-22015", {"name": "Kannibaal"})
+        nt.assert_false(loaded.load_snapshot(snapshot, database.session.get_fingerprint()))
+        nt.assert_false(loaded.load_snapshot(snapshot + ".missing", fingerprint))
+    finally:
+        os.remove(snapshot)
+test_pigeon_snapshot.setup = utils.open_test_db
+test_pigeon_snapshot.teardown = utils.close_test_db
+
+def test_worker():
+    database.add_result({"pindex": "BE-12014", "date": "2014-05-01", "point": "Tours",
+                         "place": 1, "out": 100})
+    future = database.worker.submit(database.get_all_results)
+    results = []
+    future.connect(results.extend)
+    nt.assert_equal(len(future.result(5)), 1)
+    nt.assert_equal(results[0]["point"], "Tours")
+    # The worker has its own connection
+    nt.assert_true(database.worker._connection is not database.session.connection)
+
+    # A cancelled query is interrupted and doesn't call back
+    started = threading.Event()
+    def count_forever():
+        started.set()
+        database.session.cursor.execute("WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL "
+                                        "SELECT x+1 FROM c) SELECT COUNT(*) FROM c")
+    slow = database.worker.submit(count_forever)
+    slow.connect(results.append)
+    nt.assert_true(started.wait(5))
+    slow.cancel()
+    with nt.assert_raises(sqlite3.OperationalError):
+        slow.result(5)
+    nt.assert_equal(database.worker.submit(database.get_all_races).result(5)[0]["point"], "Tours")
+    nt.assert_true(slow.done())
+    nt.assert_equal(len(results), 1)
+
+    errors = []
+    failing = database.worker.submit(database.get_pigeon_data)
+    failing.connect(results.append, errors.append)
+    with nt.assert_raises(TypeError):
+        failing.result(5)
+    nt.assert_equal(len(errors), 1)
+test_worker.setup = utils.open_test_db
+
+def teardown_worker():
+    database.worker.shutdown()
+    utils.close_test_db()
+test_worker.teardown = teardown_worker
+
+def test_write_during_worker_read():
+    database.add_result({"pindex": "BE-12014", "date": "2014-05-01", "point": "Tours",
+                         "place": 1, "out": 100})
+    started = threading.Event()
+    def read_forever():
+        cursor = database.session.connection.cursor()
+        cursor.execute("WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x+1 FROM c) "
+                       "SELECT x, (SELECT COUNT(*) FROM Results) FROM c")
+        for row in cursor:
+            # The read transaction stays open while the rows are stepped through
+            started.set()
+    slow = database.worker.submit(read_forever)
+    nt.assert_true(started.wait(5))
+    try:
+        # The write-ahead log lets the main thread commit during the read
+        start = time.time()
+        database.add_result({"pindex": "BE-22014", "date": "2014-05-01", "point": "Tours",
+                             "place": 2, "out": 100})
+        nt.assert_less(time.time() - start, 1)
+        nt.assert_false(slow.done())
+        nt.assert_equal(len(database.get_all_results()), 2)
+    finally:
+        slow.cancel()
+    with nt.assert_raises(sqlite3.OperationalError):
+        slow.result(5)
+test_write_during_worker_read.setup = utils.open_test_db
+test_write_during_worker_read.teardown = teardown_worker
+
+def test_write_while_locked():
+    database.add_address({"name": u"Alice"})
+    other = sqlite3.connect(utils.DBFILE)
+    # Another connection holds the write lock
+    other.execute("BEGIN IMMEDIATE")
+    database.session.connection.execute("PRAGMA busy_timeout=0")
+    try:
+        with nt.assert_raises(database.DatabaseLockedError):
+            database.remove_address(1)
+        with nt.assert_raises(database.DatabaseLockedError):
+            database.add_address({"name": u"Bob"})
+    finally:
+        other.rollback()
+        other.close()
+    # Nothing of the failed writes is committed with the next one
+    database.add_address({"name": u"Carol"})
+    nt.assert_equal([row["name"] for row in database.get_all_addresses()],
+                    [u"Alice", u"Carol"])
+test_write_while_locked.setup = utils.open_test_db
+test_write_while_locked.teardown = utils.close_test_db
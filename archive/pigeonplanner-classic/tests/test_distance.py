@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of Pigeon Planner.
+
+# Pigeon Planner is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Pigeon Planner is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Pigeon Planner.  If not, see <http://www.gnu.org/licenses/>
+
+
+import nose.tools as nt
+from . import utils
+
+from pigeonplanner import database
+from pigeonplanner.core import distance
+
+
+def test_parse_coordinate():
+    nt.assert_almost_equal(distance.parse_coordinate(u"50.8503°"), 50.8503)
+    nt.assert_almost_equal(distance.parse_coordinate("50,8503"), 50.8503)
+    nt.assert_almost_equal(distance.parse_coordinate(u"50°51.018’"), 50.8503)
+    nt.assert_almost_equal(distance.parse_coordinate(u"50°51’1.08”"), 50.8503)
+    nt.assert_almost_equal(distance.parse_coordinate(u"50°51'1.08\""), 50.8503)
+    nt.assert_almost_equal(distance.parse_coordinate(u"-4.3517"), -4.3517)
+    nt.assert_almost_equal(distance.parse_coordinate(u"4°21’6.12” W"), -4.3517)
+    # Packed DDMMSS.s
+    nt.assert_almost_equal(distance.parse_coordinate(u"505101.08", 90), 50.8503)
+    for value in [u"", u"abc", u"50°61’", u"1°2’3”4", u"95.0"]:
+        nt.assert_raises(ValueError, distance.parse_coordinate, value, 90)
+    nt.assert_equal(distance.parse_location(u"", u"4.35"), None)
+
+def test_distance():
+    brussels = (50.8503, 4.3517)
+    paris = (48.8566, 2.3522)
+    # Reference value from the geodesic on the WGS-84 ellipsoid
+    nt.assert_almost_equal(distance.distance(brussels, paris), 264267.92, delta=0.01)
+    nt.assert_equal(distance.distance(brussels, brussels), 0.0)
+
+def test_distance_matrix():
+    origins = [(50.8503, 4.3517), (52.3676, 4.9041)]
+    destinations = [(48.8566, 2.3522), (50.8503, 4.3517), (43.6047, 1.4442)]
+    matrix = distance.distance_matrix(origins, destinations)
+    nt.assert_equal(len(matrix), 2)
+    for origin, distances in zip(origins, matrix):
+        nt.assert_equal(len(distances), 3)
+        for destination, value in zip(destinations, distances):
+            nt.assert_almost_equal(value, distance.distance(origin, destination), delta=0.001)
+    nt.assert_equal(distance.distance_matrix(origins, []), [[], []])
+
+def test_update_distances():
+    home = database.add_address({"name": "Me", "me": 1, "latitude": u"50°51’1.08”",
+                                 "longitude": "4.3517"})
+    other = database.add_address({"name": "Club", "latitude": "", "longitude": ""})
+    database.add_racepoint({"racepoint": "Paris", "xco": "48.8566", "yco": "2.3522"})
+    database.add_racepoint({"racepoint": "Toulouse", "xco": "43.6047", "yco": "1.4442"})
+    nt.assert_equal(distance.update_distances(), 2)
+    distances = distance.get_distances()
+    nt.assert_equal(sorted(distances), [(home, "Paris"), (home, "Toulouse")])
+    nt.assert_almost_equal(distances[(home, "Paris")], 264267.92, delta=0.01)
+    nt.assert_equal(database.get_distance(home, "Paris"), distances[(home, "Paris")])
+
+    database.update_address(other, {"latitude": "52.3676", "longitude": "4.9041"})
+    nt.assert_equal(distance.update_distances(addresses=[other]), 2)
+    nt.assert_equal(len(distance.get_distances()), 4)
+    database.remove_data(database.Tables.RACEPOINTS, "Toulouse")
+    database.remove_address(home)
+    nt.assert_equal(distance.get_distances().keys(), [(other, "Paris")])
+test_update_distances.setup = utils.open_test_db
+test_update_distances.teardown = utils.close_test_db
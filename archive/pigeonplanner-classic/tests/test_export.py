@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of Pigeon Planner.
+
+# Pigeon Planner is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Pigeon Planner is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Pigeon Planner.  If not, see <http://www.gnu.org/licenses/>
+
+
+import os
+import csv
+import json
+import shutil
+import sqlite3
+import tempfile
+
+import nose.tools as nt
+from . import utils
+
+from pigeonplanner import database
+from pigeonplanner.export.exportcsv import ExportCSV
+from pigeonplanner.export.exportjson import ExportJSONLines
+from pigeonplanner.export.exportsqlite import ExportSQLite
+
+
+TMPDIR = None
+
+
+class Pigeon(object):
+    def __init__(self, pindex):
+        self.pindex = pindex
+
+
+def setup_export():
+    global TMPDIR
+    TMPDIR = tempfile.mkdtemp()
+    utils.open_test_db()
+    for band, name in [("BE-1", u"Blauwe"), ("BE-2", u"Köning"), ("BE-3", u"")]:
+        database.add_pigeon({"pindex": band+"2014", "band": band, "year": "2014",
+                             "sex": 0, "name": name})
+    for pindex, place in [("BE-12014", 1), ("BE-12014", 5), ("BE-22014", 3)]:
+        database.add_result({"pindex": pindex, "date": "2014-05-01", "point": "Tours",
+                             "place": place, "out": 100})
+    database.add_breeding({"sire": "BE-12014", "dam": "BE-32014", "date": "2014-03-01"})
+    database.add_status(database.Tables.SOLD, {"pindex": "BE-22014", "person": "Jan"})
+
+def teardown_export():
+    utils.close_test_db()
+    shutil.rmtree(TMPDIR)
+
+
+def test_export_csv():
+    filepath = os.path.join(TMPDIR, "export.csv")
+    ExportCSV.run(filepath, None, ["results", "status"])
+    with open(filepath, "rb") as output:
+        rows = list(csv.reader(output))
+    nt.assert_equal(rows[0][:3], ["pindex", "band", "year"])
+    nt.assert_equal(len(rows), 4)
+    nt.assert_equal(rows[2][7], u"Köning".encode("utf-8"))
+    with open(os.path.join(TMPDIR, "export-results.csv"), "rb") as output:
+        rows = list(csv.reader(output))
+    nt.assert_equal(rows[0][:3], ["pindex", "date", "point"])
+    nt.assert_equal(len(rows), 4)
+    nt.assert_true(os.path.exists(os.path.join(TMPDIR, "export-sold.csv")))
+    nt.assert_false(os.path.exists(os.path.join(TMPDIR, "export-breeding.csv")))
+    # Text is only fetched as bytes for the export
+    nt.assert_is(database.session.connection.text_factory, unicode)
+test_export_csv.setup = setup_export
+test_export_csv.teardown = teardown_export
+
+def test_export_jsonl():
+    filepath = os.path.join(TMPDIR, "export.jsonl")
+    ExportJSONLines.run(filepath, [Pigeon("BE-12014")], ["results", "breeding"])
+    with open(filepath, "rb") as output:
+        lines = [json.loads(line) for line in output]
+    tables = [line["_table"] for line in lines]
+    nt.assert_equal(tables, ["pigeons", "results", "results", "breeding"])
+    nt.assert_equal(lines[0]["name"], u"Blauwe")
+    nt.assert_equal(sorted(line["place"] for line in lines[1:3]), [1, 5])
+    nt.assert_equal(lines[3]["dam"], "BE-32014")
+test_export_jsonl.setup = setup_export
+test_export_jsonl.teardown = teardown_export
+
+def test_export_sqlite():
+    filepath = os.path.join(TMPDIR, "export.db")
+    pigeons = [Pigeon("BE-22014"), Pigeon("BE-32014")]
+    ExportSQLite.run(filepath, pigeons, ["results", "breeding", "medication",
+                                         "media", "status"])
+    nt.assert_false(os.path.exists(filepath + ".tmp"))
+    connection = sqlite3.connect(filepath)
+    rows = connection.execute("SELECT pindex, name FROM Pigeons ORDER BY pindex").fetchall()
+    nt.assert_equal(rows, [("BE-22014", u"Köning"), ("BE-32014", u"")])
+    rows = connection.execute("SELECT pindex, place FROM RaceResults").fetchall()
+    nt.assert_equal(rows, [("BE-22014", 3)])
+    rows = connection.execute("SELECT sire FROM Breeding").fetchall()
+    nt.assert_equal(rows, [("BE-12014",)])
+    rows = connection.execute("SELECT person FROM Sold").fetchall()
+    nt.assert_equal(rows, [("Jan",)])
+    connection.close()
+test_export_sqlite.setup = setup_export
+test_export_sqlite.teardown = teardown_export
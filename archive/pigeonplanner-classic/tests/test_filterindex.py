@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of Pigeon Planner.
+
+# Pigeon Planner is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Pigeon Planner is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Pigeon Planner.  If not, see <http://www.gnu.org/licenses/>
+
+import operator
+
+import nose.tools as nt
+from . import utils
+
+from pigeonplanner.core import enums
+from pigeonplanner.core import filterindex
+
+
+def make_pigeons():
+    pigeons = [utils.make_pigeon("BE-1", "2014", loft="North"),
+               utils.make_pigeon("BE-2", "2014", loft="South", sex=enums.Sex.hen),
+               utils.make_pigeon("BE-3", "2015", loft="North", sex=enums.Sex.hen),
+               utils.make_pigeon("BE-4", "2016", loft="North", active=enums.Status.sold)]
+    return dict((pigeon.pindex, pigeon) for pigeon in pigeons)
+
+def test_query():
+    pigeons = make_pigeons()
+    index = filterindex.PigeonFilterIndex(pigeons)
+    nt.assert_equal(index.query([]), set(pigeons))
+
+    loft = utils.FilterItem("loft", "North", operator.eq, str)
+    nt.assert_equal(index.query([loft]), set(["BE-12014", "BE-32015", "BE-42016"]))
+    year = utils.FilterItem("year", 2015, operator.ge, int)
+    nt.assert_equal(index.query([loft, year]), set(["BE-32015", "BE-42016"]))
+    sex = utils.FilterItem("sex", enums.Sex.hen, operator.eq, int)
+    nt.assert_equal(index.query([loft, year, sex]), set(["BE-32015"]))
+    status = utils.FilterItem("active", enums.Status.lost, operator.eq, int)
+    nt.assert_equal(index.query([loft, status]), set())
+
+    # The result can be changed without changing the index
+    index.query([loft]).clear()
+    nt.assert_equal(len(index.query([loft])), 3)
+
+def test_changes():
+    pigeons = make_pigeons()
+    index = filterindex.PigeonFilterIndex(pigeons)
+    loft = utils.FilterItem("loft", "South", operator.eq, str)
+    nt.assert_equal(index.query([loft]), set(["BE-22014"]))
+
+    pigeon = utils.make_pigeon("BE-5", "2016", loft="South")
+    pigeons[pigeon.pindex] = pigeon
+    index.add(pigeon)
+    nt.assert_equal(index.query([loft]), set(["BE-22014", "BE-52016"]))
+
+    pigeon = pigeons.pop("BE-22014")
+    pigeon.pindex, pigeon.loft = "BE-62014", "North"
+    pigeons[pigeon.pindex] = pigeon
+    index.update(pigeon, "BE-22014")
+    nt.assert_equal(index.query([loft]), set(["BE-52016"]))
+
+    del pigeons["BE-52016"]
+    index.remove("BE-52016")
+    nt.assert_equal(index.query([loft]), set())
+    nt.assert_equal(len(index.query([utils.FilterItem("loft", "North", operator.eq, str)])), 4)
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of Pigeon Planner.
+
+# Pigeon Planner is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Pigeon Planner is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Pigeon Planner.  If not, see <http://www.gnu.org/licenses/>
+
+import threading
+
+import nose.tools as nt
+
+from pigeonplanner.core import framecache
+
+
+class Decoder(object):
+    def __init__(self):
+        self.decoded = []
+
+    def __call__(self, filename, width, height):
+        if filename == "missing.jpg":
+            raise IOError("No such file")
+        self.decoded.append((filename, width, height))
+        return "%s@%sx%s" % (filename, width, height)
+
+
+def test_lru():
+    decode = Decoder()
+    frames = framecache.FrameCache(decode, 2)
+    nt.assert_true(frames.get(("a.jpg", 10, 10)) is None)
+    nt.assert_equal(frames.load(("a.jpg", 10, 10)), "a.jpg@10x10")
+    nt.assert_equal(frames.load(("a.jpg", 10, 10)), "a.jpg@10x10")
+    nt.assert_equal(frames.get(("a.jpg", 10, 10)), "a.jpg@10x10")
+    nt.assert_equal(len(decode.decoded), 1)
+
+    # The least recently used frame is dropped
+    frames.load(("b.jpg", 10, 10))
+    frames.get(("a.jpg", 10, 10))
+    frames.load(("a.jpg", 20, 20))
+    nt.assert_true(frames.get(("b.jpg", 10, 10)) is None)
+    nt.assert_equal(frames.get(("a.jpg", 10, 10)), "a.jpg@10x10")
+
+    with nt.assert_raises(IOError):
+        frames.load(("missing.jpg", 10, 10))
+
+def test_prefetch():
+    decode = Decoder()
+    frames = framecache.FrameCache(decode, 4)
+    done = threading.Event()
+    decoded = []
+    def callback(key, frame):
+        decoded.append(frame)
+        if key[0] == "c.jpg":
+            done.set()
+
+    frames.load(("a.jpg", 10, 10))
+    frames.prefetch([("a.jpg", 10, 10), ("missing.jpg", 10, 10),
+                     ("b.jpg", 10, 10), ("c.jpg", 10, 10)], callback)
+    nt.assert_true(done.wait(5))
+    # Frames in the cache aren't decoded again, failures are skipped
+    nt.assert_equal(decoded, ["b.jpg@10x10", "c.jpg@10x10"])
+    nt.assert_equal(frames.get(("c.jpg", 10, 10)), "c.jpg@10x10")
+    frames.load(("b.jpg", 10, 10))
+    nt.assert_equal(len(decode.decoded), 3)
+
+    frames.close()
+    nt.assert_true(frames.get(("c.jpg", 10, 10)) is None)
+    frames._thread.join(5)
+    nt.assert_false(frames._thread.is_alive())
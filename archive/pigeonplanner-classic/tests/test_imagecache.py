@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of Pigeon Planner.
+
+# Pigeon Planner is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Pigeon Planner is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Pigeon Planner.  If not, see <http://www.gnu.org/licenses/>
+
+import os
+import shutil
+import tempfile
+
+import gtk
+import nose.tools as nt
+
+from pigeonplanner.reportlib import imagecache
+
+
+TMPDIR = None
+
+
+def make_image(name, width=200, height=100):
+    pixbuf = gtk.gdk.Pixbuf(gtk.gdk.COLORSPACE_RGB, False, 8, width, height)
+    pixbuf.fill(0x336699ff)
+    path = os.path.join(TMPDIR, name)
+    pixbuf.save(path, "png")
+    return path
+
+def make_tmpdir():
+    global TMPDIR
+    TMPDIR = tempfile.mkdtemp()
+
+def remove_tmpdir():
+    shutil.rmtree(TMPDIR)
+
+
+def test_hits_and_misses():
+    image = make_image("pigeon.png")
+    cache = imagecache.ImageCache()
+    surface = cache.get_surface(image, [100, 100])
+    nt.assert_equal((surface.get_width(), surface.get_height()), (100, 50))
+    # The same image at the same size is a hit
+    nt.assert_is(cache.get_surface(image, [100.2, 99.8]), surface)
+    # Another size, crop or a changed file is a miss
+    nt.assert_is_not(cache.get_surface(image, [50, 50]), surface)
+    nt.assert_is_not(cache.get_surface(image, [100, 100], [0, 0, 50, 100]), surface)
+    mtime = os.path.getmtime(image)
+    os.utime(image, (mtime + 10, mtime + 10))
+    nt.assert_is_not(cache.get_surface(image, [100, 100]), surface)
+    nt.assert_equal(len(cache._surfaces), 4)
+
+    cache.clear()
+    nt.assert_equal(cache._size, 0)
+    nt.assert_is_not(cache.get_surface(image, [100, 100]), surface)
+test_hits_and_misses.setup = make_tmpdir
+test_hits_and_misses.teardown = remove_tmpdir
+
+def test_eviction():
+    images = [make_image("pigeon%s.png" % number) for number in range(3)]
+    # Room for two images of 100x50 pixels at 4 bytes each
+    cache = imagecache.ImageCache(2 * 100 * 50 * 4)
+    first = cache.get_surface(images[0], [100, 100])
+    cache.get_surface(images[1], [100, 100])
+    nt.assert_is(cache.get_surface(images[0], [100, 100]), first)
+    # The least recently used image is dropped
+    cache.get_surface(images[2], [100, 100])
+    nt.assert_equal([key[0] for key in cache._surfaces], [images[0], images[2]])
+    nt.assert_equal(cache._size, 2 * 100 * 50 * 4)
+
+    # The last image is kept even when it doesn't fit
+    cache.max_size = 1
+    cache.get_surface(images[1], [100, 100])
+    nt.assert_equal([key[0] for key in cache._surfaces], [images[1]])
+test_eviction.setup = make_tmpdir
+test_eviction.teardown = remove_tmpdir
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of Pigeon Planner.
+
+# Pigeon Planner is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Pigeon Planner is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Pigeon Planner.  If not, see <http://www.gnu.org/licenses/>
+
+
+import os
+import json
+import shutil
+import tempfile
+
+import nose.tools as nt
+from . import utils
+
+from pigeonplanner import database
+from pigeonplanner.core import errors
+from pigeonplanner.core import pigeonparser
+from pigeonplanner.export.exportcsv import ExportCSV
+from pigeonplanner.importer.importcsv import ImportCSV
+from pigeonplanner.importer.importjson import ImportJSONLines
+
+
+TMPDIR = None
+
+
+def setup_import():
+    global TMPDIR
+    TMPDIR = tempfile.mkdtemp()
+    utils.open_test_db()
+
+def teardown_import():
+    utils.close_test_db()
+    shutil.rmtree(TMPDIR)
+    pigeonparser.parser.pigeons.clear()
+    pigeonparser.parser.index.invalidate()
+
+def write_jsonl(filename, rows):
+    filepath = os.path.join(TMPDIR, filename)
+    with open(filepath, "wb") as output:
+        for row in rows:
+            output.write(json.dumps(row) + "\n")
+    return filepath
+
+
+def test_import_jsonl():
+    filepath = write_jsonl("import.jsonl", [
+        {"band": "BE-1", "year": "2014", "sex": 0, "colour": "Blue", "strain": u"Jänssen",
+         "sire band": "BE-9", "sire year": "2012"},
+        {"band": "BE-2", "year": "2014", "sex": 1, "colour": "Blue", "loft": "Home"},
+        {"_table": "results", "pindex": "BE-12014", "date": "2014-05-01",
+         "point": "Tours", "place": "3", "out": 100},
+        {"_table": "breeding", "sire": "BE-12014", "dam": "BE-22014", "date": "2015-03-01"},
+        {"_table": "medication", "pindex": "BE-12014"}])
+    counts, pigeons = ImportJSONLines.run(filepath)
+    # The unknown sire is added as a hidden pigeon
+    nt.assert_equal(counts, {"Pigeons": 3, "RaceResults": 1, "Breeding": 1})
+    nt.assert_equal([pigeon.pindex for pigeon in pigeons],
+                    ["BE-12014", "BE-22014", "BE-92012"])
+    sire = database.get_pigeon_data("BE-92012")
+    nt.assert_equal((sire["sex"], sire["show"]), (0, 0))
+    nt.assert_equal(database.get_pigeon_data("BE-12014")["strain"], u"Jänssen")
+    nt.assert_equal(database.get_results_for_data({"pindex": "BE-12014"})[0]["place"], 3)
+    nt.assert_equal(database.get_all_data(database.Tables.COLOURS), ["Blue"])
+    nt.assert_equal(database.get_all_data(database.Tables.STRAINS), [u"Jänssen"])
+    nt.assert_equal(database.get_all_data(database.Tables.LOFTS), ["Home"])
+    nt.assert_equal(sorted(pigeonparser.parser.get_pigeons()),
+                    ["BE-12014", "BE-22014", "BE-92012"])
+test_import_jsonl.setup = setup_import
+test_import_jsonl.teardown = teardown_import
+
+def test_import_invalid():
+    database.add_pigeon({"pindex": "BE-32014", "band": "BE-3", "year": "2014", "sex": 0})
+    filepath = write_jsonl("invalid.jsonl", [
+        {"band": "BE-1", "year": "14", "sex": 0},
+        {"band": "BE-2", "year": "2014", "sex": 5},
+        {"band": "BE-3", "year": "2014", "sex": 0},
+        {"band": "BE-4", "year": "2014", "sex": 1, "dam band": "BE-5", "dam year": "2014"},
+        {"band": "BE-5", "year": "2014", "sex": 0},
+        {"_table": "results", "pindex": "BE-62014", "date": "2014-05-01",
+         "point": "Tours", "place": "first", "out": 100},
+        {"_table": "results", "pindex": "BE-62014", "date": "2014-05-01",
+         "point": "Tours", "place": 1, "out": 100}])
+    with open(filepath, "ab") as output:
+        output.write("{broken\n")
+    with nt.assert_raises(errors.InvalidImportError) as cm:
+        ImportJSONLines.run(filepath)
+    lines = [(name, lineno) for name, lineno, message in cm.exception.errors]
+    nt.assert_equal(lines, [("pigeons", 1), ("pigeons", 2), ("pigeons", 3),
+                            ("results", 6), (None, 8), ("pigeons", 4), ("results", 7)])
+    # Nothing is imported
+    nt.assert_equal(database.get_all_pindexes(), set(["BE-32014"]))
+test_import_invalid.setup = setup_import
+test_import_invalid.teardown = teardown_import
+
+def test_import_csv_roundtrip():
+    database.add_pigeon({"pindex": "BE-12014", "band": "BE-1", "year": "2014",
+                         "sex": 1, "name": u"Köning", "colour": "Red"})
+    database.add_result({"pindex": "BE-12014", "date": "2014-05-01", "point": "Tours",
+                         "place": 1, "out": 100})
+    filepath = os.path.join(TMPDIR, "export.csv")
+    ExportCSV.run(filepath, None, ["results", "breeding"])
+    utils.close_test_db()
+    utils.open_test_db()
+    counts, pigeons = ImportCSV.run(filepath)
+    nt.assert_equal(counts, {"Pigeons": 1, "RaceResults": 1})
+    pigeon = database.get_pigeon_data("BE-12014")
+    nt.assert_equal((pigeon["sex"], pigeon["name"]), (1, u"Köning"))
+    nt.assert_equal(database.get_all_data(database.Tables.COLOURS), ["Red"])
+test_import_csv_roundtrip.setup = setup_import
+test_import_csv_roundtrip.teardown = teardown_import
+
+def test_parser_add_pigeons():
+    parser = pigeonparser.parser
+    rows = [pigeonparser.get_empty_pigeon_data("BE-%s2014" % band, 2, True,
+                                               "BE-12012", "BE-22012")
+            for band in range(1, 4)]
+    pigeons = parser.add_pigeons(rows)
+    nt.assert_equal([pigeon.pindex for pigeon in pigeons],
+                    ["BE-12014", "BE-22014", "BE-32014"])
+    nt.assert_equal(pigeons[0].get_sire(), ("BE-1", "2012"))
+    nt.assert_true(parser.get_pigeon("BE-32014") is pigeons[2])
+    nt.assert_equal(parser.search("BE-3"), [pigeons[2]])
+    nt.assert_equal(parser.add_pigeons([]), [])
+    # All or nothing
+    rows = [pigeonparser.get_empty_pigeon_data(pindex, 2)
+            for pindex in ("BE-42014", "BE-12014")]
+    nt.assert_raises(database.InvalidValueError, parser.add_pigeons, rows)
+    nt.assert_true(database.get_pigeon_data("BE-42014") is None)
+test_parser_add_pigeons.setup = setup_import
+test_parser_add_pigeons.teardown = teardown_import
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of Pigeon Planner.
+
+# Pigeon Planner is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Pigeon Planner is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Pigeon Planner.  If not, see <http://www.gnu.org/licenses/>
+
+
+import os
+import gzip
+import shutil
+import logging
+import tempfile
+
+import nose.tools as nt
+
+from pigeonplanner.core import const
+from pigeonplanner.core import logfile
+
+
+SEVERITY_ERROR = logfile.SEVERITY.index("ERROR")
+
+TMPDIR = None
+
+
+def setup_logfile():
+    global TMPDIR
+    TMPDIR = tempfile.mkdtemp()
+
+def teardown_logfile():
+    shutil.rmtree(TMPDIR)
+
+def get_logger(handler):
+    handler.setFormatter(logging.Formatter(const.LOG_FORMAT))
+    logger = logging.getLogger("pigeonplanner.test_logfile")
+    logger.propagate = False
+    logger.handlers = [handler]
+    logger.setLevel(logging.DEBUG)
+    return logger
+
+
+def test_rotation():
+    filename = os.path.join(TMPDIR, "test.log")
+    handler = logfile.RotatingLogHandler(filename, maxBytes=200, backupCount=2)
+    logger = get_logger(handler)
+    for number in range(4):
+        logger.info("Message %s %s", number, "x" * 100)
+    handler.close()
+
+    nt.assert_equal(logfile.get_log_files(filename),
+                    [filename, filename + ".1.gz", filename + ".2.gz"])
+    archive = gzip.open(filename + ".1.gz")
+    nt.assert_true("Message 2" in archive.read())
+    archive.close()
+    with open(filename) as log:
+        nt.assert_true("Message 3" in log.read())
+
+    # Time based
+    handler = logfile.RotatingLogHandler(filename, maxBytes=0, interval=60, backupCount=2)
+    logger = get_logger(handler)
+    handler.rolloverAt -= 60
+    logger.info("Message 4")
+    handler.close()
+    with open(filename) as log:
+        nt.assert_false("Message 3" in log.read())
+test_rotation.setup = setup_logfile
+test_rotation.teardown = teardown_logfile
+
+def test_index():
+    filename = os.path.join(TMPDIR, "test.log")
+    handler = logfile.RotatingLogHandler(filename)
+    logger = get_logger(handler)
+    logger.debug("Debug")
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        logger.exception("Failed")
+    logger.warning(u"Wärning")
+
+    index = logfile.LogIndex(filename)
+    nt.assert_equal(index.update(), 0)
+    nt.assert_equal(len(index), 7)
+    blocks = list(index.iter_blocks(SEVERITY_ERROR))
+    nt.assert_equal([severity for severity, text in blocks], [3, 5])
+    nt.assert_true(blocks[1][1].startswith("Traceback"))
+    nt.assert_true(blocks[1][1].endswith("ZeroDivisionError: integer division or modulo by zero\n"))
+
+    # Only new lines are read
+    logger.error("Error")
+    nt.assert_equal(index.update(), 7)
+    blocks = list(index.iter_blocks(0, 7))
+    nt.assert_equal(len(blocks), 1)
+    nt.assert_true(blocks[0][1].endswith("ERROR: Error\n"))
+
+    # Start over after a rotation
+    handler.doRollover()
+    logger.info("New")
+    nt.assert_equal(index.update(), None)
+    nt.assert_equal(len(index), 1)
+    handler.close()
+
+    archive = logfile.LogIndex(filename + ".1.gz")
+    archive.update()
+    nt.assert_equal(len(archive), 8)
+test_index.setup = setup_logfile
+test_index.teardown = teardown_logfile
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of Pigeon Planner.
+
+# Pigeon Planner is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Pigeon Planner is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Pigeon Planner.  If not, see <http://www.gnu.org/licenses/>
+
+
+import sqlite3
+
+import nose.tools as nt
+from . import utils
+
+from pigeonplanner import database
+from pigeonplanner.database.schemas import schema_3
+from pigeonplanner.core import medication
+
+
+DATA = {"date": "2014-05-01", "description": "Cure", "doneby": "", "medication": "",
+        "dosage": "", "comment": "", "vaccination": 0}
+
+PIGEONS = ["BE-%s2014" % number for number in range(100)] + ["NL-12014"]
+
+
+def setup_pigeons():
+    utils.open_test_db()
+    utils.add_pigeons(PIGEONS)
+
+
+def test_medication():
+    pigeons = PIGEONS[:100]
+    medid = medication.add_medication(DATA, pigeons)
+    nt.assert_equal(medication.get_pigeons(medid), set(pigeons))
+    nt.assert_equal(database.get_medication_for_id(medid)["description"], "Cure")
+    other = medication.add_medication(DATA, pigeons[:1])
+
+    added, removed = medication.update_medication(medid, dict(DATA, description="Vaccine"),
+                                                  pigeons[50:] + ["NL-12014"])
+    nt.assert_equal(added, set(["NL-12014"]))
+    nt.assert_equal(removed, set(pigeons[:50]))
+    nt.assert_equal(medication.get_pigeons(medid), set(pigeons[50:] + ["NL-12014"]))
+    nt.assert_equal(database.count_medication_records_for_medid(medid), 51)
+    for med in database.get_medication_for_pigeon("NL-12014"):
+        nt.assert_equal(med["description"], "Vaccine")
+    # Other medications are left alone
+    nt.assert_equal(medication.get_pigeons(other), set(pigeons[:1]))
+test_medication.setup = setup_pigeons
+test_medication.teardown = utils.close_test_db
+
+def test_database_api():
+    database.add_medication(dict(DATA, medid="med1", pindex="BE-12014"))
+    database.add_medication(dict(DATA, medid="med1", pindex="BE-22014"))
+    nt.assert_true(database.pigeon_has_medication("BE-12014"))
+    nt.assert_equal(database.count_medication_records_for_medid("med1"), 2)
+    nt.assert_equal([med["pindex"] for med in database.get_medication_for_pigeon("BE-22014")],
+                    ["BE-22014"])
+
+    database.update_medication("med1", {"dosage": "2ml"})
+    nt.assert_equal(database.get_medication_for_pigeon("BE-12014")[0]["dosage"], "2ml")
+    # The medication follows a changed band
+    database.update_pigeon("BE-12014", {"pindex": "NL-22014", "band": "NL-2"})
+    nt.assert_false(database.pigeon_has_medication("BE-12014"))
+    nt.assert_equal(sorted(database.get_pigeons_for_medid("med1")), ["BE-22014", "NL-22014"])
+
+    database.remove_medication({"medid": "med1", "pindex": "BE-22014"})
+    nt.assert_equal(database.get_pigeons_for_medid("med1"), ["NL-22014"])
+    nt.assert_true(database.get_medication_for_id("med1") is not None)
+    # The medication is removed with its last pigeon
+    database.remove_medication({"pindex": "NL-22014"})
+    nt.assert_true(database.get_medication_for_id("med1") is None)
+test_database_api.setup = setup_pigeons
+test_database_api.teardown = utils.close_test_db
+
+def test_migration():
+    connection = sqlite3.connect(utils.DBFILE)
+    for table in schema_3.Schema.get_table_names():
+        connection.execute("CREATE TABLE %s (%s)" % (table, schema_3.Schema.get_columns_sql(table)))
+    for pindex in ("BE-12014", "BE-22014"):
+        connection.execute("INSERT INTO Pigeons(pindex, band, year, sex) VALUES(?, ?, '2014', 0)",
+                           (pindex, pindex[:-4]))
+        connection.execute("INSERT INTO Medication(medid, pindex, date, dosage) "
+                           "VALUES('med1', ?, '2014-05-01', '1ml')", (pindex,))
+    connection.execute("PRAGMA user_version=3")
+    connection.commit()
+    connection.close()
+
+    database.session.open(utils.DBFILE)
+    nt.assert_true(database.session.check_schema())
+    nt.assert_equal(database.session.get_database_version(), database.Schema.VERSION)
+    nt.assert_equal(sorted(database.get_pigeons_for_medid("med1")), ["BE-12014", "BE-22014"])
+    nt.assert_equal(database.get_medication_for_id("med1")["dosage"], "1ml")
+    nt.assert_not_in("pindex", database.session.get_column_names("Medication"))
+test_migration.teardown = utils.close_test_db
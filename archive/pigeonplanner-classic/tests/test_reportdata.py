@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of Pigeon Planner.
+
+# Pigeon Planner is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Pigeon Planner is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Pigeon Planner.  If not, see <http://www.gnu.org/licenses/>
+
+import operator
+
+import nose.tools as nt
+from . import utils
+
+from pigeonplanner import database
+from pigeonplanner.core import enums
+from pigeonplanner.core import reportdata
+from pigeonplanner.core import pigeonparser
+
+
+def add_results():
+    for pindex, date, point, place, out in (("BE-12014", "2014-05-01", "Tours", 1, 100),
+                                            ("BE-22015", "2015-05-01", "Tours", 0, 100),
+                                            ("BE-32015", "2015-05-01", "Tours", 20, 100),
+                                            ("BE-32015", "2015-06-01", u"Orléans", 5, 10)):
+        database.add_result({"pindex": pindex, "date": date, "point": point,
+                             "place": place, "out": out})
+
+def test_results():
+    add_results()
+    results = list(reportdata.ResultsData())
+    nt.assert_equal([result["ring"] for result in results],
+                    ["BE-1 / 14", "BE-2 / 15", "BE-3 / 15", "BE-3 / 15"])
+    nt.assert_equal(results[0]["band"], "BE-1")
+    nt.assert_equal(results[0]["year"], "2014")
+    nt.assert_equal(results[0]["point"], "Tours")
+    nt.assert_equal(results[0]["placestr"], "1")
+
+    # The data is read again each time it's iterated over
+    data = reportdata.ResultsData([utils.FilterItem("year", 2015, operator.ge, int),
+                                   utils.FilterItem("place", 0, operator.gt, int)])
+    nt.assert_equal([result["place"] for result in data], [20, 5])
+    database.add_result({"pindex": "BE-12016", "date": "2016-05-01", "point": "Tours",
+                         "place": 3, "out": 100})
+    nt.assert_equal([result["place"] for result in data], [20, 5, 3])
+
+    data = reportdata.ResultsData([utils.FilterItem("coef", 25, operator.gt, float),
+                                   utils.FilterItem("point", u"Orléans".encode("utf-8"),
+                                                    operator.eq, str)])
+    nt.assert_equal([result["pindex"] for result in data], ["BE-32015"])
+test_results.setup = utils.open_test_db
+test_results.teardown = utils.close_test_db
+
+def test_results_grouped():
+    add_results()
+    data = reportdata.ResultsData([utils.FilterItem("place", 0, operator.gt, int)], True)
+    races = list(data)
+    nt.assert_equal([(race["race"]["date"], race["race"]["point"]) for race in races],
+                    [("2014-05-01", "Tours"), ("2015-05-01", "Tours"),
+                     ("2015-06-01", "Orléans")])
+    nt.assert_equal([len(race["results"]) for race in races], [1, 1, 1])
+    nt.assert_equal(races[1]["results"][0]["pindex"], "BE-32015")
+test_results_grouped.setup = utils.open_test_db
+test_results_grouped.teardown = utils.close_test_db
+
+def test_results_sort():
+    add_results()
+    data = reportdata.ResultsData(sort=("place", True))
+    nt.assert_equal([result["place"] for result in data], [20, 5, 1, 0])
+    data = reportdata.ResultsData(sort=("year", False))
+    nt.assert_equal([(result["pindex"], result["date"]) for result in data],
+                    [("BE-12014", "2014-05-01"), ("BE-22015", "2015-05-01"),
+                     ("BE-32015", "2015-05-01"), ("BE-32015", "2015-06-01")])
+    data = reportdata.ResultsData(sort=("coef", False))
+    nt.assert_equal([result["place"] for result in data], [0, 1, 20, 5])
+
+    # The races stay together and keep their results ordered by place
+    data = reportdata.ResultsData(grouped=True, sort=("date", True))
+    races = list(data)
+    nt.assert_equal([race["race"]["date"] for race in races],
+                    ["2015-06-01", "2015-05-01", "2014-05-01"])
+    nt.assert_equal([result["place"] for result in races[1]["results"]], [0, 20])
+
+    with nt.assert_raises(KeyError):
+        list(reportdata.ResultsData(sort=("place; DROP TABLE Results", False)))
+test_results_sort.setup = utils.open_test_db
+test_results_sort.teardown = utils.close_test_db
+
+def test_results_text():
+    database.add_result({"pindex": "BE-12014", "date": "2014-05-01", "point": u"Orléans",
+                         "place": 1, "out": 100, "sector": u"Zuid", "category": u"Jongen",
+                         "comment": u"Très bien"})
+    result, = reportdata.ResultsData()
+    nt.assert_equal(result["point"], "Orléans")
+    nt.assert_equal(result["comment"], "Très bien")
+    # The report writes every value with str()
+    for name in ["ring", "date", "point", "type", "wind", "weather", "placestr", "out",
+                 "coefstr", "speedstr", "sector", "category", "comment"]:
+        nt.assert_is_instance(str(result[name]), str)
+    race, = reportdata.ResultsData(grouped=True)
+    nt.assert_equal(str(race["race"]["point"]), "Orléans")
+test_results_text.setup = utils.open_test_db
+test_results_text.teardown = utils.close_test_db
+
+def test_pigeons():
+    for pindex, sex, visible in (("BE-22015", enums.Sex.hen, True),
+                                 ("BE-12015", enums.Sex.cock, True),
+                                 ("BE-12014", enums.Sex.hen, True),
+                                 ("BE-32015", enums.Sex.hen, False)):
+        database.add_pigeon(pigeonparser.get_empty_pigeon_data(pindex, sex, visible))
+
+    pigeons = reportdata.PigeonsData()
+    nt.assert_equal([pigeon.pindex for pigeon in pigeons],
+                    ["BE-12014", "BE-12015", "BE-22015"])
+    nt.assert_true(all(isinstance(pigeon, pigeonparser.Pigeon) for pigeon in pigeons))
+
+    hens = [utils.FilterItem("sex", enums.Sex.hen, operator.eq, int),
+            utils.FilterItem("year", 2015, operator.eq, int)]
+    pigeons = reportdata.PigeonsData(hens)
+    nt.assert_equal([pigeon.pindex for pigeon in pigeons], ["BE-22015"])
+    pigeons = reportdata.PigeonsData(hens, show_all=True)
+    nt.assert_equal([pigeon.pindex for pigeon in pigeons], ["BE-22015", "BE-32015"])
+test_pigeons.setup = utils.open_test_db
+test_pigeons.teardown = utils.close_test_db
+
+def test_pigeons_sort():
+    for pindex, name, status in (("BE-22015", u"Anna", enums.Status.dead),
+                                 ("BE-12015", u"Bert", enums.Status.active),
+                                 ("BE-12014", u"Chris", enums.Status.breeder)):
+        data = pigeonparser.get_empty_pigeon_data(pindex, enums.Sex.hen)
+        data.update(name=name, active=status)
+        database.add_pigeon(data)
+
+    pigeons = reportdata.PigeonsData(sort=("name", True))
+    nt.assert_equal([pigeon.pindex for pigeon in pigeons],
+                    ["BE-12014", "BE-12015", "BE-22015"])
+    pigeons = reportdata.PigeonsData(sort=("year", True))
+    nt.assert_equal([pigeon.pindex for pigeon in pigeons],
+                    ["BE-22015", "BE-12015", "BE-12014"])
+    # The statuses are sorted on their labels like the pigeon list does
+    pigeons = reportdata.PigeonsData(sort=("active", False))
+    nt.assert_equal([pigeon.active for pigeon in pigeons],
+                    [enums.Status.active, enums.Status.breeder, enums.Status.dead])
+test_pigeons_sort.setup = utils.open_test_db
+test_pigeons_sort.teardown = utils.close_test_db
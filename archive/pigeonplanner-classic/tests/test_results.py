@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of Pigeon Planner.
+
+# Pigeon Planner is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Pigeon Planner is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Pigeon Planner.  If not, see <http://www.gnu.org/licenses/>
+
+
+import sqlite3
+
+import nose.tools as nt
+from . import utils
+
+from pigeonplanner import database
+from pigeonplanner.database.schemas import schema_4
+
+
+def make_result(pindex, point, place, **kwargs):
+    data = {"pindex": pindex, "date": "2014-05-01", "point": point, "place": place,
+            "out": 100, "sector": "", "type": "", "category": "", "wind": "",
+            "weather": "", "comment": "", "speed": 0.0, "windspeed": "",
+            "temperature": ""}
+    data.update(kwargs)
+    return data
+
+def setup_pigeons():
+    utils.open_test_db()
+    utils.add_pigeons(["BE-12014", "BE-22014"])
+
+
+def test_races():
+    key1 = database.add_result(make_result("BE-12014", "Tours", 1, weather="Sunny"))
+    database.add_result(make_result("BE-22014", "Tours", 5))
+    database.add_result(make_result("BE-12014", "Orleans", 3))
+    # The race is stored once, empty values don't overwrite it
+    races = database.get_all_races()
+    nt.assert_equal([race["point"] for race in races], ["Orleans", "Tours"])
+    nt.assert_equal(races[1]["weather"], "Sunny")
+    nt.assert_equal(database.count_results(), 3)
+    nt.assert_true(database.result_exists({"pindex": "BE-22014", "point": "Tours", "place": 5}))
+    result = database.get_results_for_data({"date": "2014-05-01", "point": "Tours"})[0]
+    nt.assert_equal((result["Resultkey"], result["weather"]), (key1, "Sunny"))
+    nt.assert_equal([race["point"] for race in database.get_races_for_pigeon("BE-22014")],
+                    ["Tours"])
+
+    database.update_result_as_race("2014-05-01", "Tours", "Short", "NW", "3", "Rain", "12")
+    for result in database.get_results_for_data({"point": "Tours"}):
+        nt.assert_equal(result["weather"], "Rain")
+    nt.assert_equal(database.get_race_info("2014-05-01", "Tours")["type"], "Short")
+
+    # Moving the last result of a race removes it
+    database.update_result_for_key(key1, {"point": "Orleans", "place": 2})
+    database.remove_result_for_pigeon("BE-22014")
+    nt.assert_equal([race["point"] for race in database.get_all_races()], ["Orleans"])
+    nt.assert_equal(sorted(result["place"] for result in
+                           database.get_results_for_data({"point": "Orleans"})), [2, 3])
+test_races.setup = setup_pigeons
+test_races.teardown = utils.close_test_db
+
+def test_view_insert():
+    columns = ("pindex", "date", "point", "place", "out", "weather")
+    counts = database.import_rows([(database.Tables.RACERESULTS, columns,
+                                    [("BE-12014", "2014-05-01", "Tours", 1, 10, "Sunny"),
+                                     ("BE-22014", "2014-05-01", "Tours", 2, 10, "Rain")])])
+    nt.assert_equal(counts, {database.Tables.RACERESULTS: 2})
+    nt.assert_equal(len(database.get_all_races()), 1)
+    result = database.get_results_for_data({"pindex": "BE-22014"})[0]
+    nt.assert_equal((result["place"], result["weather"], result["comment"]), (2, "Sunny", ""))
+test_view_insert.setup = setup_pigeons
+test_view_insert.teardown = utils.close_test_db
+
+def test_migration():
+    connection = sqlite3.connect(utils.DBFILE)
+    for table in schema_4.Schema.get_table_names():
+        connection.execute("CREATE TABLE %s (%s)" % (table, schema_4.Schema.get_columns_sql(table)))
+    connection.execute("INSERT INTO Pigeons(pindex, band, year, sex) VALUES('BE-12014', 'BE-1', '2014', 0)")
+    for pindex, point, place, weather in (("BE-12014", "Tours", 1, ""),
+                                          ("BE-22014", "Tours", 4, "Sunny"),
+                                          ("BE-12014", "Orleans", 2, "Rain")):
+        connection.execute("INSERT INTO Results(pindex, date, point, place, out, weather) "
+                           "VALUES(?, '2014-05-01', ?, ?, 10, ?)", (pindex, point, place, weather))
+    connection.execute("PRAGMA user_version=4")
+    connection.commit()
+    connection.close()
+
+    database.session.open(utils.DBFILE)
+    nt.assert_true(database.session.check_schema())
+    nt.assert_equal(database.session.get_database_version(), database.Schema.VERSION)
+    nt.assert_equal(database.count_results(), 3)
+    nt.assert_equal(database.get_race_info("2014-05-01", "Tours")["weather"], "Sunny")
+    results = database.get_results_for_data({"pindex": "BE-12014"})
+    nt.assert_equal([(result["point"], result["place"]) for result in results],
+                    [("Tours", 1), ("Orleans", 2)])
+    nt.assert_not_in("date", database.session.get_column_names(database.Tables.RESULTS))
+test_migration.teardown = utils.close_test_db
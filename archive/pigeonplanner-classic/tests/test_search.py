@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of Pigeon Planner.
+
+# Pigeon Planner is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Pigeon Planner is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Pigeon Planner.  If not, see <http://www.gnu.org/licenses/>
+
+
+import nose.tools as nt
+from . import utils
+
+from pigeonplanner.core import searchindex
+
+
+def test_band_keys():
+    nt.assert_equal(searchindex.normalize_band("BE-1234567"), "be1234567")
+    nt.assert_equal(searchindex.get_band_keys("BE-1234567"),
+                    set(["be1234567", "1234567"]))
+    nt.assert_equal(searchindex.get_band_keys("87-CUST-2222"),
+                    set(["87cust2222", "cust2222", "2222"]))
+
+def test_trie():
+    trie = searchindex.BandTrie()
+    trie.add("be123", "a")
+    trie.add("be1234", "b")
+    trie.add("nl99", "c")
+    nt.assert_equal(list(trie.iter_prefix("be")), ["a", "b"])
+    nt.assert_equal(trie.find("be123"), set(["a"]))
+    trie.remove("be1234", "b")
+    nt.assert_equal(list(trie.iter_prefix("be")), ["a"])
+    trie.remove("be123", "a")
+    nt.assert_equal(list(trie.iter_prefix("be")), [])
+    nt.assert_equal(list(trie.iter_prefix("nl")), ["c"])
+
+def test_search_index():
+    pigeons = {}
+    for pigeon in [utils.make_pigeon("BE-1234567", "2013", name="Blue Boy"),
+                   utils.make_pigeon("BE-1234", "2014", colour="Blue chequer"),
+                   utils.make_pigeon("NL-7654321", "2014", strain="Janssen",
+                               extra3="Ace pigeon")]:
+        pigeons[pigeon.pindex] = pigeon
+    index = searchindex.PigeonSearchIndex(pigeons)
+    # Built in steps
+    nt.assert_true(index.build_step(2))
+    nt.assert_false(index.build_step(2))
+
+    # Exact band matches come first
+    nt.assert_equal(index.search("be-1234"), ["BE-12342014", "BE-12345672013"])
+    nt.assert_equal(index.search("1234"), ["BE-12342014", "BE-12345672013"])
+    nt.assert_equal(index.search("1234/2013"), ["BE-12345672013"])
+    nt.assert_equal(index.search("BE-1234 / 201"), ["BE-12342014", "BE-12345672013"])
+    # Text fields
+    nt.assert_equal(index.search("jans"), ["NL-76543212014"])
+    nt.assert_equal(index.search("ace"), ["NL-76543212014"])
+    nt.assert_equal(sorted(index.search("blue")), ["BE-12342014", "BE-12345672013"])
+    nt.assert_equal(index.search("blue cheq"), ["BE-12342014"])
+    nt.assert_equal(index.search('"'), [])
+    nt.assert_equal(index.search(""), [])
+    # Limit
+    nt.assert_equal(len(index.search("1234", limit=1)), 1)
+
+    # Keep in sync
+    renamed = utils.make_pigeon("BE-5555", "2014", strain="Janssen")
+    index.update(renamed, "NL-76543212014")
+    nt.assert_equal(index.search("NL-765"), [])
+    nt.assert_equal(index.search("jans"), ["BE-55552014"])
+    index.remove("BE-55552014")
+    nt.assert_equal(index.search("jans"), [])
+    nt.assert_equal(index.search("5555"), [])
+    index.add(utils.make_pigeon("DE-1", "2015", loft="Home"))
+    nt.assert_equal(index.search("home"), ["DE-12015"])
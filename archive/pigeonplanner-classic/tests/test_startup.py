@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of Pigeon Planner.
+
+# Pigeon Planner is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Pigeon Planner is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Pigeon Planner.  If not, see <http://www.gnu.org/licenses/>
+
+
+import os
+import ast
+import sys
+import subprocess
+
+import nose.tools as nt
+
+
+ROOTDIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+# Modules that are imported when the main window is shown
+STARTUP_MODULES = ["pigeonplanner.main",
+                   "pigeonplanner.ui.gtkmain",
+                   "pigeonplanner.ui.mainwindow",
+                   "pigeonplanner.ui.widgets.statusbar",
+                   "pigeonplanner.ui.widgets.checkbutton",
+                   "pigeonplanner.ui.widgets.latlongentry"]
+
+# Subsystems that should only be loaded once they're used
+DEFERRED_MODULES = ["pigeonplanner.reportlib",
+                    "pigeonplanner.reports",
+                    "pigeonplanner.ui.resultparser",
+                    "pigeonplanner.ui.resultwindow",
+                    "pigeonplanner.ui.maildialog",
+                    "pigeonplanner.core.mailing",
+                    "pigeonplanner.core.update",
+                    "pigeonplanner.ui.tools.addressbook",
+                    "pigeonplanner.ui.tools.datamanager",
+                    "pigeonplanner.ui.tools.distancecalculator",
+                    "pigeonplanner.ui.tools.photoalbum",
+                    "pigeonplanner.ui.tools.racepointmanager",
+                    "pigeonplanner.ui.tools.velocitycalculator",
+                    "yapsy", "geopy",
+                    "cgi", "csv", "inspect", "urllib2", "webbrowser"]
+
+# Cold start budget in seconds for the non-GUI part of the startup
+IMPORT_TIME_BUDGET = 1.5
+
+IMPORTTIME_SCRIPT = """
+import sys, time, __builtin__
+sys.path.insert(0, %(rootdir)r)
+__builtin__._ = lambda x: x
+timings = {}
+stack = []
+_import = __builtin__.__import__
+def timed_import(name, *args, **kwargs):
+    new = name not in sys.modules
+    start = time.time()
+    stack.append(0.0)
+    try:
+        return _import(name, *args, **kwargs)
+    finally:
+        child = stack.pop()
+        elapsed = time.time() - start
+        if stack:
+            stack[-1] += elapsed
+        if new and name in sys.modules:
+            timings[name] = (elapsed - child, elapsed)
+__builtin__.__import__ = timed_import
+start = time.time()
+import pigeonplanner.main
+from pigeonplanner.core import common, checks, pigeonparser
+total = time.time() - start
+__builtin__.__import__ = _import
+print "total", total
+for name in sorted(sys.modules):
+    if sys.modules[name] is not None:
+        print "module", name
+for name, (self, cumulative) in timings.items():
+    print "time", name, self, cumulative
+"""
+
+
+def _module_path(modname):
+    base = os.path.join(ROOTDIR, *modname.split("."))
+    if os.path.isfile(os.path.join(base, "__init__.py")):
+        return os.path.join(base, "__init__.py")
+    if os.path.isfile(base + ".py"):
+        return base + ".py"
+    return None
+
+def _resolve(modname, name, level, is_package):
+    """ Resolve an import statement to an absolute module name """
+    if level:
+        parts = modname.split(".")
+        if not is_package:
+            parts = parts[:-1]
+        parts = parts[:len(parts) - level + 1]
+        base = ".".join(parts)
+        return "%s.%s" % (base, name) if name else base
+    # Python 2 implicit relative import
+    package = modname if is_package else modname.rsplit(".", 1)[0]
+    relative = "%s.%s" % (package, name)
+    if _module_path(relative) is not None:
+        return relative
+    return name
+
+def _toplevel_nodes(body):
+    """ Walk the statements that are executed at import time """
+    for node in body:
+        if isinstance(node, (ast.FunctionDef,)):
+            continue
+        if isinstance(node, ast.ClassDef):
+            for child in _toplevel_nodes(node.body):
+                yield child
+            continue
+        yield node
+        for field in ("body", "orelse", "finalbody", "handlers"):
+            for child in _toplevel_nodes(getattr(node, field, [])):
+                yield child
+
+def _get_imports(modname):
+    path = _module_path(modname)
+    is_package = path.endswith("__init__.py")
+    with open(path) as source:
+        tree = ast.parse(source.read(), path)
+    for node in _toplevel_nodes(tree.body):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                yield _resolve(modname, alias.name, 0, is_package)
+        elif isinstance(node, ast.ImportFrom):
+            base = _resolve(modname, node.module or "", node.level, is_package)
+            yield base
+            for alias in node.names:
+                submodule = "%s.%s" % (base, alias.name)
+                if _module_path(submodule) is not None:
+                    yield submodule
+
+def _get_import_graph(roots):
+    """ Return a dict of all modules reachable at import time from the roots,
+    mapped to the module that imported it first.
+    """
+    seen = dict((root, None) for root in roots)
+    todo = list(roots)
+    while todo:
+        modname = todo.pop()
+        # Importing a submodule executes all parent packages
+        parts = modname.split(".")
+        for index in range(1, len(parts)):
+            parent = ".".join(parts[:index])
+            if parent not in seen:
+                seen[parent] = modname
+                todo.append(parent)
+        if not modname.startswith("pigeonplanner") or _module_path(modname) is None:
+            continue
+        for imported in _get_imports(modname):
+            if imported not in seen:
+                seen[imported] = modname
+                todo.append(imported)
+    return seen
+
+def _import_chain(graph, modname):
+    chain = [modname]
+    while graph.get(chain[-1]) is not None:
+        chain.append(graph[chain[-1]])
+    return " <- ".join(chain)
+
+
+def test_startup_import_graph():
+    graph = _get_import_graph(STARTUP_MODULES)
+    for deferred in DEFERRED_MODULES:
+        nt.assert_not_in(deferred, graph,
+                         "Loaded at startup: %s" % _import_chain(graph, deferred))
+
+def test_startup_import_time():
+    script = IMPORTTIME_SCRIPT % {"rootdir": ROOTDIR}
+    output = subprocess.check_output([sys.executable, "-c", script], cwd=ROOTDIR)
+    total = 0.0
+    modules = set()
+    timings = []
+    for line in output.splitlines():
+        kind, rest = line.split(" ", 1)
+        if kind == "total":
+            total = float(rest)
+        elif kind == "module":
+            modules.add(rest)
+        elif kind == "time":
+            name, self, cumulative = rest.split()
+            timings.append((float(cumulative), float(self), name))
+
+    for deferred in DEFERRED_MODULES:
+        nt.assert_not_in(deferred, modules)
+
+    timings.sort(reverse=True)
+    breakdown = "\n".join("%10.4f %10.4f  %s" % timing for timing in timings[:20])
+    nt.assert_less(total, IMPORT_TIME_BUDGET,
+                   "Startup imports took %.3fs\n cumulative       self  module\n%s"
+                   % (total, breakdown))
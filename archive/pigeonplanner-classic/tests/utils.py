@@ -17,12 +17,18 @@
 
 
 import os
+import collections
 
 from pigeonplanner import database
+from pigeonplanner.core import enums
+from pigeonplanner.core.pigeonparser import Pigeon, get_empty_pigeon_data
 
 
 DBFILE = "test.db"
 
+# The attributes of the items of the pigeon list and result filters
+FilterItem = collections.namedtuple("FilterItem", "name value operator type")
+
 
 def open_test_db():
     database.session.open(DBFILE)
@@ -34,3 +40,17 @@ def close_test_db():
     except:
         pass
 
+def add_pigeons(pindexes):
+    database.add_pigeons([get_empty_pigeon_data(pindex, enums.Sex.cock) for pindex in pindexes])
+
+def make_pigeon(band, year, **kwargs):
+    data = {"Pigeonskey": None, "pindex": band+year, "band": band, "year": year,
+            "sex": enums.Sex.cock, "show": 1, "active": enums.Status.active,
+            "colour": "", "name": "", "strain": "", "loft": "", "image": "",
+            "sire": "", "yearsire": "", "dam": "", "yeardam": "",
+            "extra1": "", "extra2": "", "extra3": "", "extra4": "",
+            "extra5": "", "extra6": ""}
+    data.update(kwargs)
+    pigeon = Pigeon()
+    pigeon.set_data(**data)
+    return pigeon